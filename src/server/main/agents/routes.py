@@ -1,13 +1,14 @@
 import datetime
 import uuid
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query
 from main.agents.models import AddTaskRequest, UpdateTaskRequest, TaskIdRequest, GeneratePlanRequest, AnswerClarificationRequest
 from main.config import INTEGRATIONS_CONFIG
 from main.dependencies import mongo_manager
 from main.auth.utils import PermissionChecker
 from main.agents.utils import clean_llm_output
 from workers.executor.tasks import execute_task_plan # keep for immediate execution
-from workers.tasks import generate_plan_from_context, process_memory_item # new tasks
+from workers.tasks import generate_plan_from_context, enqueue_memory_items # new tasks
 from workers.planner.llm import get_planner_agent
 from workers.planner.db import get_all_mcp_descriptions
 from workers.tasks import calculate_next_run
@@ -20,15 +21,34 @@ router = APIRouter(
 )
 
 
+@router.get("/tasks", status_code=status.HTTP_200_OK)
+async def list_tasks(
+    status_filter: Optional[List[str]] = Query(None, alias="status", description="Only tasks with these statuses."),
+    priority: Optional[List[int]] = Query(None, description="Only tasks with these priorities."),
+    created_after: Optional[datetime.datetime] = Query(None, alias="createdAfter"),
+    created_before: Optional[datetime.datetime] = Query(None, alias="createdBefore"),
+    cursor: Optional[str] = Query(None, description="The next_cursor returned by the previous page."),
+    limit: int = Query(50, ge=1, le=200),
+    user_id: str = Depends(PermissionChecker(required_permissions=["read:tasks"]))
+):
+    """Lists task summaries, newest first. Use GET /agents/tasks/{task_id} for the plan, progress and result."""
+    try:
+        tasks, next_cursor = await mongo_manager.get_task_summaries(
+            user_id, statuses=status_filter, priorities=priority,
+            created_after=created_after, created_before=created_before,
+            cursor=cursor, limit=limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return {"tasks": tasks, "next_cursor": next_cursor}
+
 @router.get("/tasks/{task_id}", status_code=status.HTTP_200_OK)
 async def get_task_details(
     task_id: str,
     user_id: str = Depends(PermissionChecker(required_permissions=["read:tasks"]))
 ):
-    """Fetches the full details of a single task by its ID."""
-    task = await mongo_manager.task_collection.find_one(
-        {"task_id": task_id, "user_id": user_id}
-    )
+    """Fetches the full details of a single task by its ID, including its plan and progress log."""
+    task = await mongo_manager.get_task(user_id, task_id)
     if not task:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
     
@@ -103,6 +123,7 @@ async def add_task(
 async def fetch_tasks(
     user_id: str = Depends(PermissionChecker(required_permissions=["read:tasks"]))
 ):
+    """Every task with full details, unpaginated. Kept for existing clients; prefer GET /agents/tasks."""
     tasks_cursor = mongo_manager.task_collection.find({"user_id": user_id})
     tasks = await tasks_cursor.to_list(length=None)
     for task in tasks:
@@ -126,6 +147,8 @@ async def update_task(
         update_data["enabled"] = request.enabled
 
     if request.schedule is not None:
+        # The task UI collects recurring times in UTC, so a schedule without an explicit
+        # "timezone" is left as UTC rather than reinterpreted in the profile's zone.
         update_data["schedule"] = request.schedule
         # When a schedule is updated, we need to recalculate the next run time
         if request.schedule.get("type") == "recurring":
@@ -192,7 +215,7 @@ async def approve_task(
     if not task:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found or not pending approval.")
 
-    user_profile = await mongo_manager.get_user_profile(user_id)
+    user_profile = await mongo_manager.get_user_profile_fields(user_id, ["userData.integrations"])
     user_integrations = user_profile.get("userData", {}).get("integrations", {}) if user_profile else {}
     required_tools = {step['tool'] for step in task.get('plan', [])}
     missing_tools = []
@@ -242,6 +265,7 @@ async def answer_clarifications(
     questions = task.get("clarifying_questions", [])
 
     # Update answers in DB and send to memory
+    facts_to_remember = []
     for answer in request.answers:
         found_question = False
         for q in questions:
@@ -249,9 +273,12 @@ async def answer_clarifications(
                 q["answer"] = answer.answer_text
                 found_question = True
                 fact_to_remember = f"Regarding the task '{task.get('description', '')}', the user clarified: Q: '{q['text']}' A: '{answer.answer_text}'"
-                process_memory_item.delay(user_id, fact_to_remember)
+                facts_to_remember.append(fact_to_remember)
                 break
 
+    if facts_to_remember:
+        enqueue_memory_items.delay(user_id, facts_to_remember)
+
     all_answered = all(q.get("answer") for q in questions)
 
     update_payload = {"clarifying_questions": questions}
@@ -303,7 +330,7 @@ async def generate_plan(
     """
     try:
         # --- Fetch user context for personalization ---
-        user_profile = await mongo_manager.get_user_profile(user_id)
+        user_profile = await mongo_manager.get_user_profile_fields(user_id, ["userData.personalInfo"])
         if not user_profile:
             raise HTTPException(status_code=404, detail="User profile not found.")
 
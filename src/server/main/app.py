@@ -12,6 +12,7 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from main.config import APP_SERVER_PORT
 from main.dependencies import mongo_manager
+from main.auth.utils import jwks_manager, verified_token_cache, auth0_http_client
 from main.auth.routes import router as auth_router
 from main.chat.routes import router as chat_router
 from main.notifications.routes import router as notifications_router
@@ -29,11 +30,17 @@ logger = logging.getLogger(__name__)
 async def lifespan(app_instance: FastAPI):
     print(f"[{datetime.datetime.now(timezone.utc).isoformat()}] [LIFESPAN] App startup...")
     await mongo_manager.initialize_db()
+    await mongo_manager.migrate_chat_history_to_messages()
+    await mongo_manager.migrate_notifications_to_collection()
+    mongo_manager.start_profile_invalidation_listener()
+    await jwks_manager.start()
     print(f"[{datetime.datetime.now(timezone.utc).isoformat()}] [LIFESPAN] App startup complete.")
     yield 
     print(f"[{datetime.datetime.now(timezone.utc).isoformat()}] [LIFESPAN] App shutdown sequence initiated...")    
+    await jwks_manager.stop()
+    await auth0_http_client.aclose()
     if mongo_manager and mongo_manager.client:
-        mongo_manager.client.close()
+        await mongo_manager.close()
     print(f"[{datetime.datetime.now(timezone.utc).isoformat()}] [LIFESPAN] App shutdown complete.")
 
 app = FastAPI(title="Sentient Main Server", version="2.2.0", docs_url="/docs", redoc_url="/redoc", lifespan=lifespan)
@@ -68,7 +75,9 @@ async def health():
         "services": {
             "database": "connected" if mongo_manager.client else "disconnected",
             "llm": "qwen_agent_on_demand"
-        }
+        },
+        "profile_cache": mongo_manager.profile_cache.stats(),
+        "verified_token_cache": verified_token_cache.stats()
     }
 
 END_TIME = time.time()
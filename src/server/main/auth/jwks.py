@@ -0,0 +1,149 @@
+# src/server/main/auth/jwks.py
+import copy
+import time
+import asyncio
+import hashlib
+import datetime
+from collections import OrderedDict
+from typing import Any, Container, Dict, KeysView, Optional, Tuple
+
+import httpx
+
+_REQUIRED_KEY_FIELDS = ("kty", "n", "e")
+
+
+class JWKSManager:
+    """
+    Auth0 signing keys indexed by `kid`, refreshed in the background. A token signed with a
+    `kid` we have not seen triggers an on-demand refetch (Auth0 rotated its keys), limited to
+    one per `min_refetch_interval_seconds` so garbage tokens cannot hammer the JWKS endpoint.
+    """
+    def __init__(self, domain: Optional[str], http_client: httpx.AsyncClient,
+                 refresh_interval_seconds: float, min_refetch_interval_seconds: float):
+        self.jwks_url = f"https://{domain}/.well-known/jwks.json" if domain else None
+        self.http_client = http_client
+        self.refresh_interval_seconds = refresh_interval_seconds
+        self.min_refetch_interval_seconds = min_refetch_interval_seconds
+        self._keys: Dict[str, Dict[str, str]] = {}
+        self._last_fetch_attempt = 0.0
+        self._fetch_lock = asyncio.Lock()
+        self._refresher: Optional[asyncio.Task] = None
+
+    @property
+    def is_ready(self) -> bool:
+        return bool(self._keys)
+
+    def kids(self) -> KeysView[str]:
+        return self._keys.keys()
+
+    async def _fetch(self) -> bool:
+        """Replaces the key set with a fresh copy. On failure the previous keys stay in use."""
+        if not self.jwks_url:
+            return False
+        self._last_fetch_attempt = time.monotonic()
+        try:
+            response = await self.http_client.get(self.jwks_url)
+            response.raise_for_status()
+            jwks = response.json()
+            keys = {}
+            for key_entry in jwks.get("keys", []):
+                if not isinstance(key_entry, dict) or not key_entry.get("kid"):
+                    continue
+                key_data = {comp: key_entry[comp] for comp in ["kty", "kid", "use", "n", "e"] if comp in key_entry}
+                if all(k in key_data for k in _REQUIRED_KEY_FIELDS):
+                    keys[key_entry["kid"]] = key_data
+            if not keys:
+                print(f"[{datetime.datetime.now()}] [JWKSManager_ERROR] JWKS response from {self.jwks_url} contained no usable keys.")
+                return False
+            self._keys = keys
+            print(f"[{datetime.datetime.now()}] [JWKSManager] JWKS fetched successfully ({len(keys)} key(s)).")
+            return True
+        except httpx.HTTPError as e:
+            print(f"[{datetime.datetime.now()}] [JWKSManager_ERROR] Could not fetch JWKS: {e}")
+            return False
+        except Exception as e:
+            print(f"[{datetime.datetime.now()}] [JWKSManager_ERROR] Error processing JWKS: {e}")
+            return False
+
+    async def refresh(self) -> bool:
+        async with self._fetch_lock:
+            return await self._fetch()
+
+    async def get_key(self, kid: str) -> Optional[Dict[str, str]]:
+        key = self._keys.get(kid)
+        if key is not None:
+            return key
+        async with self._fetch_lock:
+            # Another request may have refetched while we waited for the lock.
+            key = self._keys.get(kid)
+            if key is not None or time.monotonic() - self._last_fetch_attempt < self.min_refetch_interval_seconds:
+                return key
+            print(f"[{datetime.datetime.now()}] [JWKSManager] Unknown kid '{kid}', refetching JWKS.")
+            await self._fetch()
+        return self._keys.get(kid)
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval_seconds)
+            await self.refresh()
+
+    async def start(self):
+        if not self.jwks_url:
+            print(f"[{datetime.datetime.now()}] [JWKSManager_FATAL_ERROR] AUTH0_DOMAIN not set. Cannot fetch JWKS.")
+            return
+        await self.refresh()
+        if self._refresher is None:
+            self._refresher = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._refresher is not None:
+            self._refresher.cancel()
+            self._refresher = None
+
+
+class VerifiedTokenCache:
+    """
+    LRU of bearer tokens that already passed signature and claims verification, keyed by
+    their SHA-256 so raw tokens are not kept in memory. An entry lives until the token's
+    `exp`, and is dropped early if its signing key is rotated out of the JWKS.
+    """
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, str, Dict[str, Any]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str, valid_kids: Container[str]) -> Optional[Dict[str, Any]]:
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.time() or entry[1] not in valid_kids:
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return copy.deepcopy(entry[2])
+
+    def put(self, token: str, kid: str, payload: Dict[str, Any]):
+        exp = payload.get("exp")
+        if not isinstance(exp, (int, float)) or self.max_entries <= 0:
+            return
+        key = self._key(token)
+        self._entries[key] = (float(exp), kid, copy.deepcopy(payload))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
@@ -0,0 +1,82 @@
+# src/server/main/auth/management_token.py
+import time
+import asyncio
+import datetime
+from typing import Optional
+
+import httpx
+from fastapi import HTTPException, status
+
+# A token is never handed out closer than this to its expiry, so it can't lapse in flight.
+_EXPIRY_MARGIN_SECONDS = 30
+
+
+class ManagementTokenProvider:
+    """
+    Auth0 Management API token, minted once and reused until shortly before it expires.
+    Once it is within `refresh_ahead_seconds` of expiry, callers still get the current token
+    while a new one is minted in the background. Concurrent callers share a single mint.
+    """
+    def __init__(self, domain: Optional[str], client_id: Optional[str], client_secret: Optional[str],
+                 http_client: httpx.AsyncClient, refresh_ahead_seconds: float):
+        self.domain = domain
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.http_client = http_client
+        self.refresh_ahead_seconds = refresh_ahead_seconds
+        self._token: Optional[str] = None
+        self._expires_at = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    async def _mint(self) -> str:
+        if not all([self.domain, self.client_id, self.client_secret]):
+            print(f"[{datetime.datetime.now()}] [AuthUtils_MGMT_TOKEN_ERROR] Auth0 Management API credentials not fully configured.")
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Auth0 Management API config error.")
+
+        payload = {
+            "grant_type": "client_credentials",
+            "client_id": self.client_id,
+            "client_secret": self.client_secret,
+            "audience": f"https://{self.domain}/api/v2/",
+        }
+        requested_at = time.monotonic()
+        try:
+            response = await self.http_client.post(f"https://{self.domain}/oauth/token", data=payload)
+            response.raise_for_status()
+            token_data = response.json()
+        except httpx.HTTPError as e:
+            print(f"[{datetime.datetime.now()}] [AuthUtils_MGMT_TOKEN_ERROR] Failed to get management token: {e}")
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"Failed to get management token: {e}")
+        except Exception as e:
+            print(f"[{datetime.datetime.now()}] [AuthUtils_MGMT_TOKEN_ERROR] Error processing management token response: {e}")
+            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Error processing management token response.")
+
+        access_token = token_data.get("access_token")
+        if not access_token:
+            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Invalid token response from Auth0 Mgmt API.")
+        # Measure the lifetime from when we asked, so network latency can only make us refresh early.
+        self._token = access_token
+        self._expires_at = requested_at + float(token_data.get("expires_in", 0))
+        return access_token
+
+    @staticmethod
+    def _retrieve_exception(task: asyncio.Task):
+        # A refresh-ahead failure has no awaiting caller; _mint already logged it and the
+        # next call past the refresh-ahead point simply tries again.
+        if not task.cancelled():
+            task.exception()
+
+    def _refresh(self) -> asyncio.Task:
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._mint())
+            self._refresh_task.add_done_callback(self._retrieve_exception)
+        return self._refresh_task
+
+    async def get_token(self) -> str:
+        remaining = self._expires_at - time.monotonic()
+        if self._token and remaining > _EXPIRY_MARGIN_SECONDS:
+            if remaining <= self.refresh_ahead_seconds:
+                self._refresh()
+            return self._token
+        # Shielded so a caller that gives up doesn't cancel the mint the others are waiting on.
+        return await asyncio.shield(self._refresh())
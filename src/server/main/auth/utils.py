@@ -8,7 +8,7 @@ from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 from cryptography.hazmat.primitives import padding
 from cryptography.hazmat.backends import default_backend
 import base64
-import requests
+import httpx
 
 from jose import jwt, JWTError
 from jose.exceptions import JOSEError
@@ -19,27 +19,20 @@ from main.config import (
     ENVIRONMENT, SELF_HOST_AUTH_SECRET,
     AES_SECRET_KEY, AES_IV, AUTH0_SCOPE,
     AUTH0_DOMAIN, AUTH0_AUDIENCE, ALGORITHMS,
-    AUTH0_MANAGEMENT_CLIENT_ID, AUTH0_MANAGEMENT_CLIENT_SECRET
+    AUTH0_MANAGEMENT_CLIENT_ID, AUTH0_MANAGEMENT_CLIENT_SECRET,
+    JWKS_REFRESH_INTERVAL_SECONDS, JWKS_MIN_REFETCH_INTERVAL_SECONDS, VERIFIED_TOKEN_CACHE_MAX_ENTRIES,
+    AUTH0_MANAGEMENT_TOKEN_REFRESH_AHEAD_SECONDS
 )
+from main.auth.jwks import JWKSManager, VerifiedTokenCache
+from main.auth.management_token import ManagementTokenProvider
 
-# --- JWKS Fetching ---
-jwks = None
-if AUTH0_DOMAIN:
-    jwks_url = f"https://{AUTH0_DOMAIN}/.well-known/jwks.json"
-    try:
-        print(f"[{datetime.datetime.now()}] [AuthUtils] Fetching JWKS from {jwks_url}...")
-        jwks_response = requests.get(jwks_url, timeout=10)
-        jwks_response.raise_for_status()
-        jwks = jwks_response.json()
-        print(f"[{datetime.datetime.now()}] [AuthUtils] JWKS fetched successfully.")
-    except requests.exceptions.RequestException as e:
-        print(f"[{datetime.datetime.now()}] [AuthUtils_FATAL_ERROR] Could not fetch JWKS: {e}")
-        jwks = None
-    except Exception as e:
-        print(f"[{datetime.datetime.now()}] [AuthUtils_FATAL_ERROR] Error processing JWKS: {e}")
-        jwks = None
-else:
-    print(f"[{datetime.datetime.now()}] [AuthUtils_FATAL_ERROR] AUTH0_DOMAIN not set. Cannot fetch JWKS.")
+# Pooled client for all calls to Auth0 (JWKS, Management API tokens); closed in the app lifespan.
+auth0_http_client = httpx.AsyncClient(timeout=10.0)
+
+# --- JWKS ---
+# Keys are fetched on startup (see the app lifespan) and refreshed in the background.
+jwks_manager = JWKSManager(AUTH0_DOMAIN, auth0_http_client, JWKS_REFRESH_INTERVAL_SECONDS, JWKS_MIN_REFETCH_INTERVAL_SECONDS)
+verified_token_cache = VerifiedTokenCache(VERIFIED_TOKEN_CACHE_MAX_ENTRIES)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
@@ -58,9 +51,10 @@ class AuthHelper:
                 }
             else:
                 raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid self-host token")
-        if not jwks:
-            print(f"[{datetime.datetime.now()}] [AuthHelper_VALIDATION_ERROR] JWKS not available.")
-            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Auth service config error (JWKS).")
+        # Repeat calls with an already-verified token skip signature verification entirely.
+        cached_payload = verified_token_cache.get(token, jwks_manager.kids())
+        if cached_payload is not None:
+            return cached_payload
 
         credentials_exception = HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -72,19 +66,18 @@ class AuthHelper:
             if not token_kid:
                 raise credentials_exception
 
-            rsa_key_data = {}
-            for key_entry in jwks.get("keys", []):
-                if isinstance(key_entry, dict) and key_entry.get("kid") == token_kid:
-                    rsa_key_data = {comp: key_entry[comp] for comp in ["kty", "kid", "use", "n", "e"] if comp in key_entry}
-                    if all(k in rsa_key_data for k in ["kty", "n", "e"]): break
-            
-            if not rsa_key_data or not all(k in rsa_key_data for k in ["kty", "n", "e"]):
+            rsa_key_data = await jwks_manager.get_key(token_kid)
+            if not rsa_key_data:
+                if not jwks_manager.is_ready:
+                    print(f"[{datetime.datetime.now()}] [AuthHelper_VALIDATION_ERROR] JWKS not available.")
+                    raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Auth service config error (JWKS).")
                 raise credentials_exception
 
             payload = jwt.decode(
                 token, rsa_key_data, algorithms=ALGORITHMS,
                 audience=AUTH0_AUDIENCE, issuer=f"https://{AUTH0_DOMAIN}/"
             )
+            verified_token_cache.put(token, token_kid, payload)
             return payload
         except JWTError as e:
             print(f"[{datetime.datetime.now()}] [AuthHelper_VALIDATION_ERROR] JWT Error: {e}")
@@ -209,30 +202,10 @@ def aes_decrypt(encrypted_data: str) -> str:
     return unpadded_data.decode()
 
 # --- Auth0 Management API Token ---
-def get_management_token() -> str:
-    if not all([AUTH0_DOMAIN, AUTH0_MANAGEMENT_CLIENT_ID, AUTH0_MANAGEMENT_CLIENT_SECRET]):
-        print(f"[{datetime.datetime.now()}] [AuthUtils_MGMT_TOKEN_ERROR] Auth0 Management API credentials not fully configured.")
-        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Auth0 Management API config error.")
-    
-    url = f"https://{AUTH0_DOMAIN}/oauth/token"
-    payload = {
-        "grant_type": "client_credentials",
-        "client_id": AUTH0_MANAGEMENT_CLIENT_ID,
-        "client_secret": AUTH0_MANAGEMENT_CLIENT_SECRET,
-        "audience": f"https://{AUTH0_DOMAIN}/api/v2/",
-    }
-    headers = {"Content-Type": "application/x-www-form-urlencoded"}
-    try:
-        response = requests.post(url, data=payload, headers=headers, timeout=10)
-        response.raise_for_status()
-        token_data = response.json()
-        access_token = token_data.get("access_token")
-        if not access_token:
-            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Invalid token response from Auth0 Mgmt API.")
-        return access_token
-    except requests.exceptions.RequestException as e:
-        print(f"[{datetime.datetime.now()}] [AuthUtils_MGMT_TOKEN_ERROR] Failed to get management token: {e}")
-        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=f"Failed to get management token: {e}")
-    except Exception as e:
-        print(f"[{datetime.datetime.now()}] [AuthUtils_MGMT_TOKEN_ERROR] Error processing management token response: {e}")
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Error processing management token response.")
\ No newline at end of file
+management_token_provider = ManagementTokenProvider(
+    AUTH0_DOMAIN, AUTH0_MANAGEMENT_CLIENT_ID, AUTH0_MANAGEMENT_CLIENT_SECRET,
+    auth0_http_client, AUTH0_MANAGEMENT_TOKEN_REFRESH_AHEAD_SECONDS
+)
+
+async def get_management_token() -> str:
+    return await management_token_provider.get_token()
@@ -0,0 +1,114 @@
+import time
+import asyncio
+import logging
+from collections import Counter
+from contextlib import asynccontextmanager
+
+from main.config import (CHAT_MAX_CONCURRENT_GENERATIONS, CHAT_MAX_QUEUED_GENERATIONS,
+                         CHAT_MAX_IN_FLIGHT_PER_USER, CHAT_QUEUE_TIMEOUT_SECONDS, CHAT_RETRY_AFTER_SECONDS)
+from main.chat.metrics import chat_queue_wait_histogram, chat_run_time_histogram
+
+logger = logging.getLogger(__name__)
+
+
+class ChatCapacityExceeded(Exception):
+    """Raised when a chat request cannot be queued; `retry_after` is in seconds."""
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class ChatAdmissionController:
+    """
+    Bounds chat agent runs: at most `max_in_flight` run at once, at most `max_queued`
+    wait for a slot, and each user may hold at most `max_per_user` of either, so one
+    client cannot fill the queue for everyone else.
+    """
+    def __init__(self, max_in_flight: int, max_queued: int, max_per_user: int, queue_timeout: float):
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self.max_in_flight = max_in_flight
+        self.max_queued = max_queued
+        self.max_per_user = max_per_user
+        self.queue_timeout = queue_timeout
+        self._reserved = 0
+        self._running = 0
+        self._per_user = Counter()
+        self.rejected = 0
+
+    def reserve(self, user_id: str) -> "ChatTicket":
+        """
+        Claims a place for the request before the response starts streaming, so that
+        over-capacity requests can still be answered with a 429.
+        """
+        if self._per_user[user_id] >= self.max_per_user:
+            self.rejected += 1
+            raise ChatCapacityExceeded("Too many concurrent chat requests for this user.", CHAT_RETRY_AFTER_SECONDS)
+        if self._reserved >= self.max_in_flight + self.max_queued:
+            self.rejected += 1
+            raise ChatCapacityExceeded("Chat service is at capacity.", CHAT_RETRY_AFTER_SECONDS)
+        self._reserved += 1
+        self._per_user[user_id] += 1
+        return ChatTicket(self, user_id)
+
+    def _release_reservation(self, user_id: str):
+        self._reserved -= 1
+        self._per_user[user_id] -= 1
+        if self._per_user[user_id] <= 0:
+            del self._per_user[user_id]
+
+    @asynccontextmanager
+    async def slot(self, ticket: "ChatTicket"):
+        """Waits for a free run slot for a reserved request and holds it for the whole run."""
+        acquired = False
+        queued_at = time.monotonic()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+            acquired = True
+            chat_queue_wait_histogram.observe(time.monotonic() - queued_at)
+            self._running += 1
+            started_at = time.monotonic()
+            try:
+                yield
+            finally:
+                self._running -= 1
+                chat_run_time_histogram.observe(time.monotonic() - started_at)
+        except asyncio.TimeoutError:
+            if acquired:
+                raise
+            chat_queue_wait_histogram.observe(time.monotonic() - queued_at)
+            raise ChatCapacityExceeded("Timed out waiting for a free chat slot.", CHAT_RETRY_AFTER_SECONDS)
+        finally:
+            if acquired:
+                self._semaphore.release()
+            ticket.release()
+
+    def snapshot(self) -> dict:
+        return {
+            "max_in_flight": self.max_in_flight,
+            "max_queued": self.max_queued,
+            "running": self._running,
+            "queued": self._reserved - self._running,
+            "rejected": self.rejected,
+        }
+
+
+class ChatTicket:
+    """A reservation from `ChatAdmissionController.reserve`. Releasing it more than once is a no-op."""
+    def __init__(self, controller: ChatAdmissionController, user_id: str):
+        self._controller = controller
+        self._user_id = user_id
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._controller._release_reservation(self._user_id)
+
+
+chat_admission = ChatAdmissionController(
+    max_in_flight=CHAT_MAX_CONCURRENT_GENERATIONS,
+    max_queued=CHAT_MAX_QUEUED_GENERATIONS,
+    max_per_user=CHAT_MAX_IN_FLIGHT_PER_USER,
+    queue_timeout=CHAT_QUEUE_TIMEOUT_SECONDS,
+)
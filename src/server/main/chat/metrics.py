@@ -0,0 +1,92 @@
+import threading
+from typing import Any, Dict, Optional
+
+
+class ChatGenerationStats:
+    """Process-wide counters for chat agent runs."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        # Work done after the client went away, before the worker noticed the cancel token.
+        self.wasted_steps = 0
+        self.wasted_seconds = 0.0
+
+    def record_started(self):
+        with self._lock:
+            self.started += 1
+
+    def record_completed(self):
+        with self._lock:
+            self.completed += 1
+
+    def record_failed(self):
+        with self._lock:
+            self.failed += 1
+
+    def record_cancelled(self, wasted_steps: int, wasted_seconds: float):
+        with self._lock:
+            self.cancelled += 1
+            self.wasted_steps += wasted_steps
+            self.wasted_seconds += wasted_seconds
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "started": self.started,
+                "completed": self.completed,
+                "failed": self.failed,
+                "cancelled": self.cancelled,
+                "wasted_steps": self.wasted_steps,
+                "wasted_seconds": round(self.wasted_seconds, 3),
+            }
+
+
+chat_generation_stats = ChatGenerationStats()
+
+
+class LatencyHistogram:
+    """Latency histogram with fixed millisecond buckets; each bucket counts observations up to its bound."""
+    BUCKETS_MS = (10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000, 120000)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = [0] * (len(self.BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+
+    def observe(self, seconds: float):
+        ms = seconds * 1000
+        index = next((i for i, bound in enumerate(self.BUCKETS_MS) if ms <= bound), len(self.BUCKETS_MS))
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.total_ms += ms
+
+    def _quantile(self, q: float) -> Optional[float]:
+        # Upper bound of the bucket containing the q-th observation; None if it is past the last bound.
+        target = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self._counts):
+            seen += bucket_count
+            if seen >= target:
+                return float(self.BUCKETS_MS[index]) if index < len(self.BUCKETS_MS) else None
+        return 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            buckets = {f"le_{bound}ms": c for bound, c in zip(self.BUCKETS_MS, self._counts)}
+            buckets[f"gt_{self.BUCKETS_MS[-1]}ms"] = self._counts[-1]
+            return {
+                "count": self.count,
+                "avg_ms": round(self.total_ms / self.count, 1) if self.count else 0.0,
+                "p50_ms": self._quantile(0.5) if self.count else 0.0,
+                "p99_ms": self._quantile(0.99) if self.count else 0.0,
+                "buckets": buckets,
+            }
+
+
+chat_queue_wait_histogram = LatencyHistogram()
+chat_run_time_histogram = LatencyHistogram()
@@ -4,11 +4,15 @@ import json
 from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 import asyncio
 import logging
+import weakref
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.responses import JSONResponse, StreamingResponse
 
 from main.chat.models import ChatMessageInput
 from main.chat.utils import generate_chat_llm_stream
+from main.chat.admission import chat_admission, ChatCapacityExceeded
+from main.chat.metrics import chat_generation_stats, chat_queue_wait_histogram, chat_run_time_histogram
+from main.mcp_cache import get_mcp_cache_stats
 from main.auth.utils import PermissionChecker
 from main.dependencies import mongo_manager
 
@@ -24,7 +28,7 @@ async def chat_endpoint(
     user_id: str = Depends(PermissionChecker(required_permissions=["read:chat", "write:chat"]))
 ):
     # Fetch comprehensive user context
-    user_profile = await mongo_manager.get_user_profile(user_id)
+    user_profile = await mongo_manager.get_user_profile_fields(user_id, ["userData.personalInfo", "userData.preferences"])
     user_data = user_profile.get("userData", {}) if user_profile else {}
     personal_info = user_data.get("personalInfo", {})
     preferences = user_data.get("preferences", {})
@@ -39,20 +43,34 @@ async def chat_endpoint(
     # The new stateless chat sends the entire message history.
     # We no longer save or retrieve history from the database here.
     
+    # Reject over-capacity requests while a 429 can still be sent; the slot itself is awaited in the stream.
+    try:
+        ticket = chat_admission.reserve(user_id)
+    except ChatCapacityExceeded as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=e.reason,
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
     async def event_stream_generator():
         try:
-            async for event in generate_chat_llm_stream(
-                user_id,
-                request_body.messages,
-                user_context,
-                preferences,
-                db_manager=mongo_manager
-            ):
-                if not event:
-                    continue
-                print(f"[INFO] Streaming event to user {user_id}: {json.dumps(event)}")
-                # yield as bytes and flush
-                yield json.dumps(event) + "\n"
+            async with chat_admission.slot(ticket):
+                async for event in generate_chat_llm_stream(
+                    user_id,
+                    request_body.messages,
+                    user_context,
+                    preferences,
+                    db_manager=mongo_manager
+                ):
+                    if not event:
+                        continue
+                    print(f"[INFO] Streaming event to user {user_id}: {json.dumps(event)}")
+                    # yield as bytes and flush
+                    yield json.dumps(event) + "\n"
+        except ChatCapacityExceeded as e:
+            print(f"[WARN] Chat request for user {user_id} not started: {e.reason}")
+            yield json.dumps({"type": "error", "message": "The assistant is busy right now. Please try again in a moment."}) + "\n"
         except asyncio.CancelledError:
             print(f"[INFO] Client disconnected, stream cancelled for user {user_id}.")
         except Exception as e:
@@ -63,12 +81,29 @@ async def chat_endpoint(
             }
             yield (json.dumps(error_response) + "\n").encode("utf-8")
 
+    stream = event_stream_generator()
+    # If the client disconnects before the stream starts, the slot context never runs.
+    weakref.finalize(stream, ticket.release)
+
     return StreamingResponse(
-        event_stream_generator(),
+        stream,
         media_type="application/x-ndjson",
         headers={
             "Cache-Control": "no-cache",
             "X-Accel-Buffering": "no",  # Disable Nginx buffering
             "Transfer-Encoding": "chunked",  # Hint chunked encoding
         }
-    )
\ No newline at end of file
+    )
+
+@router.get("/metrics", summary="Chat Execution Pool Metrics")
+async def chat_metrics(
+    # Process-wide operational stats, not the caller's data: only for operators granted read:metrics.
+    user_id: str = Depends(PermissionChecker(required_permissions=["read:metrics"]))
+):
+    return JSONResponse(content={
+        "pool": chat_admission.snapshot(),
+        "generations": chat_generation_stats.snapshot(),
+        "queue_wait": chat_queue_wait_histogram.snapshot(),
+        "run_time": chat_run_time_histogram.snapshot(),
+        "mcp_cache": get_mcp_cache_stats(),
+    })
@@ -0,0 +1,115 @@
+import re
+import math
+import logging
+from collections import Counter
+from typing import Dict, List, Tuple, Any
+
+from main.config import INTEGRATIONS_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# Words and phrases users say when they mean a tool, beyond what its description covers.
+# Multi-word aliases are matched as phrases; single words also feed the TF-IDF vectors.
+TOOL_ALIASES: Dict[str, List[str]] = {
+    "github": ["github", "repo", "repository", "pull request", "pr", "issue", "commit", "code"],
+    "gdrive": ["drive", "google drive", "file", "folder", "pdf", "upload", "document"],
+    "gcalendar": ["calendar", "meeting", "event", "schedule", "appointment", "agenda", "invite", "today", "tomorrow", "busy", "free"],
+    "gmail": ["email", "emails", "mail", "inbox", "gmail", "unread", "reply", "send", "draft", "forward", "sender"],
+    "gdocs": ["doc", "docs", "google doc", "write up", "report", "essay", "document"],
+    "gslides": ["slides", "slide", "presentation", "deck", "powerpoint", "pitch"],
+    "gsheets": ["sheet", "sheets", "spreadsheet", "excel", "table", "rows", "columns"],
+    "gpeople": ["contact", "contacts", "phone number", "address book", "email address"],
+    "gmaps": ["map", "maps", "directions", "route", "near me", "nearby", "restaurant", "address", "distance", "commute"],
+    "gshopping": ["buy", "shop", "shopping", "price", "product", "purchase", "deal", "cheap"],
+    "slack": ["slack", "channel", "workspace", "dm", "thread"],
+    "notion": ["notion", "page", "wiki", "notes", "database"],
+    "news": ["news", "headline", "headlines", "article", "latest"],
+    "internet_search": ["search", "google", "look up", "web", "online", "latest"],
+    "accuweather": ["weather", "forecast", "rain", "temperature", "sunny", "umbrella", "hot", "cold"],
+    "quickchart": ["chart", "graph", "plot", "visualize", "visualization", "bar chart", "pie chart"],
+    "journal": ["journal", "diary", "note", "remind", "reminder", "todo", "to do"],
+    "supermemory": ["remember", "memory", "recall", "forget", "about me", "my favorite"],
+}
+
+_STOPWORDS = {
+    "a", "an", "the", "and", "or", "to", "of", "in", "on", "for", "with", "by", "at", "from", "is", "are",
+    "be", "it", "this", "that", "as", "can", "you", "your", "my", "me", "i", "we", "our", "do", "does",
+    "please", "could", "would", "will", "what", "which", "about", "how", "any", "some", "all", "more", "such", "like",
+    "agent", "allows", "enables", "user", "using", "use", "new", "get", "manage", "them", "their",
+}
+
+
+def _stem(token: str) -> str:
+    for suffix in ("ing", "ies", "es", "ed", "s"):
+        if len(token) > len(suffix) + 2 and token.endswith(suffix):
+            return token[:-len(suffix)] + ("y" if suffix == "ies" else "")
+    return token
+
+
+def _tokenize(text: str) -> List[str]:
+    return [_stem(t) for t in re.findall(r"[a-z0-9]+", text.lower()) if t not in _STOPWORDS]
+
+
+class LocalToolRouter:
+    """
+    Scores a query against every integration using TF-IDF vectors built once from
+    the integration descriptions and alias table, plus exact alias phrase matches.
+    """
+    def __init__(self, integrations: Dict[str, Dict[str, Any]], aliases: Dict[str, List[str]]):
+        documents: Dict[str, Counter] = {}
+        self._phrases: Dict[str, List[str]] = {}
+        for tool_name, config in integrations.items():
+            tool_aliases = aliases.get(tool_name, [])
+            text = " ".join([tool_name.replace("_", " "), config.get("display_name", ""), config.get("description", "")])
+            terms = Counter(_tokenize(text))
+            # Aliases count double: they are the words users actually type.
+            for alias in tool_aliases:
+                for token in _tokenize(alias):
+                    terms[token] += 2
+            documents[tool_name] = terms
+            self._phrases[tool_name] = [a.lower() for a in tool_aliases if " " in a]
+
+        doc_freq = Counter(token for terms in documents.values() for token in terms)
+        total_docs = len(documents)
+        self._idf = {token: math.log((1 + total_docs) / (1 + df)) + 1.0 for token, df in doc_freq.items()}
+        self._vectors = {name: self._normalize(self._weigh(terms)) for name, terms in documents.items()}
+
+    def _weigh(self, terms: Counter) -> Dict[str, float]:
+        return {t: (1 + math.log(c)) * self._idf[t] for t, c in terms.items() if t in self._idf}
+
+    @staticmethod
+    def _normalize(vector: Dict[str, float]) -> Dict[str, float]:
+        norm = math.sqrt(sum(v * v for v in vector.values()))
+        return {t: v / norm for t, v in vector.items()} if norm else {}
+
+    def score(self, query: str, candidates: List[str]) -> Dict[str, float]:
+        query_vector = self._normalize(self._weigh(Counter(_tokenize(query))))
+        lowered = f" {query.lower()} "
+        scores = {}
+        for tool_name in candidates:
+            tool_vector = self._vectors.get(tool_name)
+            if not tool_vector:
+                continue
+            cosine = sum(weight * tool_vector.get(token, 0.0) for token, weight in query_vector.items())
+            phrase_hit = any(f" {phrase} " in lowered for phrase in self._phrases.get(tool_name, []))
+            scores[tool_name] = max(cosine, 1.0 if phrase_hit else 0.0)
+        return scores
+
+    def route(self, query: str, candidates: List[str], min_score: float) -> Tuple[List[str], float]:
+        """
+        Returns the tools scoring at least `min_score`, best first, and a confidence
+        value (the top score) the caller can compare against its threshold.
+        """
+        scores = self.score(query, candidates)
+        if not scores:
+            return [], 0.0
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        selected = [name for name, value in ranked if value >= min_score]
+        return selected, ranked[0][1]
+
+
+_router = LocalToolRouter(INTEGRATIONS_CONFIG, TOOL_ALIASES)
+
+
+def route_tools_locally(query: str, available_tools: List[str], min_score: float) -> Tuple[List[str], float]:
+    return _router.route(query, available_tools, min_score)
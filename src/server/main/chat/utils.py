@@ -5,18 +5,61 @@ import json
 import asyncio
 import logging
 import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 from typing import List, Dict, Any, Tuple, AsyncGenerator, Optional
 
 from main.db import MongoManager
 from main.llm import get_qwen_assistant
-from main.config import INTEGRATIONS_CONFIG, SUPERMEMORY_MCP_BASE_URL, SUPERMEMORY_MCP_ENDPOINT_SUFFIX
+from main.config import (INTEGRATIONS_CONFIG, SUPERMEMORY_MCP_BASE_URL, SUPERMEMORY_MCP_ENDPOINT_SUFFIX,
+                         CHAT_TOOL_ROUTER_MODE, CHAT_TOOL_ROUTER_CONFIDENCE_THRESHOLD, CHAT_TOOL_ROUTER_MIN_SCORE,
+                         CHAT_MAX_CONCURRENT_GENERATIONS)
+from main.chat.tool_router import route_tools_locally
+from main.chat.metrics import chat_generation_stats
 from main.chat.prompts import TOOL_SELECTOR_SYSTEM_PROMPT
 from json_extractor import JsonExtractor
 
 logger = logging.getLogger(__name__)
 
+# Agent runs are blocking generators; run them on a bounded pool instead of one thread per request.
+_chat_executor = ThreadPoolExecutor(max_workers=CHAT_MAX_CONCURRENT_GENERATIONS, thread_name_prefix="chat-agent")
+
+class CancelToken:
+    """Set from the event loop when the client disconnects; polled by the worker thread."""
+    def __init__(self):
+        self._event = threading.Event()
+        self.cancelled_at: Optional[float] = None
+
+    def cancel(self):
+        if not self._event.is_set():
+            self.cancelled_at = time.monotonic()
+            self._event.set()
+
+    @property
+    def is_cancelled(self) -> bool:
+        return self._event.is_set()
+
 async def _select_relevant_tools(query: str, available_tools_map: Dict[str, str]) -> List[str]:
+    """
+    Selects the tools relevant to a query according to CHAT_TOOL_ROUTER_MODE.
+    In "hybrid" mode the local router answers unless its confidence is below
+    CHAT_TOOL_ROUTER_CONFIDENCE_THRESHOLD, in which case the LLM selector is used.
+    """
+    if not available_tools_map:
+        return []
+    if CHAT_TOOL_ROUTER_MODE == "llm":
+        return await _select_relevant_tools_llm(query, available_tools_map)
+
+    selected_tools, confidence = route_tools_locally(query, list(available_tools_map.keys()), CHAT_TOOL_ROUTER_MIN_SCORE)
+    if CHAT_TOOL_ROUTER_MODE == "local" or confidence >= CHAT_TOOL_ROUTER_CONFIDENCE_THRESHOLD:
+        logger.info(f"Local tool router selected {selected_tools} (confidence={confidence:.2f})")
+        return selected_tools
+
+    logger.info(f"Local tool router confidence {confidence:.2f} below threshold; falling back to LLM selector.")
+    return await _select_relevant_tools_llm(query, available_tools_map)
+
+async def _select_relevant_tools_llm(query: str, available_tools_map: Dict[str, str]) -> List[str]:
     """
     Uses a lightweight LLM call to select relevant tools for a given query.
     This now runs the synchronous generator in a thread to avoid blocking.
@@ -28,7 +71,7 @@ async def _select_relevant_tools(query: str, available_tools_map: Dict[str, str]
         tools_description = "\n".join(f"- `{name}`: {desc}" for name, desc in available_tools_map.items())
         prompt = f"User Query: \"{query}\"\n\nAvailable Tools:\n{tools_description}"
 
-        selector_agent = get_qwen_assistant(system_message=TOOL_SELECTOR_SYSTEM_PROMPT, function_list=[])
+        selector_agent = get_qwen_assistant(system_message=TOOL_SELECTOR_SYSTEM_PROMPT, function_list=[], agent_kind="tool_selector")
         messages = [{'role': 'user', 'content': prompt}]
 
         def _run_selector_sync():
@@ -41,8 +84,8 @@ async def _select_relevant_tools(query: str, available_tools_map: Dict[str, str]
                         final_content_str = last_message["content"]
             return final_content_str
 
-        # Run the synchronous function in a separate thread
-        final_content_str = await asyncio.to_thread(_run_selector_sync)
+        # Run the synchronous function on the bounded chat pool
+        final_content_str = await asyncio.get_running_loop().run_in_executor(_chat_executor, _run_selector_sync)
         
         selected_tools = JsonExtractor.extract_valid_json(final_content_str)
         if isinstance(selected_tools, list):
@@ -79,7 +122,7 @@ async def generate_chat_llm_stream(
 
         current_user_time = datetime.datetime.now(user_timezone).strftime('%Y-%m-%d %H:%M:%S %Z')
 
-        user_profile = await db_manager.get_user_profile(user_id)
+        user_profile = await db_manager.get_user_profile_fields(user_id, ["userData.integrations", "userData.supermemory_user_id"])
         user_integrations = user_profile.get("userData", {}).get("integrations", {}) if user_profile else {}
         supermemory_user_id = user_profile.get("userData", {}).get("supermemory_user_id") if user_profile else None
         
@@ -125,7 +168,7 @@ async def generate_chat_llm_stream(
 
     loop = asyncio.get_running_loop()
     queue: asyncio.Queue[Optional[Any]] = asyncio.Queue()
-    stream_interrupted = False
+    cancel_token = CancelToken()
     
     # Dynamically construct persona instructions
     agent_name = preferences.get('agentName', 'Sentient')
@@ -153,45 +196,66 @@ async def generate_chat_llm_stream(
     )
 
     def worker():
+        chat_generation_stats.record_started()
+        wasted_steps = 0
+        failed = False
         try:
-            qwen_assistant = get_qwen_assistant(system_message=system_prompt, function_list=tools)
+            qwen_assistant = get_qwen_assistant(system_message=system_prompt, function_list=tools, agent_kind="chat")
             qwen_formatted_history = [{"role": msg["role"], "content": msg["content"]} for msg in messages]
             for new_history_step in qwen_assistant.run(messages=qwen_formatted_history):
+                # Checked before the generator is resumed, which is where the agent would make
+                # its next LLM or tool call. Closing the generator stops the run.
+                if cancel_token.is_cancelled:
+                    wasted_steps += 1
+                    break
                 loop.call_soon_threadsafe(queue.put_nowait, new_history_step)
         except Exception as e:
+            failed = True
             logger.error(f"Error in chat worker thread for user {user_id}: {e}", exc_info=True)
             loop.call_soon_threadsafe(queue.put_nowait, {"_error": str(e)})
         finally:
+            # Exactly one outcome per run; a run the client abandoned counts as cancelled even if it then failed.
+            if cancel_token.is_cancelled:
+                wasted_seconds = time.monotonic() - cancel_token.cancelled_at
+                chat_generation_stats.record_cancelled(wasted_steps, wasted_seconds)
+                logger.info(f"Chat generation for user {user_id} cancelled after client disconnect ({wasted_seconds:.2f}s to stop). Stats: {chat_generation_stats.snapshot()}")
+            elif failed:
+                chat_generation_stats.record_failed()
+            else:
+                chat_generation_stats.record_completed()
             loop.call_soon_threadsafe(queue.put_nowait, None)
 
-    thread = threading.Thread(target=worker, daemon=True)
-    thread.start()
+    loop.run_in_executor(_chat_executor, worker)
 
+    stream_builder_finished = False
     try:
-        last_yielded_content_str = ""
+        stream_builder = TurnStreamBuilder()
         while True:
             current_history = await queue.get()
             if current_history is None:
+                stream_builder_finished = True
+                new_chunk = stream_builder.finish()
+                if new_chunk:
+                    yield {"type": "assistantStream", "token": new_chunk, "done": False, "messageId": assistant_message_id}
                 break
             if isinstance(current_history, dict) and "_error" in current_history:
                 raise Exception(f"Qwen Agent worker failed: {current_history['_error']}")
             if not isinstance(current_history, list):
                 continue
-            
-            assistant_turn_start_index = next((i + 1 for i in range(len(current_history) - 1, -1, -1) if current_history[i].get('role') == 'user'), 0)
-            assistant_messages = current_history[assistant_turn_start_index:]
-            current_turn_str = "".join(msg_to_str(m) for m in assistant_messages)
-            if len(current_turn_str) > len(last_yielded_content_str):
-                new_chunk = current_turn_str[len(last_yielded_content_str):]
+
+            new_chunk = stream_builder.update(current_history)
+            if new_chunk:
                 yield {"type": "assistantStream", "token": new_chunk, "done": False, "messageId": assistant_message_id}
-                last_yielded_content_str = current_turn_str
     except asyncio.CancelledError:
-        stream_interrupted = True
+        cancel_token.cancel()
         raise
     except Exception as e:
         logger.error(f"Error during main chat agent run for user {user_id}: {e}", exc_info=True)
         yield {"type": "error", "message": "An unexpected error occurred in the chat agent."}
     finally:
+        # Covers the generator being closed without a CancelledError as well.
+        if not stream_builder_finished:
+            cancel_token.cancel()
         yield {"type": "assistantStream", "token": "", "done": True, "messageId": assistant_message_id}
 
 def msg_to_str(msg: Dict[str, Any]) -> str:
@@ -207,4 +271,68 @@ def msg_to_str(msg: Dict[str, Any]) -> str:
         return f"<tool_result tool_name=\"{msg.get('name')}\">\n{content_pretty}\n</tool_result>\n"
     elif msg.get('role') == 'assistant' and msg.get('content'):
         return msg.get('content', '')
-    return ''
\ No newline at end of file
+    return ''
+
+def _is_complete_json(text: str) -> bool:
+    try:
+        json.loads(text)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+class TurnStreamBuilder:
+    """
+    Converts the successive history snapshots yielded by the qwen agent into only the
+    text that is new since the previous snapshot.
+
+    Earlier messages in a snapshot never change, so the builder keeps a cursor on the
+    message currently being streamed and how much of it has been sent. Assistant text
+    is emitted as a suffix; tool calls and tool results are formatted with `msg_to_str`
+    exactly once, when complete, so their output stays a prefix of the final turn.
+    """
+    def __init__(self):
+        self._turn_start: Optional[int] = None
+        self._index = 0
+        self._emitted_chars = 0
+        self._block_emitted = False
+        self._last_history: List[Dict[str, Any]] = []
+
+    def update(self, history: List[Dict[str, Any]]) -> str:
+        self._last_history = history
+        if self._turn_start is None:
+            self._turn_start = next((i + 1 for i in range(len(history) - 1, -1, -1) if history[i].get('role') == 'user'), 0)
+            self._index = self._turn_start
+
+        parts = []
+        while self._index < len(history):
+            is_last = self._index == len(history) - 1
+            parts.append(self._advance(history[self._index], complete=not is_last))
+            if is_last:
+                break
+            self._index += 1
+            self._emitted_chars = 0
+            self._block_emitted = False
+        return "".join(parts)
+
+    def finish(self) -> str:
+        """Flushes a trailing tool call whose arguments never became valid JSON."""
+        if self._last_history and self._index < len(self._last_history):
+            return self._advance(self._last_history[self._index], complete=True)
+        return ""
+
+    def _advance(self, msg: Dict[str, Any], complete: bool) -> str:
+        role = msg.get('role')
+        if role == 'assistant' and not msg.get('function_call'):
+            content = msg.get('content')
+            if not isinstance(content, str) or len(content) <= self._emitted_chars:
+                return ""
+            new_text = content[self._emitted_chars:]
+            self._emitted_chars = len(content)
+            return new_text
+
+        if self._block_emitted or role not in ('assistant', 'function'):
+            return ""
+        if role == 'assistant' and not complete and not _is_complete_json(msg['function_call'].get('arguments', '')):
+            return ""  # Arguments are still streaming
+        self._block_emitted = True
+        return msg_to_str(msg)
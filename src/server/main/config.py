@@ -39,6 +39,13 @@ SELF_HOST_AUTH_SECRET = os.getenv("SELF_HOST_AUTH_SECRET")
 # For Management API
 AUTH0_MANAGEMENT_CLIENT_ID = os.getenv("AUTH0_MANAGEMENT_CLIENT_ID")
 AUTH0_MANAGEMENT_CLIENT_SECRET = os.getenv("AUTH0_MANAGEMENT_CLIENT_SECRET")
+# Mint a new Management API token in the background once the current one is this close to expiry
+AUTH0_MANAGEMENT_TOKEN_REFRESH_AHEAD_SECONDS = int(os.getenv("AUTH0_MANAGEMENT_TOKEN_REFRESH_AHEAD_SECONDS", 300))
+# JWKS refresh, and the rate limit on refetching when a token names an unknown signing key
+JWKS_REFRESH_INTERVAL_SECONDS = int(os.getenv("JWKS_REFRESH_INTERVAL_SECONDS", 3600))
+JWKS_MIN_REFETCH_INTERVAL_SECONDS = int(os.getenv("JWKS_MIN_REFETCH_INTERVAL_SECONDS", 60))
+# Already-verified bearer tokens kept in memory until they expire
+VERIFIED_TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("VERIFIED_TOKEN_CACHE_MAX_ENTRIES", 10000))
 
 # Google OAuth Configuration
 GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
@@ -61,6 +68,19 @@ NEWS_API_KEY = os.getenv("NEWS_API_KEY")
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/")
 MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "sentient_agent_db")
 
+# In-process user profile cache. Set PROFILE_CACHE_REDIS_URL when running several server
+# processes so a profile write in one invalidates the others.
+PROFILE_CACHE_TTL_SECONDS = int(os.getenv("PROFILE_CACHE_TTL_SECONDS", 60))
+PROFILE_CACHE_MAX_ENTRIES = int(os.getenv("PROFILE_CACHE_MAX_ENTRIES", 5000))
+PROFILE_CACHE_REDIS_URL = os.getenv("PROFILE_CACHE_REDIS_URL")
+
+# Read notifications older than this are removed by a TTL index. Unread ones are kept until
+# read or deleted, so the per-user unread counter never counts an expired notification.
+NOTIFICATION_TTL_DAYS = int(os.getenv("NOTIFICATION_TTL_DAYS", 90))
+
+# Most journal blocks a single request can return; larger ranges continue with a cursor
+JOURNAL_MAX_BLOCKS_PER_REQUEST = int(os.getenv("JOURNAL_MAX_BLOCKS_PER_REQUEST", 500))
+
 # AES Encryption Keys
 AES_SECRET_KEY_HEX = os.getenv("AES_SECRET_KEY")
 AES_IV_HEX = os.getenv("AES_IV")
@@ -328,6 +348,27 @@ CHAT_TOOLS_MCP_SERVER_URL=os.getenv("CHAT_TOOLS_MCP_SERVER_URL", "http://localho
 SUPERMEMORY_MCP_BASE_URL = os.getenv("SUPERMEMORY_MCP_BASE_URL", "https://mcp.supermemory.ai/")
 SUPERMEMORY_MCP_ENDPOINT_SUFFIX = os.getenv("SUPERMEMORY_MCP_ENDPOINT_SUFFIX", "/sse")
 
+# Chat tool selection: "llm" asks the model, "local" uses the keyword/TF-IDF router only,
+# "hybrid" uses the local router and falls back to the LLM when its confidence is low.
+# Measure the thresholds with `python -m scripts.bench_tool_router` before enabling hybrid.
+CHAT_TOOL_ROUTER_MODE = os.getenv("CHAT_TOOL_ROUTER_MODE", "llm").lower()
+CHAT_TOOL_ROUTER_CONFIDENCE_THRESHOLD = float(os.getenv("CHAT_TOOL_ROUTER_CONFIDENCE_THRESHOLD", 0.25))
+CHAT_TOOL_ROUTER_MIN_SCORE = float(os.getenv("CHAT_TOOL_ROUTER_MIN_SCORE", 0.2))
+
+# Maximum number of chat agent runs executing at once in this server process
+CHAT_MAX_CONCURRENT_GENERATIONS = int(os.getenv("CHAT_MAX_CONCURRENT_GENERATIONS", 8))
+# Requests beyond the running ones wait in a bounded queue; past that, or past the per-user
+# limit, they are rejected with 429 and Retry-After.
+CHAT_MAX_QUEUED_GENERATIONS = int(os.getenv("CHAT_MAX_QUEUED_GENERATIONS", 16))
+CHAT_MAX_IN_FLIGHT_PER_USER = int(os.getenv("CHAT_MAX_IN_FLIGHT_PER_USER", 2))
+CHAT_QUEUE_TIMEOUT_SECONDS = float(os.getenv("CHAT_QUEUE_TIMEOUT_SECONDS", 30))
+CHAT_RETRY_AFTER_SECONDS = int(os.getenv("CHAT_RETRY_AFTER_SECONDS", 5))
+
+# Push notifications. Gmail pushes arrive through a Cloud Pub/Sub push subscription whose endpoint
+# URL carries ?token=<GMAIL_PUSH_VERIFICATION_TOKEN>; Calendar channels are authenticated with
+# tokens signed by PUSH_NOTIFICATION_SECRET (see workers/utils/push_tokens.py).
+GMAIL_PUSH_VERIFICATION_TOKEN = os.getenv("GMAIL_PUSH_VERIFICATION_TOKEN")
+
 print(f"[{datetime.datetime.now()}] [MainServer_Config] Configuration loaded. AUTH0_DOMAIN: {'SET' if AUTH0_DOMAIN else 'NOT SET'}")
 print(f"[{datetime.datetime.now()}] [MainServer_Config] LLM Endpoint: {OPENAI_API_BASE_URL}")
 print(f"[{datetime.datetime.now()}] [MainServer_Config] LLM Model: {OPENAI_MODEL_NAME}")
@@ -4,20 +4,70 @@ import datetime
 import uuid 
 import motor.motor_asyncio
 from pymongo import ASCENDING, DESCENDING, IndexModel, ReturnDocument
-from pymongo.errors import DuplicateKeyError
+from pymongo.errors import DuplicateKeyError, BulkWriteError
 from typing import Dict, List, Optional, Any, Tuple
 
 # Import config from the current 'main' directory
-from main.config import MONGO_URI, MONGO_DB_NAME
+from main.config import (MONGO_URI, MONGO_DB_NAME, PROFILE_CACHE_TTL_SECONDS,
+                         PROFILE_CACHE_MAX_ENTRIES, PROFILE_CACHE_REDIS_URL, NOTIFICATION_TTL_DAYS,
+                         JOURNAL_MAX_BLOCKS_PER_REQUEST)
+from main.profile_cache import ProfileCache, RedisInvalidationBus
 
 USER_PROFILES_COLLECTION = "user_profiles" 
 CHAT_HISTORY_COLLECTION = "chat_history"
-NOTIFICATIONS_COLLECTION = "notifications" 
+CHAT_MESSAGES_COLLECTION = "chat_messages"
+NOTIFICATIONS_COLLECTION = "notifications" # One document per user, holding the unread counter
+NOTIFICATION_ITEMS_COLLECTION = "notification_items"
 POLLING_STATE_COLLECTION = "polling_state_store" 
 PROCESSED_ITEMS_COLLECTION = "processed_items_log" 
 TASK_COLLECTION = "tasks"
 JOURNAL_BLOCKS_COLLECTION = "journal_blocks"
 
+def _project_document(document: Dict, fields: List[str]) -> Dict:
+    """Applies a Mongo-style inclusion projection of dotted paths to an in-memory document."""
+    projected: Dict[str, Any] = {"_id": document.get("_id")} if "_id" in document else {}
+    for field in fields:
+        source, target = document, projected
+        parts = field.split(".")
+        for part in parts[:-1]:
+            if not isinstance(source, dict) or part not in source:
+                source = None
+                break
+            source = source[part]
+            target = target.setdefault(part, {})
+        if isinstance(source, dict) and parts[-1] in source:
+            target[parts[-1]] = source[parts[-1]]
+    return projected
+
+def _encode_cursor(created_at: datetime.datetime, item_id: str) -> str:
+    return f"{created_at.isoformat()}_{item_id}"
+
+def _cursor_query(cursor: str, id_field: str, time_field: str = "created_at") -> Dict[str, Any]:
+    """Query for items after `cursor` in (time desc, id desc) order; ties are broken by id."""
+    try:
+        # ISO timestamps never contain "_", ids may: split on the first one.
+        created_at_str, last_id = cursor.split("_", 1)
+        created_at = datetime.datetime.fromisoformat(created_at_str)
+    except ValueError:
+        raise ValueError("Invalid pagination cursor.")
+    return {"$or": [
+        {time_field: {"$lt": created_at}},
+        {time_field: created_at, id_field: {"$lt": last_id}}
+    ]}
+
+# Ids for legacy chat messages and notifications that had none, derived from their position so
+# re-running a migration after an interruption produces the same ids instead of duplicates.
+_LEGACY_MESSAGE_ID_NAMESPACE = uuid.UUID("5c1a6f0e-3b8e-4d7a-9f5e-2f6a8c1d0b47")
+_LEGACY_NOTIFICATION_ID_NAMESPACE = uuid.UUID("1e52baaf-0acb-4134-bf7c-3694abf56b2c")
+
+# Fields returned for tasks in list views; the task detail endpoint returns the rest (plan,
+# progress log, result). Listed explicitly so fields added to tasks later stay out of listings.
+TASK_SUMMARY_FIELDS = ["task_id", "description", "status", "priority", "enabled", "schedule", "created_at",
+                       "updated_at", "next_execution_at", "last_execution_status"]
+
+# Fields returned for journal blocks in list views (no task progress/result payloads).
+JOURNAL_BLOCK_LIST_FIELDS = ["block_id", "page_date", "order", "content", "created_by", "linked_task_id", "task_status"]
+
 class MongoManager:
     def __init__(self):
         self.client = motor.motor_asyncio.AsyncIOMotorClient(MONGO_URI)
@@ -25,11 +75,16 @@ class MongoManager:
         
         self.user_profiles_collection = self.db[USER_PROFILES_COLLECTION]
         self.chat_history_collection = self.db[CHAT_HISTORY_COLLECTION]
+        self.chat_messages_collection = self.db[CHAT_MESSAGES_COLLECTION]
         self.notifications_collection = self.db[NOTIFICATIONS_COLLECTION]
+        self.notification_items_collection = self.db[NOTIFICATION_ITEMS_COLLECTION]
         self.polling_state_collection = self.db[POLLING_STATE_COLLECTION]
         self.processed_items_collection = self.db[PROCESSED_ITEMS_COLLECTION]
         self.task_collection = self.db[TASK_COLLECTION]
         self.journal_blocks_collection = self.db[JOURNAL_BLOCKS_COLLECTION]
+
+        self.profile_cache = ProfileCache(PROFILE_CACHE_TTL_SECONDS, PROFILE_CACHE_MAX_ENTRIES)
+        self.profile_invalidation_bus = RedisInvalidationBus(PROFILE_CACHE_REDIS_URL, self.profile_cache) if PROFILE_CACHE_REDIS_URL else None
         
         print(f"[{datetime.datetime.now()}] [MainServer_MongoManager] Initialized. Database: {MONGO_DB_NAME}")
 
@@ -46,13 +101,21 @@ class MongoManager:
             ],
             self.chat_history_collection: [
                 IndexModel([("user_id", ASCENDING), ("chat_id", ASCENDING)], name="user_chat_id_idx"),
-                IndexModel([("messages.message", "text")], name="message_text_idx"),
                 IndexModel([("user_id", ASCENDING), ("last_updated", DESCENDING)], name="chat_last_updated_idx"), # Kept for sorting chats
-                IndexModel([("user_id", ASCENDING), ("messages.timestamp", DESCENDING)], name="message_timestamp_idx", sparse=True)
+            ],
+            self.chat_messages_collection: [
+                IndexModel([("user_id", ASCENDING), ("chat_id", ASCENDING), ("timestamp", DESCENDING), ("id", DESCENDING)], name="chat_message_timeline_id_idx"),
+                IndexModel([("user_id", ASCENDING), ("chat_id", ASCENDING), ("id", ASCENDING)], unique=True, name="chat_message_id_unique_idx"),
+                IndexModel([("message", "text")], name="chat_message_text_idx")
             ],
             self.notifications_collection: [
-                IndexModel([("user_id", ASCENDING)], name="notification_user_id_idx"),
-                IndexModel([("user_id", ASCENDING), ("notifications.timestamp", DESCENDING)], name="notification_timestamp_idx", sparse=True)
+                IndexModel([("user_id", ASCENDING)], name="notification_user_id_idx")
+            ],
+            self.notification_items_collection: [
+                IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="notification_item_timeline_idx"),
+                IndexModel([("user_id", ASCENDING), ("id", ASCENDING)], unique=True, name="notification_item_id_unique_idx"),
+                IndexModel([("created_at", ASCENDING)], name="notification_item_read_ttl_idx",
+                           expireAfterSeconds=NOTIFICATION_TTL_DAYS * 86400, partialFilterExpression={"read": True})
             ],
             self.polling_state_collection: [
                 IndexModel([("user_id", ASCENDING), ("service_name", ASCENDING)], unique=True, name="polling_user_service_unique_idx"),
@@ -60,26 +123,49 @@ class MongoManager:
                     ("is_enabled", ASCENDING), ("next_scheduled_poll_time", ASCENDING), 
                     ("is_currently_polling", ASCENDING), ("error_backoff_until_timestamp", ASCENDING) 
                 ], name="polling_due_tasks_idx"),
-                IndexModel([("is_currently_polling", ASCENDING), ("last_attempted_poll_timestamp", ASCENDING)], name="polling_stale_locks_idx")
+                IndexModel([("is_currently_polling", ASCENDING), ("last_attempted_poll_timestamp", ASCENDING)], name="polling_stale_locks_idx"),
+                IndexModel([("gmail_email_address", ASCENDING)], name="polling_gmail_address_idx", sparse=True)
             ],
             self.processed_items_collection: [ 
                 IndexModel([("user_id", ASCENDING), ("service_name", ASCENDING), ("item_id", ASCENDING)], unique=True, name="processed_item_unique_idx_main"),
                 IndexModel([("processing_timestamp", DESCENDING)], name="processed_timestamp_idx_main", expireAfterSeconds=2592000) # 30 days
             ],
             self.task_collection: [
-                IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)], name="task_user_created_idx"),
+                IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("task_id", DESCENDING)], name="task_user_listing_idx"),
+                IndexModel([("user_id", ASCENDING), ("status", ASCENDING), ("created_at", DESCENDING), ("task_id", DESCENDING)], name="task_user_status_listing_idx"),
                 IndexModel([("user_id", ASCENDING), ("status", ASCENDING), ("priority", ASCENDING)], name="task_user_status_priority_idx"),
                 IndexModel([("status", ASCENDING), ("agent_id", ASCENDING)], name="task_status_agent_idx", sparse=True), 
-                IndexModel([("task_id", ASCENDING)], unique=True, name="task_id_unique_idx")
+                IndexModel([("task_id", ASCENDING)], unique=True, name="task_id_unique_idx"),
+                IndexModel([("enabled", ASCENDING), ("status", ASCENDING), ("next_execution_at", ASCENDING)], name="task_due_idx"),
+                IndexModel([("dispatch_claim", ASCENDING)], name="task_dispatch_claim_idx", sparse=True)
             ],
             self.journal_blocks_collection: [
                 IndexModel([("block_id", ASCENDING)], unique=True, name="journal_block_id_unique_idx"),
-                IndexModel([("user_id", ASCENDING), ("page_date", DESCENDING), ("order", ASCENDING)], name="journal_user_date_order_idx"),
+                # Matches the (page_date, order, block_id) read order exactly, so range reads need no in-memory sort.
+                IndexModel([("user_id", ASCENDING), ("page_date", ASCENDING), ("order", ASCENDING), ("block_id", ASCENDING)], name="journal_user_page_order_idx"),
                 IndexModel([("linked_task_id", ASCENDING)], name="journal_linked_task_idx", sparse=True),
                 IndexModel([("content", "text")], name="journal_content_text_idx")
             ]
         }
 
+        # Indexes replaced by ones above; dropped so writes stop maintaining them.
+        superseded_indexes = {
+            self.chat_messages_collection: ["chat_message_timeline_idx"],
+            # Also expired unread notifications, leaving the unread counter too high.
+            self.notification_items_collection: ["notification_item_ttl_idx"],
+            # A prefix of task_user_listing_idx.
+            self.task_collection: ["task_user_created_idx"],
+        }
+        for collection, index_names in superseded_indexes.items():
+            try:
+                existing = await collection.index_information()
+                for index_name in index_names:
+                    if index_name in existing:
+                        await collection.drop_index(index_name)
+                        print(f"[{datetime.datetime.now()}] [MainServer_DB_INIT] Dropped superseded index {index_name} on {collection.name}")
+            except Exception as e:
+                print(f"[{datetime.datetime.now()}] [MainServer_DB_ERROR] Dropping superseded indexes on {collection.name}: {e}")
+
         for collection, indexes in collections_with_indexes.items():
             try:
                 await collection.create_indexes(indexes)
@@ -89,8 +175,48 @@ class MongoManager:
 
     # --- User Profile Methods ---
     async def get_user_profile(self, user_id: str) -> Optional[Dict]:
+        """Returns the full profile document, served from the profile cache when fresh."""
         if not user_id: return None
-        return await self.user_profiles_collection.find_one({"user_id": user_id})
+        key = (user_id, ())
+        found, profile = self.profile_cache.get(key)
+        if found:
+            return profile
+        generation = self.profile_cache.generation()
+        profile = await self.user_profiles_collection.find_one({"user_id": user_id})
+        self.profile_cache.put(key, profile, generation)
+        return profile
+
+    async def get_user_profile_fields(self, user_id: str, fields: List[str]) -> Optional[Dict]:
+        """
+        Returns only the given dotted paths of the profile (e.g. ["userData.preferences"]),
+        shaped like the full document. Avoids loading credentials and other large
+        sub-documents for call sites that only need a few settings.
+        """
+        if not user_id: return None
+        found, profile = self.profile_cache.get((user_id, ()))
+        if found:
+            return _project_document(profile, fields) if profile else None
+
+        key = (user_id, tuple(sorted(fields)))
+        found, projected = self.profile_cache.get(key)
+        if found:
+            return projected
+        generation = self.profile_cache.generation()
+        projected = await self.user_profiles_collection.find_one(
+            {"user_id": user_id}, {field: 1 for field in fields}
+        )
+        self.profile_cache.put(key, projected, generation)
+        return projected
+
+    async def invalidate_user_profile(self, user_id: str):
+        """Drops cached profile data for a user here and, if configured, in other server processes."""
+        self.profile_cache.invalidate(user_id)
+        if self.profile_invalidation_bus:
+            await self.profile_invalidation_bus.publish(user_id)
+
+    def start_profile_invalidation_listener(self):
+        if self.profile_invalidation_bus:
+            self.profile_invalidation_bus.start()
 
     async def update_user_profile(self, user_id: str, profile_data: Dict) -> bool:
         if not user_id or not profile_data: return False
@@ -129,6 +255,7 @@ class MongoManager:
         result = await self.user_profiles_collection.update_one(
             {"user_id": user_id}, update_operations, upsert=True
         )
+        await self.invalidate_user_profile(user_id)
         return result.matched_count > 0 or result.upserted_id is not None
         
     async def update_user_last_active(self, user_id: str) -> bool:
@@ -144,22 +271,27 @@ class MongoManager:
              "$setOnInsert": {"user_id": user_id, "createdAt": now_utc, "userData": {"last_active_timestamp": now_utc}}},
             upsert=True 
         )
+        await self.invalidate_user_profile(user_id)
         return result.matched_count > 0 or result.upserted_id is not None
 
     # --- Chat History Methods ---
+    # Sessions live in chat_history (title, timestamps, message_count); each message is its own
+    # document in chat_messages, so appends and edits never rewrite the whole conversation.
     async def add_chat_message(self, user_id: str, chat_id: str, message_data: Dict) -> str:
         if not all([user_id, chat_id, message_data]):
             raise ValueError("user_id, chat_id, and message_data are required.")
         
-        message_data["timestamp"] = datetime.datetime.now(datetime.timezone.utc)
+        now_utc = datetime.datetime.now(datetime.timezone.utc)
+        message_data["timestamp"] = now_utc
         message_id = message_data.get("id", str(uuid.uuid4())) 
         message_data["id"] = message_id
 
+        await self.chat_messages_collection.insert_one({**message_data, "user_id": user_id, "chat_id": chat_id})
         result = await self.chat_history_collection.update_one(
             {"user_id": user_id, "chat_id": chat_id},
-            {"$push": {"messages": message_data},
-             "$set": {"last_updated": datetime.datetime.now(datetime.timezone.utc)},
-             "$setOnInsert": {"user_id": user_id, "chat_id": chat_id, "created_at": datetime.datetime.now(datetime.timezone.utc)}
+            {"$inc": {"message_count": 1},
+             "$set": {"last_updated": now_utc},
+             "$setOnInsert": {"user_id": user_id, "chat_id": chat_id, "created_at": now_utc}
             },
             upsert=True
         )
@@ -167,12 +299,23 @@ class MongoManager:
             return message_id
         raise Exception(f"Failed to add/update chat message for user {user_id}, chat {chat_id}")
 
-    async def get_chat_history(self, user_id: str, chat_id: str) -> List[Dict]:
-        if not user_id or not chat_id: return []
-        chat_doc = await self.chat_history_collection.find_one(
-            {"user_id": user_id, "chat_id": chat_id}, {"messages": 1, "_id": 0}
-        )
-        return chat_doc.get("messages", []) if chat_doc else []
+    async def get_chat_history(self, user_id: str, chat_id: str, cursor: Optional[str] = None, limit: int = 50) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Returns up to `limit` messages older than `cursor` (or the latest ones), oldest first,
+        and the cursor for the next, older page (None when there is none). Messages sharing a
+        timestamp are ordered by id, so a page boundary never skips or repeats one.
+        """
+        if not user_id or not chat_id: return [], None
+        query: Dict[str, Any] = {"user_id": user_id, "chat_id": chat_id}
+        if cursor:
+            query.update(_cursor_query(cursor, "id", time_field="timestamp"))
+        messages = await self.chat_messages_collection.find(
+            query, {"_id": 0, "user_id": 0, "chat_id": 0}
+        ).sort([("timestamp", DESCENDING), ("id", DESCENDING)]).limit(limit + 1).to_list(length=limit + 1)
+        next_cursor = _encode_cursor(messages[limit - 1]["timestamp"], messages[limit - 1]["id"]) if len(messages) > limit else None
+        messages = messages[:limit]
+        messages.reverse()
+        return messages, next_cursor
 
     async def get_all_chats_for_user(self, user_id: str) -> List[Dict]:
         if not user_id: return []
@@ -184,6 +327,7 @@ class MongoManager:
 
     async def delete_chat_history(self, user_id: str, chat_id: str) -> bool:
         if not user_id or not chat_id: return False
+        await self.chat_messages_collection.delete_many({"user_id": user_id, "chat_id": chat_id})
         result = await self.chat_history_collection.delete_one({"user_id": user_id, "chat_id": chat_id})
         return result.deleted_count > 0
 
@@ -191,16 +335,17 @@ class MongoManager:
         if not all([user_id, chat_id, message_id, update_data]):
             raise ValueError("user_id, chat_id, message_id, and update_data are required.")
 
-        set_payload = {f"messages.$.{key}": value for key, value in update_data.items()}
-        set_payload["last_updated"] = datetime.datetime.now(datetime.timezone.utc)
-        
-        result = await self.chat_history_collection.update_one(
-            {"user_id": user_id, "chat_id": chat_id, "messages.id": message_id},
-            {"$set": set_payload}
+        result = await self.chat_messages_collection.update_one(
+            {"user_id": user_id, "chat_id": chat_id, "id": message_id},
+            {"$set": update_data}
         )
         if result.matched_count == 0:
             print(f"[{datetime.datetime.now()}] [DB_UPDATE_WARN] No message found with ID {message_id} in chat {chat_id} for user {user_id} to update.")
             return False
+        await self.chat_history_collection.update_one(
+            {"user_id": user_id, "chat_id": chat_id},
+            {"$set": {"last_updated": datetime.datetime.now(datetime.timezone.utc)}}
+        )
         return result.modified_count > 0
 
     async def create_new_chat_session(self, user_id: str, chat_id: str, title: Optional[str] = "New Chat") -> bool:
@@ -215,7 +360,7 @@ class MongoManager:
                     "user_id": user_id,
                     "chat_id": chat_id,
                     "title": title,
-                    "messages": [],
+                    "message_count": 0,
                     "created_at": now_utc,
                     "last_updated": now_utc
                 }
@@ -224,6 +369,40 @@ class MongoManager:
         )
         return result.upserted_id is not None
 
+    async def migrate_chat_history_to_messages(self) -> int:
+        """
+        Moves messages out of the legacy embedded `messages` arrays into chat_messages.
+        Safe to re-run: already-copied messages are skipped by the unique message index,
+        and the array is only removed after its messages are stored. Returns chats migrated.
+        """
+        migrated = 0
+        cursor = self.chat_history_collection.find({"messages.0": {"$exists": True}})
+        async for chat_doc in cursor:
+            user_id, chat_id = chat_doc["user_id"], chat_doc["chat_id"]
+            documents = []
+            for index, message in enumerate(chat_doc.get("messages", [])):
+                message = dict(message)
+                message.setdefault("id", str(uuid.uuid5(_LEGACY_MESSAGE_ID_NAMESPACE, f"{chat_id}:{index}")))
+                if not message.get("timestamp") and chat_doc.get("created_at"):
+                    # Offset by position so undated messages keep their array order.
+                    message["timestamp"] = chat_doc["created_at"] + datetime.timedelta(milliseconds=index)
+                documents.append({**message, "user_id": user_id, "chat_id": chat_id})
+            try:
+                await self.chat_messages_collection.insert_many(documents, ordered=False)
+            except BulkWriteError as e:
+                # Duplicates come from an earlier, interrupted run; anything else is a real failure.
+                if any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+                    print(f"[{datetime.datetime.now()}] [MainServer_DB_ERROR] Migrating chat {chat_id}: {e.details}")
+                    continue
+            await self.chat_history_collection.update_one(
+                {"_id": chat_doc["_id"]},
+                {"$unset": {"messages": ""}, "$set": {"message_count": len(documents)}}
+            )
+            migrated += 1
+        if migrated:
+            print(f"[{datetime.datetime.now()}] [MainServer_DB_INIT] Migrated {migrated} chat(s) to per-message storage.")
+        return migrated
+
     async def rename_chat(self, user_id: str, chat_id: str, new_title: str) -> bool:
         if not all([user_id, chat_id, new_title]):
             return False
@@ -234,46 +413,188 @@ class MongoManager:
         return result.modified_count > 0
 
     # --- Notification Methods ---
-    async def get_notifications(self, user_id: str) -> List[Dict]:
-        if not user_id: return []
-        user_doc = await self.notifications_collection.find_one(
-            {"user_id": user_id}, {"notifications": 1}
-        )
-        notifications_list = user_doc.get("notifications", []) if user_doc else []
+    @staticmethod
+    def _serialize_notification(notification: Dict) -> Dict:
+        # `timestamp` is the field clients have always read; datetimes are not JSON-serializable.
+        created_at = notification.pop("created_at", None)
+        if isinstance(created_at, datetime.datetime):
+            notification["timestamp"] = created_at.isoformat()
+        return notification
+
+    async def get_notifications(self, user_id: str, cursor: Optional[str] = None, limit: int = 50) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Returns one page of notifications, newest first, and the cursor for the next page
+        (None on the last page). Ties on created_at are broken by id so no item is skipped.
+        """
+        if not user_id: return [], None
+        query: Dict[str, Any] = {"user_id": user_id}
+        if cursor:
+            query.update(_cursor_query(cursor, "id"))
+        items = await self.notification_items_collection.find(
+            query, {"_id": 0, "user_id": 0}
+        ).sort([("created_at", DESCENDING), ("id", DESCENDING)]).limit(limit + 1).to_list(length=limit + 1)
+        next_cursor = _encode_cursor(items[limit - 1]["created_at"], items[limit - 1]["id"]) if len(items) > limit else None
+        return [self._serialize_notification(item) for item in items[:limit]], next_cursor
 
-        # Serialize datetime objects before returning, as they are not JSON-serializable by default.
-        for notification in notifications_list:
-            if isinstance(notification.get("timestamp"), datetime.datetime):
-                notification["timestamp"] = notification["timestamp"].isoformat()
-        return notifications_list
+    async def get_unread_notification_count(self, user_id: str) -> int:
+        if not user_id: return 0
+        counter_doc = await self.notifications_collection.find_one({"user_id": user_id}, {"unread_count": 1})
+        return max(0, counter_doc.get("unread_count", 0)) if counter_doc else 0
+
+    async def _adjust_unread_count(self, user_id: str, delta: int):
+        if delta:
+            await self.notifications_collection.update_one(
+                {"user_id": user_id},
+                {"$inc": {"unread_count": delta},
+                 "$setOnInsert": {"created_at": datetime.datetime.now(datetime.timezone.utc)}},
+                upsert=True
+            )
 
     async def add_notification(self, user_id: str, notification_data: Dict) -> Optional[Dict]:
         if not user_id or not notification_data: return None
-        notification_data["timestamp"] = datetime.datetime.now(datetime.timezone.utc)
+        notification_data["created_at"] = datetime.datetime.now(datetime.timezone.utc)
         notification_data["id"] = str(uuid.uuid4())
-        result = await self.notifications_collection.update_one(
-            {"user_id": user_id},
-            {"$push": {
-                "notifications": {
-                    "$each": [notification_data],
-                    "$position": 0, # Add to the beginning of the array
-                    "$slice": -50
-                }
-            },
-             "$setOnInsert": {"user_id": user_id, "created_at": datetime.datetime.now(datetime.timezone.utc)}},
-            upsert=True
-        )
-        if result.matched_count > 0 or result.upserted_id is not None:
-            return notification_data
-        return None
+        notification_data.setdefault("read", False)
+        await self.notification_items_collection.insert_one({**notification_data, "user_id": user_id})
+        if not notification_data["read"]:
+            await self._adjust_unread_count(user_id, 1)
+        notification_data["timestamp"] = notification_data.pop("created_at")
+        return notification_data
 
-    async def delete_notification(self, user_id: str, notification_id: str) -> bool:
-        if not user_id or not notification_id: return False
-        result = await self.notifications_collection.update_one(
-            {"user_id": user_id},
-            {"$pull": {"notifications": {"id": notification_id}}}
-        )
-        return result.modified_count > 0
+    async def mark_notifications_read(self, user_id: str, notification_ids: Optional[List[str]] = None) -> int:
+        """Marks the given notifications (or all of them, if None) as read. Returns how many changed."""
+        if not user_id: return 0
+        query: Dict[str, Any] = {"user_id": user_id, "read": False}
+        if notification_ids is not None:
+            query["id"] = {"$in": notification_ids}
+        result = await self.notification_items_collection.update_many(query, {"$set": {"read": True}})
+        # Only documents that actually flipped count, so concurrent calls can't double-decrement,
+        # and a notification added meanwhile keeps its increment (a $set to 0 would drop it).
+        await self._adjust_unread_count(user_id, -result.modified_count)
+        return result.modified_count
+
+    async def delete_notifications(self, user_id: str, notification_ids: List[str]) -> int:
+        """Deletes the given notifications and returns how many were removed."""
+        if not user_id or not notification_ids: return 0
+        query = {"user_id": user_id, "id": {"$in": notification_ids}}
+        unread_result = await self.notification_items_collection.delete_many({**query, "read": False})
+        read_result = await self.notification_items_collection.delete_many(query)
+        await self._adjust_unread_count(user_id, -unread_result.deleted_count)
+        return unread_result.deleted_count + read_result.deleted_count
+
+    async def migrate_notifications_to_collection(self) -> int:
+        """
+        Moves notifications out of the legacy per-user `notifications` arrays into
+        notification_items and initializes the unread counter. Safe to re-run, like the
+        chat migration. Returns users migrated.
+        """
+        migrated = 0
+        cursor = self.notifications_collection.find({"notifications.0": {"$exists": True}})
+        async for user_doc in cursor:
+            user_id = user_doc["user_id"]
+            documents = []
+            for index, notification in enumerate(user_doc.get("notifications", [])):
+                notification = dict(notification)
+                notification.setdefault("id", str(uuid.uuid5(_LEGACY_NOTIFICATION_ID_NAMESPACE, f"{user_id}:{index}")))
+                notification["created_at"] = (notification.pop("timestamp", None) or user_doc.get("created_at")
+                                               or datetime.datetime.now(datetime.timezone.utc))
+                notification.setdefault("read", False)
+                documents.append({**notification, "user_id": user_id})
+            try:
+                await self.notification_items_collection.insert_many(documents, ordered=False)
+            except BulkWriteError as e:
+                if any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+                    print(f"[{datetime.datetime.now()}] [MainServer_DB_ERROR] Migrating notifications for {user_id}: {e.details}")
+                    continue
+            unread_count = sum(1 for doc in documents if not doc["read"])
+            await self.notifications_collection.update_one(
+                {"_id": user_doc["_id"]},
+                {"$unset": {"notifications": ""}, "$set": {"unread_count": unread_count}}
+            )
+            migrated += 1
+        if migrated:
+            print(f"[{datetime.datetime.now()}] [MainServer_DB_INIT] Migrated notifications for {migrated} user(s) to per-notification storage.")
+        return migrated
+
+    # --- Task Methods ---
+    async def get_task_summaries(self, user_id: str, statuses: Optional[List[str]] = None,
+                                 priorities: Optional[List[int]] = None,
+                                 created_after: Optional[datetime.datetime] = None,
+                                 created_before: Optional[datetime.datetime] = None,
+                                 cursor: Optional[str] = None, limit: int = 50) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Returns one page of a user's tasks, newest first, without the plan, logs and result,
+        plus the cursor for the next page (None on the last page).
+        """
+        if not user_id: return [], None
+        query: Dict[str, Any] = {"user_id": user_id}
+        if statuses:
+            query["status"] = {"$in": statuses}
+        if priorities:
+            query["priority"] = {"$in": priorities}
+        if created_after or created_before:
+            created_range: Dict[str, Any] = {}
+            if created_after:
+                created_range["$gte"] = created_after
+            if created_before:
+                created_range["$lt"] = created_before
+            query["created_at"] = created_range
+        if cursor:
+            # $and keeps the cursor's created_at bounds from replacing the date-range filter.
+            query = {"$and": [query, _cursor_query(cursor, "task_id")]}
+        projection = {"_id": 0, **{field: 1 for field in TASK_SUMMARY_FIELDS}}
+        tasks = await self.task_collection.find(query, projection).sort(
+            [("created_at", DESCENDING), ("task_id", DESCENDING)]
+        ).limit(limit + 1).to_list(length=limit + 1)
+        next_cursor = _encode_cursor(tasks[limit - 1]["created_at"], tasks[limit - 1]["task_id"]) if len(tasks) > limit else None
+        return tasks[:limit], next_cursor
+
+    async def get_task(self, user_id: str, task_id: str) -> Optional[Dict]:
+        if not user_id or not task_id: return None
+        return await self.task_collection.find_one({"task_id": task_id, "user_id": user_id})
+
+    # --- Journal Methods ---
+    async def get_journal_blocks(self, user_id: str, start_date: str, end_date: str, cursor: Optional[str] = None,
+                                 limit: int = JOURNAL_MAX_BLOCKS_PER_REQUEST, slim: bool = False) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Returns journal blocks for page dates in [start_date, end_date] (YYYY-MM-DD), ordered by
+        date and then order, at most `limit` (capped at JOURNAL_MAX_BLOCKS_PER_REQUEST) at a time.
+        The second value is the cursor to continue from, or None once the range is exhausted.
+        """
+        if not user_id: return [], None
+        limit = max(1, min(limit, JOURNAL_MAX_BLOCKS_PER_REQUEST))
+        query: Dict[str, Any] = {"user_id": user_id, "page_date": {"$gte": start_date, "$lte": end_date}}
+        if cursor:
+            try:
+                page_date, order_str, block_id = cursor.split("_", 2)
+                order = int(order_str)
+            except ValueError:
+                raise ValueError("Invalid pagination cursor.")
+            query = {"$and": [query, {"$or": [
+                {"page_date": {"$gt": page_date}},
+                {"page_date": page_date, "order": {"$gt": order}},
+                {"page_date": page_date, "order": order, "block_id": {"$gt": block_id}}
+            ]}]}
+        projection = {"_id": 0, **{field: 1 for field in JOURNAL_BLOCK_LIST_FIELDS}} if slim else None
+        blocks = await self.journal_blocks_collection.find(query, projection).sort(
+            [("page_date", ASCENDING), ("order", ASCENDING), ("block_id", ASCENDING)]
+        ).limit(limit + 1).to_list(length=limit + 1)
+        next_cursor = None
+        if len(blocks) > limit:
+            last = blocks[limit - 1]
+            next_cursor = f"{last['page_date']}_{last['order']}_{last['block_id']}"
+        return blocks[:limit], next_cursor
+
+    async def get_journal_dates_with_entries(self, user_id: str, start_date: str, end_date: str) -> List[Dict]:
+        """Page dates in the range that have at least one block, with block counts, without loading content."""
+        if not user_id: return []
+        pipeline = [
+            {"$match": {"user_id": user_id, "page_date": {"$gte": start_date, "$lte": end_date}}},
+            {"$group": {"_id": "$page_date", "count": {"$sum": 1}}},
+            {"$sort": {"_id": 1}},
+            {"$project": {"_id": 0, "date": "$_id", "count": 1}}
+        ]
+        return await self.journal_blocks_collection.aggregate(pipeline).to_list(length=None)
 
     # --- Polling State Store Methods ---
     async def get_polling_state(self, user_id: str, service_name: str) -> Optional[Dict[str, Any]]:
@@ -282,6 +603,13 @@ class MongoManager:
             {"user_id": user_id, "service_name": service_name}
         )
 
+    async def get_user_id_for_gmail_address(self, email_address: str) -> Optional[str]:
+        if not email_address: return None
+        doc = await self.polling_state_collection.find_one(
+            {"service_name": "gmail", "gmail_email_address": email_address.lower()}, {"user_id": 1}
+        )
+        return doc["user_id"] if doc else None
+
     async def update_polling_state(self, user_id: str, service_name: str, state_data: Dict[str, Any]) -> bool: 
         if not user_id or not service_name or state_data is None: return False
         for key, value in state_data.items(): 
@@ -307,6 +635,8 @@ class MongoManager:
         return result.matched_count > 0 or result.upserted_id is not None
 
     async def close(self):
+        if self.profile_invalidation_bus:
+            await self.profile_invalidation_bus.stop()
         if self.client:
             self.client.close()
             print(f"[{datetime.datetime.now()}] [MainServer_MongoManager] MongoDB connection closed.")
\ No newline at end of file
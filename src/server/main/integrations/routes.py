@@ -2,7 +2,10 @@ import datetime
 import json
 import base64
 import httpx
-from fastapi import APIRouter, Depends, HTTPException, status
+import hmac
+import time
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Header, Response
 from fastapi.responses import JSONResponse
 
 from main.integrations.models import ManualConnectRequest, OAuthConnectRequest, DisconnectRequest
@@ -12,8 +15,11 @@ from main.config import (
     INTEGRATIONS_CONFIG, 
     GOOGLE_CLIENT_ID, GOOGLE_CLIENT_SECRET,
     GITHUB_CLIENT_ID, GITHUB_CLIENT_SECRET,
-    SLACK_CLIENT_ID, SLACK_CLIENT_SECRET, NOTION_CLIENT_ID, NOTION_CLIENT_SECRET
+    SLACK_CLIENT_ID, SLACK_CLIENT_SECRET, NOTION_CLIENT_ID, NOTION_CLIENT_SECRET,
+    GMAIL_PUSH_VERIFICATION_TOKEN
 )
+from workers.tasks import sync_user_on_push
+from workers.utils.push_tokens import verify_channel_token
 
 router = APIRouter(
     prefix="/integrations",
@@ -22,7 +28,7 @@ router = APIRouter(
 
 @router.get("/sources", summary="Get all available integration sources and their status")
 async def get_integration_sources(user_id: str = Depends(auth_helper.get_current_user_id)):
-    user_profile = await mongo_manager.get_user_profile(user_id)
+    user_profile = await mongo_manager.get_user_profile_fields(user_id, ["userData.integrations"])
     user_integrations = user_profile.get("userData", {}).get("integrations", {}) if user_profile else {}
 
     all_sources = []
@@ -207,6 +213,7 @@ async def disconnect_integration(request: DisconnectRequest, user_id: str = Depe
             {"user_id": user_id},
             {"$unset": update_payload}
         )
+        await mongo_manager.invalidate_user_profile(user_id)
 
         if result.modified_count == 0:
             # This can happen if the field didn't exist, which is not an error.
@@ -214,4 +221,48 @@ async def disconnect_integration(request: DisconnectRequest, user_id: str = Depe
 
         return JSONResponse(content={"message": f"{service_name} disconnected successfully."})
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# --- Push notification ingestion ---
+# Both endpoints are called by Google, not by the client, so they authenticate the sender
+# themselves and answer 2xx for anything they choose to ignore (otherwise Google retries).
+
+@router.post("/push/gmail", summary="Receive Gmail watch notifications (Pub/Sub push)", status_code=status.HTTP_204_NO_CONTENT)
+async def receive_gmail_push(request: Request, token: Optional[str] = None):
+    if not GMAIL_PUSH_VERIFICATION_TOKEN or not token or not hmac.compare_digest(token, GMAIL_PUSH_VERIFICATION_TOKEN):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid push verification token.")
+    try:
+        envelope = await request.json()
+        notification = json.loads(base64.b64decode(envelope["message"]["data"]))
+        email_address = notification["emailAddress"]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Malformed Pub/Sub push message.")
+
+    user_id = await mongo_manager.get_user_id_for_gmail_address(email_address)
+    if user_id:
+        sync_user_on_push.delay(user_id, "gmail", time.time())
+    else:
+        print(f"[{datetime.datetime.now()}] [PUSH] Gmail notification for unknown address, ignoring.")
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.post("/push/gcalendar", summary="Receive Google Calendar push notifications", status_code=status.HTTP_204_NO_CONTENT)
+async def receive_gcalendar_push(
+    x_goog_channel_id: Optional[str] = Header(None),
+    x_goog_channel_token: Optional[str] = Header(None),
+    x_goog_resource_state: Optional[str] = Header(None)
+):
+    user_id = verify_channel_token(x_goog_channel_token)
+    if not user_id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid channel token.")
+    # "sync" is the handshake sent when a channel is opened; it carries no changes.
+    if x_goog_resource_state == "sync":
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+    polling_state = await mongo_manager.get_polling_state(user_id, "gcalendar")
+    if not polling_state or polling_state.get("gcalendar_channel_id") != x_goog_channel_id:
+        # A channel we replaced but Google has not stopped yet; the current channel covers it.
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+    sync_user_on_push.delay(user_id, "gcalendar", time.time())
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
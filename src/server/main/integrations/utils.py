@@ -26,6 +26,7 @@ async def remove_integration(user_id: str, service_name: str, db_manager: MongoM
     result = await db_manager.user_profiles_collection.update_one(
         {"user_id": user_id}, update_payload
     )
+    await db_manager.invalidate_user_profile(user_id)
     return result.modified_count > 0
 
 async def get_decrypted_integration_token(user_id: str, service_name: str, db_manager: MongoManager) -> Optional[Dict[str, Any]]:
@@ -5,6 +5,7 @@ from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from main.journal.models import CreateBlockRequest, UpdateBlockRequest
 from main.dependencies import mongo_manager
+from main.config import JOURNAL_MAX_BLOCKS_PER_REQUEST
 from main.auth.utils import PermissionChecker
 from workers.tasks import extract_from_context
 
@@ -18,27 +19,42 @@ async def get_journal_blocks(
     date: Optional[str] = Query(None, description="A specific date in YYYY-MM-DD format."),
     start_date: Optional[str] = Query(None, alias="startDate", description="Start date for a range query."),
     end_date: Optional[str] = Query(None, alias="endDate", description="End date for a range query."),
+    cursor: Optional[str] = Query(None, description="The next_cursor returned by the previous response."),
+    limit: int = Query(JOURNAL_MAX_BLOCKS_PER_REQUEST, ge=1, le=JOURNAL_MAX_BLOCKS_PER_REQUEST),
+    view: str = Query("full", pattern="^(full|list)$", description="'list' omits task progress and results."),
     user_id: str = Depends(PermissionChecker(required_permissions=["read:journal"]))
 ):
     """
-    Fetches journal blocks.
+    Fetches journal blocks, ordered by date and then order.
     - If 'date' is provided, fetches for a specific date.
     - If 'startDate' and 'endDate' are provided, fetches for a date range.
+    At most `limit` blocks are returned; when more remain, pass back 'next_cursor' to continue.
     """
-    query = {"user_id": user_id}
     if date:
-        query["page_date"] = date
-    elif start_date and end_date:
-        query["page_date"] = {"$gte": start_date, "$lte": end_date}
-    else:
+        start_date = end_date = date
+    elif not (start_date and end_date):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Either 'date' or both 'startDate' and 'endDate' must be provided.")
 
-    blocks_cursor = mongo_manager.journal_blocks_collection.find(query).sort("page_date", 1).sort("order", 1)
-    
-    blocks = await blocks_cursor.to_list(length=None)
+    try:
+        blocks, next_cursor = await mongo_manager.get_journal_blocks(
+            user_id, start_date, end_date, cursor=cursor, limit=limit, slim=(view == "list")
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     for block in blocks:
-        block["_id"] = str(block["_id"])
-    return {"blocks": blocks}
+        if "_id" in block:
+            block["_id"] = str(block["_id"])
+    return {"blocks": blocks, "next_cursor": next_cursor}
+
+@router.get("/dates", status_code=status.HTTP_200_OK)
+async def get_journal_dates(
+    start_date: str = Query(..., alias="startDate", description="Start date in YYYY-MM-DD format."),
+    end_date: str = Query(..., alias="endDate", description="End date in YYYY-MM-DD format."),
+    user_id: str = Depends(PermissionChecker(required_permissions=["read:journal"]))
+):
+    """Dates in the range that have journal blocks, with counts, for calendar views."""
+    dates = await mongo_manager.get_journal_dates_with_entries(user_id, start_date, end_date)
+    return {"dates": dates}
 
 @router.post("/blocks", status_code=status.HTTP_201_CREATED)
 async def create_journal_block(
@@ -1,19 +1,23 @@
 # src/server/main/llm.py
 import os
+import time
 import logging
 from qwen_agent.agents import Assistant
 from qwen_agent.llm import get_chat_model
 
 from main.config import (OPENAI_API_BASE_URL, OPENAI_API_KEY,
                          OPENAI_MODEL_NAME)
+from main.mcp_cache import lease_function_list, record_agent_construction
 
 logger = logging.getLogger(__name__)
 
 DEFAULT_SYSTEM_PROMPT = "You are a helpful AI assistant called Sentient, developed by Existence. Your primary goal is to assist the user in managing their digital life by performing actions and providing responses that are deeply personalized to them."
 
-def get_qwen_assistant(system_message: str = DEFAULT_SYSTEM_PROMPT, function_list: list = None):
+def get_qwen_assistant(system_message: str = DEFAULT_SYSTEM_PROMPT, function_list: list = None, agent_kind: str = "assistant"):
     """
     Initializes and returns a Qwen Assistant agent configured for the current environment.
+    MCP servers in `function_list` are resolved through the shared tool cache, and the
+    construction time is recorded under `agent_kind`.
     """
     # Qwen-agent's `Assistant` uses an OpenAI-compatible interface.
     # We map our standard environment variables to its expected config format.
@@ -30,11 +34,19 @@ def get_qwen_assistant(system_message: str = DEFAULT_SYSTEM_PROMPT, function_lis
 
     try:
         # Initialize the Assistant agent
-        bot = Assistant(
-            llm=llm_cfg,
-            system_message=system_message,
-            function_list=function_list or [] # Ensure function_list is a list
-        )
+        started_at = time.perf_counter()
+        lease = lease_function_list(function_list)
+        try:
+            bot = Assistant(
+                llm=llm_cfg,
+                system_message=system_message,
+                function_list=lease.tools
+            )
+        except Exception:
+            lease.release()
+            raise
+        lease.bind(bot)
+        record_agent_construction(agent_kind, time.perf_counter() - started_at)
         logger.info(f"Qwen Assistant initialized successfully with system message: '{system_message[:50]}...'")
         return bot
     except Exception as e:
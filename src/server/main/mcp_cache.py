@@ -0,0 +1,269 @@
+# src/server/main/mcp_cache.py
+# Shared by the main server and the Celery workers, so it reads its settings directly from the environment.
+import os
+import json
+import time
+import asyncio
+import logging
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from qwen_agent.tools.mcp_manager import MCPManager
+
+from main.chat.metrics import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+MCP_TOOL_CACHE_TTL_SECONDS = int(os.getenv("MCP_TOOL_CACHE_TTL_SECONDS", 300))
+MCP_TOOL_CACHE_MAX_SERVERS = int(os.getenv("MCP_TOOL_CACHE_MAX_SERVERS", 500))
+MCP_TOOL_CACHE_SWEEP_SECONDS = int(os.getenv("MCP_TOOL_CACHE_SWEEP_SECONDS", 60))
+
+
+# --- qwen_agent session internals ---
+# MCPManager exposes no API to close one server's clients, so releasing a session means
+# reaching into `MCPManager().clients`, `manager.loop` and each tool's `client_id`. All of
+# that is confined to the two helpers below; if a qwen_agent upgrade changes those
+# internals they log once and sessions are left to qwen's own lifecycle instead of failing.
+_internals_warned = False
+
+
+def _warn_internals_unsupported(reason: str):
+    global _internals_warned
+    if not _internals_warned:
+        _internals_warned = True
+        logger.warning(f"MCP session release disabled, qwen_agent internals changed: {reason}")
+
+
+def _session_client_ids(tools: List[Any]) -> Set[str]:
+    client_ids = {getattr(tool, "client_id", None) for tool in tools} - {None}
+    if tools and not client_ids:
+        _warn_internals_unsupported("MCP tools have no client_id")
+    return client_ids
+
+
+def _close_sessions(client_ids: Set[str]):
+    """Best-effort release of MCP client sessions from qwen's MCPManager."""
+    if not client_ids:
+        return
+    try:
+        manager = MCPManager()
+        clients = getattr(manager, "clients", None)
+        loop = getattr(manager, "loop", None)
+        if not isinstance(clients, dict) or loop is None:
+            _warn_internals_unsupported("MCPManager has no clients dict or event loop")
+            return
+        for client_id in client_ids:
+            client = clients.pop(client_id, None)
+            cleanup = getattr(client, "cleanup", None)
+            if cleanup is not None:
+                asyncio.run_coroutine_threadsafe(cleanup(), loop)
+    except Exception as e:
+        logger.warning(f"Could not close evicted MCP sessions: {e}")
+
+
+class _CachedServer:
+    """
+    Tools for one MCP server. Agents built from them borrow the entry; once it is retired
+    (expired, invalidated or evicted) its sessions are closed when the last borrower lets go.
+    """
+    def __init__(self, tools: List[Any], version: int):
+        self.tools = tools
+        self.version = version
+        self.expires_at = time.monotonic() + MCP_TOOL_CACHE_TTL_SECONDS
+        self.borrowers = 0
+        self.retired = False
+
+
+_cache: "OrderedDict[Tuple, _CachedServer]" = OrderedDict()
+_cache_lock = threading.Lock()
+_key_locks: Dict[Tuple, threading.Lock] = {}
+_retired: Set[_CachedServer] = set()
+_global_version = 0
+_url_versions: Dict[str, int] = {}
+_stats = {"hits": 0, "misses": 0, "evictions": 0, "closed": 0}
+_sweeper: Optional[threading.Thread] = None
+
+_agent_construction: Dict[str, LatencyHistogram] = {}
+
+
+def _server_key(server_name: str, server_config: Dict[str, Any]) -> Tuple:
+    # One warm session per server and X-User-ID; the rest of the config is part of the key too.
+    user_id = (server_config.get("headers") or {}).get("X-User-ID")
+    return (server_name, server_config.get("url"), user_id, json.dumps(server_config, sort_keys=True, default=str))
+
+
+def _current_version(url: Optional[str]) -> int:
+    return _global_version + _url_versions.get(url, 0)
+
+
+def _retire_locked(key: Tuple) -> Optional[_CachedServer]:
+    """
+    Drops `key` from the cache. Must hold `_cache_lock`. Returns the entry if it can be
+    closed right away; otherwise it is closed by the last lease release.
+    """
+    cached = _cache.pop(key, None)
+    if cached is None:
+        return None
+    _stats["evictions"] += 1
+    cached.retired = True
+    if cached.borrowers:
+        _retired.add(cached)
+        return None
+    return cached
+
+
+def _close(entries: List[_CachedServer]):
+    for cached in entries:
+        _close_sessions(_session_client_ids(cached.tools))
+    if entries:
+        with _cache_lock:
+            _stats["closed"] += len(entries)
+
+
+def _sweep():
+    """Retires expired entries and forgets build locks that no longer guard anything."""
+    now = time.monotonic()
+    with _cache_lock:
+        expired = [key for key, cached in _cache.items() if cached.expires_at <= now]
+        to_close = [cached for cached in map(_retire_locked, expired) if cached]
+        for key in [key for key in _key_locks if key not in _cache]:
+            if not _key_locks[key].locked():
+                del _key_locks[key]
+    _close(to_close)
+
+
+def _sweep_loop():
+    while True:
+        time.sleep(MCP_TOOL_CACHE_SWEEP_SECONDS)
+        try:
+            _sweep()
+        except Exception as e:
+            logger.error(f"MCP tool cache sweep failed: {e}", exc_info=True)
+
+
+def _ensure_sweeper():
+    global _sweeper
+    if _sweeper is None:
+        with _cache_lock:
+            if _sweeper is None:
+                _sweeper = threading.Thread(target=_sweep_loop, name="mcp-tool-cache-sweeper", daemon=True)
+                _sweeper.start()
+
+
+def _borrow_server(server_name: str, server_config: Dict[str, Any]) -> _CachedServer:
+    _ensure_sweeper()
+    key = _server_key(server_name, server_config)
+    url = server_config.get("url")
+    with _cache_lock:
+        key_lock = _key_locks.setdefault(key, threading.Lock())
+
+    # Single-flight per server: concurrent agent builds for the same user share one connect.
+    with key_lock:
+        to_close = []
+        with _cache_lock:
+            cached = _cache.get(key)
+            version = _current_version(url)
+            if cached and cached.version == version and cached.expires_at > time.monotonic():
+                _stats["hits"] += 1
+                _cache.move_to_end(key)
+                cached.borrowers += 1
+                return cached
+            _stats["misses"] += 1
+            if cached:
+                to_close.append(_retire_locked(key))
+        _close([c for c in to_close if c])
+
+        tools = MCPManager().initConfig({"mcpServers": {server_name: server_config}})
+        fresh = _CachedServer(tools, version)
+        with _cache_lock:
+            to_close = [_retire_locked(key)]
+            _cache[key] = fresh
+            fresh.borrowers += 1
+            while len(_cache) > MCP_TOOL_CACHE_MAX_SERVERS:
+                to_close.append(_retire_locked(next(iter(_cache))))
+        _close([c for c in to_close if c])
+        return fresh
+
+
+class MCPToolLease:
+    """
+    Cached MCP tools handed to one agent. The sessions behind them stay open until the
+    lease is released: explicitly, or when the agent it is bound to is garbage collected.
+    """
+    def __init__(self, tools: List[Any], entries: List[_CachedServer]):
+        self.tools = tools
+        self._entries = entries
+        self._released = False
+
+    def bind(self, agent: Any):
+        weakref.finalize(agent, self.release)
+        return agent
+
+    def release(self):
+        to_close = []
+        with _cache_lock:
+            if self._released:
+                return
+            self._released = True
+            for cached in self._entries:
+                cached.borrowers -= 1
+                if cached.retired and cached.borrowers == 0 and cached in _retired:
+                    _retired.discard(cached)
+                    to_close.append(cached)
+        _close(to_close)
+
+
+def lease_function_list(function_list: Optional[List[Any]]) -> MCPToolLease:
+    """
+    Replaces `{"mcpServers": {...}}` entries in an agent's function_list with cached
+    tool objects bound to warm MCP sessions. Other entries are passed through unchanged.
+    Bind the returned lease to the agent built from `lease.tools`.
+    """
+    resolved, entries = [], []
+    try:
+        for entry in function_list or []:
+            if isinstance(entry, dict) and "mcpServers" in entry:
+                for server_name, server_config in entry["mcpServers"].items():
+                    cached = _borrow_server(server_name, server_config)
+                    entries.append(cached)
+                    resolved.extend(cached.tools)
+            else:
+                resolved.append(entry)
+    except Exception:
+        MCPToolLease(resolved, entries).release()
+        raise
+    return MCPToolLease(resolved, entries)
+
+
+def invalidate_mcp_tools(server_url: Optional[str] = None):
+    """
+    Forces tool manifests to be re-fetched on next use, for one server URL or for all
+    servers (e.g. after an MCP server is redeployed with a new tool schema). Agents already
+    running keep their sessions until they finish.
+    """
+    global _global_version
+    with _cache_lock:
+        if server_url is None:
+            _global_version += 1
+            keys = list(_cache)
+        else:
+            _url_versions[server_url] = _url_versions.get(server_url, 0) + 1
+            keys = [key for key in _cache if key[1] == server_url]
+        to_close = [cached for cached in map(_retire_locked, keys) if cached]
+    _close(to_close)
+
+
+def record_agent_construction(kind: str, seconds: float):
+    with _cache_lock:
+        histogram = _agent_construction.setdefault(kind, LatencyHistogram())
+    histogram.observe(seconds)
+
+
+def get_mcp_cache_stats() -> Dict[str, Any]:
+    with _cache_lock:
+        stats = dict(_stats, cached_servers=len(_cache), retired_awaiting_close=len(_retired))
+        histograms = dict(_agent_construction)
+    stats["agent_construction"] = {kind: histogram.snapshot() for kind, histogram in histograms.items()}
+    return stats
@@ -14,15 +14,13 @@ from main.auth.utils import PermissionChecker, AuthHelper, aes_encrypt, aes_decr
 from main.config import AUTH0_AUDIENCE
 from main.dependencies import mongo_manager, auth_helper, websocket_manager as main_websocket_manager
 from pydantic import BaseModel
-from workers.tasks import process_memory_item, process_linkedin_profile
+from workers.tasks import enqueue_memory_items, process_linkedin_profile
 
 # Google API libraries for validation
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
-# For dispatching memory tasks
-from workers.tasks import process_memory_item
 
 class UpdatePrivacyFiltersRequest(BaseModel):
     service: str
@@ -156,8 +154,8 @@ async def save_onboarding_data_endpoint(
                 if fact:
                     onboarding_facts.append(fact)
 
-            for fact in onboarding_facts:
-                process_memory_item.delay(user_id, fact)
+            if onboarding_facts:
+                enqueue_memory_items.delay(user_id, onboarding_facts)
             
             logger.info(f"Dispatched {len(onboarding_facts)} onboarding facts to memory queue for user {user_id}")
         except Exception as celery_e:
@@ -171,7 +169,7 @@ async def save_onboarding_data_endpoint(
 
 @router.post("/check-user-profile", status_code=status.HTTP_200_OK, summary="Check User Profile and Onboarding Status")
 async def check_user_profile_endpoint(user_id: str = Depends(PermissionChecker(required_permissions=["read:profile"]))):
-    profile_doc = await mongo_manager.get_user_profile(user_id)
+    profile_doc = await mongo_manager.get_user_profile_fields(user_id, ["userData.onboardingComplete"])
     onboarding_complete = False
     if profile_doc and profile_doc.get("userData"):
         onboarding_complete = profile_doc["userData"].get("onboardingComplete", False)
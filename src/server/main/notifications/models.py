@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Optional, List
 
 class CreateNotificationRequest(BaseModel):
     user_id: str
@@ -7,4 +7,9 @@ class CreateNotificationRequest(BaseModel):
     task_id: Optional[str] = None # Link notification to a task if applicable
 
 class DeleteNotificationRequest(BaseModel):
-    notification_id: str
\ No newline at end of file
+    notification_id: Optional[str] = None
+    notification_ids: List[str] = Field(default_factory=list)
+
+class MarkNotificationsReadRequest(BaseModel):
+    notification_ids: List[str] = Field(default_factory=list)
+    mark_all: bool = False
\ No newline at end of file
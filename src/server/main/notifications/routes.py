@@ -1,8 +1,9 @@
 import logging
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query
 from fastapi.responses import JSONResponse
 
-from main.notifications.models import CreateNotificationRequest, DeleteNotificationRequest
+from main.notifications.models import CreateNotificationRequest, DeleteNotificationRequest, MarkNotificationsReadRequest
 from main.notifications.utils import create_and_push_notification
 from main.dependencies import mongo_manager, auth_helper
 from main.auth.utils import PermissionChecker
@@ -22,17 +23,44 @@ async def create_notification_internal(request: CreateNotificationRequest):
         logger.error(f"Internal notification creation failed for user {request.user_id}: {e}", exc_info=True)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
-@router.get("/", summary="Get All User Notifications")
-async def get_notifications(user_id: str = Depends(PermissionChecker(required_permissions=["read:notifications"]))):
-    notifications = await mongo_manager.get_notifications(user_id)
-    return JSONResponse(content={"notifications": notifications})
+@router.get("/", summary="Get User Notifications (Paginated)")
+async def get_notifications(
+    cursor: Optional[str] = Query(None, description="The next_cursor returned by the previous page."),
+    limit: int = Query(50, ge=1, le=100),
+    user_id: str = Depends(PermissionChecker(required_permissions=["read:notifications"]))
+):
+    try:
+        notifications, next_cursor = await mongo_manager.get_notifications(user_id, cursor=cursor, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    unread_count = await mongo_manager.get_unread_notification_count(user_id)
+    return JSONResponse(content={"notifications": notifications, "next_cursor": next_cursor, "unread_count": unread_count})
+
+@router.get("/unread-count", summary="Get Unread Notification Count")
+async def get_unread_count(user_id: str = Depends(PermissionChecker(required_permissions=["read:notifications"]))):
+    unread_count = await mongo_manager.get_unread_notification_count(user_id)
+    return JSONResponse(content={"unread_count": unread_count})
+
+@router.post("/mark-read", summary="Mark User Notifications as Read")
+async def mark_notifications_read(
+    request: MarkNotificationsReadRequest,
+    user_id: str = Depends(PermissionChecker(required_permissions=["write:notifications"]))
+):
+    if not request.mark_all and not request.notification_ids:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Provide notification_ids or set mark_all.")
+    updated = await mongo_manager.mark_notifications_read(user_id, None if request.mark_all else request.notification_ids)
+    unread_count = await mongo_manager.get_unread_notification_count(user_id)
+    return JSONResponse(content={"message": f"{updated} notification(s) marked as read.", "unread_count": unread_count})
 
-@router.post("/delete", summary="Delete a User Notification")
+@router.post("/delete", summary="Delete User Notifications")
 async def delete_notification(
     request: DeleteNotificationRequest,
     user_id: str = Depends(PermissionChecker(required_permissions=["write:notifications"]))
 ):
-    success = await mongo_manager.delete_notification(user_id, request.notification_id)
-    if not success:
+    notification_ids = request.notification_ids + ([request.notification_id] if request.notification_id else [])
+    if not notification_ids:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Provide notification_id or notification_ids.")
+    deleted = await mongo_manager.delete_notifications(user_id, notification_ids)
+    if not deleted:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Notification not found or user does not have permission.")
-    return JSONResponse(content={"message": "Notification deleted successfully."})
\ No newline at end of file
+    return JSONResponse(content={"message": f"{deleted} notification(s) deleted successfully."})
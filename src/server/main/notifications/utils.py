@@ -39,7 +39,7 @@ async def create_and_push_notification(user_id: str, message: str, task_id: Opti
         logger.info(f"Pushed new notification to user {user_id} via WebSocket.")
 
         # 3. Send via WhatsApp
-        user_profile = await mongo_manager.get_user_profile(user_id)
+        user_profile = await mongo_manager.get_user_profile_fields(user_id, ["userData.notificationPreferences.whatsapp"])
         if user_profile:
             wa_prefs = user_profile.get("userData", {}).get("notificationPreferences", {}).get("whatsapp", {})
             if wa_prefs.get("enabled") and wa_prefs.get("chatId"):
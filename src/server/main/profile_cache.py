@@ -0,0 +1,140 @@
+# src/server/main/profile_cache.py
+import copy
+import time
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PROFILE_INVALIDATION_CHANNEL = "sentient:user_profile_invalidations"
+
+# Cache key: (user_id, projection) where projection is () for the full document.
+CacheKey = Tuple[str, Tuple[str, ...]]
+
+
+class ProfileCache:
+    """
+    In-process LRU cache of user profile documents (or projections of them) with a TTL.
+    Entries are copied on the way in and out so callers can't mutate cached state.
+    """
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[CacheKey, Tuple[float, Optional[Dict]]]" = OrderedDict()
+        self._keys_by_user: Dict[str, set] = {}
+        # Every invalidation takes the next generation and stamps the user with it, so a read that
+        # started before a write to that user is not cached. Stamps are kept for the most recently
+        # invalidated max_entries users only; older ones collapse into _invalidated_floor, which
+        # can only turn a few extra puts into misses, never let a stale read in.
+        self._generation = 0
+        self._invalidated_at: "OrderedDict[str, int]" = OrderedDict()
+        self._invalidated_floor = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def get(self, key: CacheKey) -> Tuple[bool, Optional[Dict]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, copy.deepcopy(entry[1])
+
+    def generation(self) -> int:
+        with self._lock:
+            return self._generation
+
+    def put(self, key: CacheKey, value: Optional[Dict], generation: int):
+        with self._lock:
+            if self._invalidated_at.get(key[0], self._invalidated_floor) > generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, copy.deepcopy(value))
+            self._entries.move_to_end(key)
+            self._keys_by_user.setdefault(key[0], set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self.evictions += 1
+
+    def _remove(self, key: CacheKey):
+        self._entries.pop(key, None)
+        user_keys = self._keys_by_user.get(key[0])
+        if user_keys is not None:
+            user_keys.discard(key)
+            if not user_keys:
+                del self._keys_by_user[key[0]]
+
+    def invalidate(self, user_id: str):
+        with self._lock:
+            for key in list(self._keys_by_user.get(user_id, ())):
+                self._remove(key)
+            self._generation += 1
+            self._invalidated_at[user_id] = self._generation
+            self._invalidated_at.move_to_end(user_id)
+            while len(self._invalidated_at) > self.max_entries:
+                _, self._invalidated_floor = self._invalidated_at.popitem(last=False)
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+            }
+
+
+class RedisInvalidationBus:
+    """
+    Broadcasts profile invalidations to the other server processes over Redis pub/sub,
+    and applies the ones they send to the local cache.
+    """
+    def __init__(self, redis_url: str, cache: ProfileCache):
+        import redis.asyncio as aioredis
+        self._redis = aioredis.from_url(redis_url, decode_responses=True)
+        self._cache = cache
+        self._listener: Optional[asyncio.Task] = None
+
+    async def publish(self, user_id: str):
+        try:
+            await self._redis.publish(PROFILE_INVALIDATION_CHANNEL, user_id)
+        except Exception as e:
+            logger.warning(f"Failed to publish profile invalidation for {user_id}: {e}")
+
+    def start(self):
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def _listen(self):
+        while True:
+            try:
+                pubsub = self._redis.pubsub()
+                await pubsub.subscribe(PROFILE_INVALIDATION_CHANNEL)
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self._cache.invalidate(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Profile invalidation listener error, reconnecting: {e}")
+                await asyncio.sleep(5)
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+        await self._redis.close()
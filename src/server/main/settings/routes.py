@@ -70,7 +70,7 @@ async def set_whatsapp_number(
 async def get_whatsapp_number(
     user_id: str = Depends(PermissionChecker(required_permissions=["read:config"]))
 ):
-    user_profile = await mongo_manager.get_user_profile(user_id)
+    user_profile = await mongo_manager.get_user_profile_fields(user_id, ["userData.notificationPreferences.whatsapp"])
     if not user_profile:
         return JSONResponse(content={"whatsapp_number": ""})
 
@@ -81,7 +81,7 @@ async def get_whatsapp_number(
 async def get_linkedin_url(
     user_id: str = Depends(PermissionChecker(required_permissions=["read:profile"]))
 ):
-    user_profile = await mongo_manager.get_user_profile(user_id)
+    user_profile = await mongo_manager.get_user_profile_fields(user_id, ["userData.onboardingAnswers"])
     if not user_profile:
         return JSONResponse(content={"linkedin_url": ""})
     
@@ -0,0 +1,87 @@
+# src/server/scripts/bench_auth.py
+# Per-request cost of AuthHelper._validate_token_and_get_payload for an RS256 bearer token:
+# cold (every call verifies the signature and claims) against warm (the VerifiedTokenCache
+# already holds the token). Uses a locally generated key, so no Auth0 tenant is needed.
+# Run from src/server with
+#   python -m scripts.bench_auth
+import os
+import time
+import base64
+import asyncio
+import timeit
+
+# Set before main.config is imported; "bench" also skips loading any .env file.
+os.environ["ENVIRONMENT"] = "bench"
+os.environ["AUTH0_DOMAIN"] = "bench.example.com"
+os.environ["AUTH0_AUDIENCE"] = "https://bench.example.com/api"
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwt
+
+from main.auth import utils as auth_utils
+from main.auth.jwks import VerifiedTokenCache
+
+KID = "bench-key"
+CALLS = 2000
+ROUNDS = 5
+
+
+def _b64url_uint(value: int) -> str:
+    raw = value.to_bytes((value.bit_length() + 7) // 8, "big")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def _signed_token() -> str:
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    public_numbers = private_key.public_key().public_numbers()
+    # What JWKSManager would have fetched from the tenant's jwks.json.
+    auth_utils.jwks_manager._keys = {KID: {
+        "kty": "RSA", "kid": KID, "use": "sig",
+        "n": _b64url_uint(public_numbers.n), "e": _b64url_uint(public_numbers.e),
+    }}
+    private_pem = private_key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode("ascii")
+    now = int(time.time())
+    claims = {
+        "sub": "auth0|bench-user", "aud": os.environ["AUTH0_AUDIENCE"], "iss": f"https://{os.environ['AUTH0_DOMAIN']}/",
+        "iat": now, "exp": now + 3600, "permissions": ["read:chat", "write:chat", "read:tasks", "write:tasks"],
+    }
+    return jwt.encode(claims, private_pem, algorithm="RS256", headers={"kid": KID})
+
+
+async def _validate_many(helper: auth_utils.AuthHelper, token: str, calls: int):
+    for _ in range(calls):
+        await helper._validate_token_and_get_payload(token)
+
+
+def _per_call_us(loop, helper, token) -> float:
+    timings = timeit.repeat(lambda: loop.run_until_complete(_validate_many(helper, token, CALLS)), number=1, repeat=ROUNDS)
+    return min(timings) / CALLS * 1e6
+
+
+def main():
+    token = _signed_token()
+    helper = auth_utils.AuthHelper()
+    loop = asyncio.new_event_loop()
+    try:
+        # A zero-sized cache never stores anything, so every call takes the full verification path.
+        auth_utils.verified_token_cache = VerifiedTokenCache(0)
+        cold = _per_call_us(loop, helper, token)
+
+        auth_utils.verified_token_cache = VerifiedTokenCache(1000)
+        loop.run_until_complete(helper._validate_token_and_get_payload(token))
+        warm = _per_call_us(loop, helper, token)
+        stats = auth_utils.verified_token_cache.stats()
+    finally:
+        loop.close()
+
+    print(f"{'cold (verify every call)':>26}: {cold:8.1f} us/call")
+    print(f"{'warm (VerifiedTokenCache)':>26}: {warm:8.1f} us/call")
+    print(f"{'speedup':>26}: {cold / warm:8.1f}x")
+    print(f"{'warm cache stats':>26}: {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# src/server/scripts/bench_chat_stream.py
+# Per-step cost of turning qwen agent history snapshots into stream chunks: the previous
+# approach (re-render the whole turn with msg_to_str, then slice off what was sent) against
+# TurnStreamBuilder. Run from src/server with
+#   python -m scripts.bench_chat_stream
+import json
+import time
+from typing import Any, Dict, List
+
+from main.chat.utils import TurnStreamBuilder, msg_to_str
+
+TOOL_STEPS = [1, 4, 8]
+CHUNKS_PER_MESSAGE = 40
+ROUNDS = 5
+
+
+def _simulated_snapshots(tool_steps: int) -> List[List[Dict[str, Any]]]:
+    """Snapshots as the agent yields them: each one is the full history so far."""
+    base = [{"role": "system", "content": "You are a helpful assistant."},
+            {"role": "user", "content": "Plan my week and email the team a summary."}]
+    done: List[Dict[str, Any]] = []
+    snapshots = []
+
+    def stream(message_role: str, full_text: str, **extra):
+        step = max(1, len(full_text) // CHUNKS_PER_MESSAGE)
+        for end in range(step, len(full_text) + step, step):
+            partial = {"role": message_role, **extra}
+            if "function_call" in extra:
+                partial["function_call"] = {**extra["function_call"], "arguments": full_text[:end]}
+            else:
+                partial["content"] = full_text[:end]
+            snapshots.append(base + done + [partial])
+        final = snapshots[-1][-1]
+        done.append(final)
+
+    for step in range(tool_steps):
+        stream("assistant", f"Let me look at step {step} of your week. " * 8)
+        arguments = json.dumps({"query": f"events in week {step}", "max_results": 50, "fields": ["summary"] * 10})
+        stream("assistant", arguments, content="", function_call={"name": "gcalendar-list_events"})
+        result = json.dumps({"events": [{"summary": f"Meeting {i}", "start": "2026-10-19T09:00:00Z"} for i in range(60)]})
+        snapshots.append(base + done + [{"role": "function", "name": "gcalendar-list_events", "content": result}])
+        done.append(snapshots[-1][-1])
+    stream("assistant", "Here is the summary I sent to your team. " * 20)
+    return snapshots
+
+
+def _legacy(snapshots) -> str:
+    sent = ""
+    out = []
+    for history in snapshots:
+        start = next((i + 1 for i in range(len(history) - 1, -1, -1) if history[i].get('role') == 'user'), 0)
+        turn = "".join(msg_to_str(m) for m in history[start:])
+        if len(turn) > len(sent):
+            out.append(turn[len(sent):])
+            sent = turn
+    return "".join(out)
+
+
+def _builder(snapshots) -> str:
+    builder = TurnStreamBuilder()
+    out = [builder.update(history) for history in snapshots]
+    out.append(builder.finish())
+    return "".join(out)
+
+
+def _time(fn, snapshots) -> float:
+    best = float("inf")
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        fn(snapshots)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    print(f"{'tool steps':>10} {'snapshots':>9} {'legacy us/step':>15} {'builder us/step':>16} {'speedup':>8}")
+    for tool_steps in TOOL_STEPS:
+        snapshots = _simulated_snapshots(tool_steps)
+        final_history = snapshots[-1]
+        final_turn = "".join(msg_to_str(m) for m in final_history[2:])
+        # The legacy slicing garbles tool calls whose arguments were sent while still streaming,
+        # so only the builder is checked against the rendering of the finished turn.
+        assert _builder(snapshots) == final_turn, "builder output differs from the final turn"
+        legacy = _time(_legacy, snapshots) / len(snapshots) * 1e6
+        builder = _time(_builder, snapshots) / len(snapshots) * 1e6
+        print(f"{tool_steps:>10} {len(snapshots):>9} {legacy:>15.1f} {builder:>16.1f} {legacy / builder:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
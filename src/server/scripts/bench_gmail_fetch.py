@@ -0,0 +1,164 @@
+# src/server/scripts/bench_gmail_fetch.py
+# Per-user Gmail poll latency against a local stub of the Gmail API: history.list, messages.list,
+# messages.get and the batch endpoint (/batch or /batch/gmail/v1). Compares the previous fetch,
+# one messages.get per new message, with sync_emails, which fetches metadata then bodies through
+# batch requests. The stub charges ROUND_TRIP_MS per HTTP request and SERVE_MS per message
+# returned, so the numbers show round trips saved, not Google's real latency. Run from src/server with
+#   python -m scripts.bench_gmail_fetch
+import os
+import re
+import json
+import time
+import base64
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+from urllib.parse import urlparse, parse_qs
+
+# Set before workers.poller.gmail.config is imported; "bench" also skips loading any .env file.
+os.environ["ENVIRONMENT"] = "bench"
+os.environ["GMAIL_HISTORY_MAX_MESSAGES"] = "500"
+
+import httplib2
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+
+from workers.poller.gmail import utils as gmail_utils
+from workers.poller.gmail.config import GMAIL_FETCH_BATCH_SIZE
+
+MESSAGE_COUNTS = [25, 100, 500]
+ROUND_TRIP_MS = 30
+SERVE_MS = 1
+ROUNDS = 3
+BODY = base64.urlsafe_b64encode(("Hello from the benchmark mailbox. " * 40).encode("utf-8")).decode("ascii")
+
+
+def _message(msg_id: str, message_format: str) -> Dict:
+    payload = {"mimeType": "text/plain", "headers": [
+        {"name": "Subject", "value": f"Bench message {msg_id}"},
+        {"name": "From", "value": "sender@example.com"},
+        {"name": "To", "value": "me@example.com"},
+    ]}
+    if message_format == "full":
+        payload["body"] = {"data": BODY}
+    return {"id": msg_id, "threadId": msg_id, "snippet": "Hello from the benchmark mailbox.",
+            "internalDate": "1700000000000", "labelIds": ["INBOX"], "payload": payload}
+
+
+class _GmailStub(BaseHTTPRequestHandler):
+    mailbox_size = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status: int, content_type: str, body: bytes):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _resource(self, method: str, url: str):
+        """Returns (status, json body, messages served) for one Gmail API call."""
+        parsed = urlparse(url)
+        query = parse_qs(parsed.query)
+        path = parsed.path
+        if path.endswith("/users/me/history"):
+            added = [{"messagesAdded": [{"message": {"id": f"m{i:05d}"}}]} for i in range(self.mailbox_size)]
+            return 200, {"history": added, "historyId": "2000"}, 0
+        if path.endswith("/users/me/messages"):
+            ids = [{"id": f"m{i:05d}"} for i in range(self.mailbox_size)][:int(query.get("maxResults", ["100"])[0])]
+            return 200, {"messages": ids}, 0
+        match = re.search(r"/users/me/messages/([^/?]+)$", path)
+        if match:
+            return 200, _message(match.group(1), query.get("format", ["full"])[0]), 1
+        if path.endswith("/users/me/profile"):
+            return 200, {"historyId": "2000"}, 0
+        print(f"stub: {method} {url} is not stubbed")
+        return 404, {"error": {"code": 404, "message": f"{method} {path} is not stubbed"}}, 0
+
+    def do_GET(self):
+        status, body, served = self._resource("GET", self.path)
+        time.sleep((ROUND_TRIP_MS + SERVE_MS * served) / 1000)
+        self._reply(status, "application/json", json.dumps(body).encode("utf-8"))
+
+    def do_POST(self):
+        # The bundled discovery document posts to /batch; the per-API /batch/gmail/v1 is the same endpoint.
+        if self.path not in ("/batch", "/batch/gmail/v1"):
+            self._reply(404, "application/json", b"{}")
+            return
+        body = self.rfile.read(int(self.headers["Content-Length"])).decode("utf-8")
+        boundary = re.search(r'boundary="?([^";]+)"?', self.headers["Content-Type"]).group(1)
+        parts, served = [], 0
+        for part in body.split(f"--{boundary}")[1:-1]:
+            content_id = re.search(r"Content-ID: <([^>]+)>", part).group(1)
+            method, url = re.search(r"^(GET|POST) (\S+) HTTP/1.1", part, re.MULTILINE).groups()
+            status, payload, count = self._resource(method, url)
+            served += count
+            parts.append(
+                f"--batch_bench\r\nContent-Type: application/http\r\nContent-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 {status} OK\r\nContent-Type: application/json\r\n\r\n{json.dumps(payload)}\r\n"
+            )
+        time.sleep((ROUND_TRIP_MS + SERVE_MS * served) / 1000)
+        self._reply(200, "multipart/mixed; boundary=batch_bench", ("".join(parts) + "--batch_bench--\r\n").encode("utf-8"))
+
+
+def _service_builder(root_url: str):
+    document = json.loads(get_static_doc("gmail", "v1"))
+    document["rootUrl"] = root_url
+    return lambda *args, **kwargs: build_from_document(document, http=httplib2.Http())
+
+
+async def _poll_sequential(build, count: int) -> int:
+    """The fetch before batching: messages.list, then one full messages.get per id."""
+    loop = asyncio.get_event_loop()
+    service = await loop.run_in_executor(None, build)
+    listed = await loop.run_in_executor(
+        None, lambda: service.users().messages().list(userId="me", q="in:inbox", maxResults=count).execute()
+    )
+    emails = []
+    for info in listed.get("messages", []):
+        msg_full = await loop.run_in_executor(
+            None, lambda: service.users().messages().get(userId="me", id=info["id"], format="full").execute()
+        )
+        emails.append(gmail_utils._parse_message(msg_full))
+    return len(emails)
+
+
+async def _poll_batched(count: int, keep_every: int) -> int:
+    keep = (lambda email: int(email["id"][1:]) % keep_every == 0) if keep_every > 1 else None
+    emails, history_id, failed_ids = await gmail_utils.sync_emails(None, "1000", should_fetch_body=keep)
+    assert history_id == "2000" and not failed_ids and len(emails) == -(-count // keep_every), (history_id, failed_ids, len(emails))
+    return len(emails)
+
+
+async def _time(poll, rounds: int) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        await poll()
+        best = min(best, time.perf_counter() - started)
+    return best * 1e3
+
+
+async def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _GmailStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    build = _service_builder(f"http://127.0.0.1:{server.server_address[1]}/")
+    gmail_utils.build = build
+    print(f"stub: {ROUND_TRIP_MS} ms per HTTP request + {SERVE_MS} ms per message, batch size {GMAIL_FETCH_BATCH_SIZE}")
+    try:
+        for count in MESSAGE_COUNTS:
+            _GmailStub.mailbox_size = count
+            sequential = await _time(lambda: _poll_sequential(build, count), 1)
+            batched = await _time(lambda: _poll_batched(count, 1), ROUNDS)
+            filtered = await _time(lambda: _poll_batched(count, 5), ROUNDS)
+            print(f"{count:>4} messages: sequential gets {sequential:8.0f} ms   batched {batched:6.0f} ms   "
+                  f"batched, 1 in 5 bodies {filtered:6.0f} ms")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,74 @@
+# src/server/scripts/bench_privacy_filter.py
+# Keyword privacy filtering for one poll's worth of emails: the previous per-keyword
+# `any(word.lower() in text)` scan against the cached PrivacyFilterMatcher, whose keywords
+# are compiled into one trie-shaped regex. Run from src/server with
+#   python -m scripts.bench_privacy_filter
+import random
+import string
+import time
+
+from workers.utils.privacy_filter import PrivacyFilterMatcher, get_privacy_matcher
+
+KEYWORD_COUNTS = [10, 100, 1000, 3000]
+EMAILS = 25
+BODY_WORDS = 300
+ROUNDS = 5
+
+
+def _word(rng: random.Random) -> str:
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 10)))
+
+
+def _emails(rng: random.Random, keywords):
+    emails = []
+    for i in range(EMAILS):
+        words = [_word(rng) for _ in range(BODY_WORDS)]
+        if i % 5 == 0:
+            # Some mail should actually be filtered, matched somewhere in the middle of the body.
+            words[BODY_WORDS // 2] = rng.choice(keywords).upper()
+        emails.append({"subject": " ".join(_word(rng) for _ in range(6)), "body": " ".join(words)})
+    return emails
+
+
+def _naive(keywords, emails):
+    results = []
+    for email in emails:
+        content = (email["subject"] + " " + email["body"]).lower()
+        results.append(any(word.lower() in content for word in keywords))
+    return results
+
+
+def _matcher(matcher: PrivacyFilterMatcher, emails):
+    return [bool(matcher.matches_keyword(email["subject"], email["body"])) for email in emails]
+
+
+def _time(fn, *args) -> float:
+    best = float("inf")
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    rng = random.Random(11)
+    print(f"{'keywords':>8} {'naive ms/poll':>14} {'matcher ms/poll':>16} {'speedup':>8} {'compile ms':>11} {'cached lookup us':>17}")
+    for count in KEYWORD_COUNTS:
+        keywords = sorted({_word(rng) for _ in range(count)})
+        emails = _emails(rng, keywords)
+        user_data = {"privacyFilters": {"gmail": {"keywords": keywords}}}
+
+        started = time.perf_counter()
+        matcher = get_privacy_matcher(f"bench-{count}", "gmail", user_data)
+        compile_ms = (time.perf_counter() - started) * 1e3
+        assert _naive(keywords, emails) == _matcher(matcher, emails), "matcher disagrees with the naive scan"
+
+        lookup = _time(get_privacy_matcher, f"bench-{count}", "gmail", user_data)
+        naive = _time(_naive, keywords, emails)
+        compiled = _time(_matcher, matcher, emails)
+        print(f"{count:>8} {naive * 1e3:>14.2f} {compiled * 1e3:>16.2f} {naive / compiled:>7.1f}x {compile_ms:>11.1f} {lookup * 1e6:>17.1f}")
+
+
+if __name__ == "__main__":
+    main()
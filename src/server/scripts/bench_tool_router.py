@@ -0,0 +1,108 @@
+# src/server/scripts/bench_tool_router.py
+# Recall/precision and latency of the local chat tool router on a small labelled query set,
+# swept over confidence thresholds. Run from src/server with
+#   python -m scripts.bench_tool_router
+# "fallback" is the share of queries that would go to the LLM selector in hybrid mode;
+# recall/precision are measured on the queries the local router answers itself.
+import time
+import statistics
+from typing import List, Set, Tuple
+
+from main.chat.tool_router import route_tools_locally
+
+# (query, tools that should be selected). An empty set means no tool is needed.
+LABELLED_QUERIES: List[Tuple[str, Set[str]]] = [
+    ("what's on my calendar tomorrow", {"gcalendar"}),
+    ("schedule a meeting with Priya on Friday at 3pm", {"gcalendar"}),
+    ("am I free this afternoon?", {"gcalendar"}),
+    ("move my dentist appointment to next week", {"gcalendar"}),
+    ("do I have any unread emails from my manager", {"gmail"}),
+    ("reply to the last email from Alex saying thanks", {"gmail"}),
+    ("draft an email to the team about the offsite", {"gmail"}),
+    ("forward the invoice mail to accounting", {"gmail"}),
+    ("find the budget pdf in my drive", {"gdrive"}),
+    ("open the folder with the Q3 reports", {"gdrive"}),
+    ("write a report on renewable energy trends", {"gdocs"}),
+    ("create a google doc summarizing our meeting notes", {"gdocs"}),
+    ("make a 5 slide presentation about our product launch", {"gslides"}),
+    ("build a pitch deck for investors", {"gslides"}),
+    ("put these expenses into a spreadsheet", {"gsheets"}),
+    ("create a sheet with columns name, email and role", {"gsheets"}),
+    ("what's the phone number for John in my contacts", {"gpeople"}),
+    ("add Maria to my address book", {"gpeople"}),
+    ("directions to the airport from here", {"gmaps"}),
+    ("find a good restaurant near me", {"gmaps"}),
+    ("how long is the commute to the office by transit", {"gmaps"}),
+    ("find me a cheap mechanical keyboard to buy", {"gshopping"}),
+    ("what's the price of the new kindle", {"gshopping"}),
+    ("post in the #general slack channel that the build is fixed", {"slack"}),
+    ("read the latest messages in my slack dm with Sam", {"slack"}),
+    ("add this to my notion wiki page", {"notion"}),
+    ("query my notion reading list database", {"notion"}),
+    ("what are today's top headlines", {"news"}),
+    ("latest news about the election", {"news"}),
+    ("search the web for the population of Lisbon", {"internet_search"}),
+    ("look up who won the 2018 world cup", {"internet_search"}),
+    ("will it rain in Mumbai tomorrow", {"accuweather"}),
+    ("what's the weather forecast for the weekend", {"accuweather"}),
+    ("plot my monthly spending as a bar chart", {"quickchart"}),
+    ("visualize these numbers in a pie chart", {"quickchart"}),
+    ("add buy milk to my journal for today", {"journal"}),
+    ("remind me to call mom tonight", {"journal"}),
+    ("remember that my favorite color is green", {"supermemory"}),
+    ("what do you know about me", {"supermemory"}),
+    ("list the open issues in my github repo", {"github"}),
+    ("show me the latest pull requests on the backend repository", {"github"}),
+    ("email the sales spreadsheet to Dana", {"gmail", "gsheets"}),
+    ("check my calendar and email the attendees of today's standup", {"gcalendar", "gmail"}),
+    ("hi, how are you?", set()),
+    ("tell me a joke", set()),
+    ("thanks, that's all", set()),
+]
+
+THRESHOLDS = [0.1, 0.15, 0.2, 0.25, 0.3, 0.4, 0.5]
+MIN_SCORES = [0.1, 0.15, 0.2, 0.25]
+ROUNDS = 200
+
+
+def _evaluate(available_tools: List[str], threshold: float, min_score: float):
+    answered = recall_sum = precision_sum = 0.0
+    for query, expected in LABELLED_QUERIES:
+        selected, confidence = route_tools_locally(query, available_tools, min_score)
+        if confidence < threshold:
+            continue  # Hybrid mode hands this one to the LLM selector.
+        answered += 1
+        chosen = set(selected)
+        recall_sum += len(chosen & expected) / len(expected) if expected else 1.0
+        precision_sum += len(chosen & expected) / len(chosen) if chosen else (1.0 if not expected else 0.0)
+    total = len(LABELLED_QUERIES)
+    fallback = 1 - answered / total
+    recall = recall_sum / answered if answered else 0.0
+    precision = precision_sum / answered if answered else 0.0
+    return fallback, recall, precision
+
+
+def main():
+    from main.config import INTEGRATIONS_CONFIG
+    available_tools = list(INTEGRATIONS_CONFIG.keys())
+
+    timings = []
+    for _ in range(ROUNDS):
+        for query, _ in LABELLED_QUERIES:
+            started = time.perf_counter()
+            route_tools_locally(query, available_tools, 0.15)
+            timings.append(time.perf_counter() - started)
+    timings.sort()
+    print(f"Local routing latency over {len(timings)} calls: "
+          f"mean={statistics.mean(timings) * 1e6:.1f}us p50={timings[len(timings) // 2] * 1e6:.1f}us "
+          f"p99={timings[int(len(timings) * 0.99)] * 1e6:.1f}us")
+    print()
+    print(f"{'threshold':>9} {'min_score':>9} {'fallback':>9} {'recall':>7} {'precision':>9}")
+    for threshold in THRESHOLDS:
+        for min_score in MIN_SCORES:
+            fallback, recall, precision = _evaluate(available_tools, threshold, min_score)
+            print(f"{threshold:>9.2f} {min_score:>9.2f} {fallback:>9.1%} {recall:>7.1%} {precision:>9.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@
 import os
 from celery import Celery
 from celery.schedules import crontab
+from celery.signals import worker_init, worker_process_init, worker_process_shutdown, worker_shutdown
 from dotenv import load_dotenv
 import logging
 
@@ -54,5 +55,33 @@ celery_app.conf.update(
     }
 )
 
+# --- Shared MongoDB client ---
+# Prefork children create their own pool after the fork; solo/threads workers run
+# tasks in the main process, so worker_init is enough to enable lazy creation there.
+@worker_init.connect
+def enable_worker_mongo_pool(**kwargs):
+    from workers.utils.db_pool import enable_shared_mongo_client
+    enable_shared_mongo_client()
+
+@worker_process_init.connect
+def init_worker_mongo_pool(**kwargs):
+    from workers.utils.db_pool import init_shared_mongo_client
+    init_shared_mongo_client()
+
+# --- Async execution mode ---
+# Let in-flight coroutines on the shared event loop finish before the Mongo client goes away.
+# Connected first so it runs before close_worker_mongo_pool.
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def drain_worker_event_loop(**kwargs):
+    from workers.utils.event_loop import shutdown_worker_loop
+    shutdown_worker_loop()
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def close_worker_mongo_pool(**kwargs):
+    from workers.utils.db_pool import close_shared_mongo_client
+    close_shared_mongo_client()
+
 if __name__ == '__main__':
     celery_app.start()
\ No newline at end of file
@@ -11,3 +11,81 @@ if ENVIRONMENT == 'dev-local':
 SUPERMEMORY_MCP_BASE_URL = os.getenv("SUPERMEMORY_MCP_BASE_URL", "https://mcp.supermemory.ai/")
 SUPERMEMORY_MCP_ENDPOINT_SUFFIX = os.getenv("SUPERMEMORY_MCP_ENDPOINT_SUFFIX", "/sse")
 SUPPORTED_POLLING_SERVICES = ["gmail", "gcalendar"]
+# Push-triggered syncs that find an older poll still running retry this many times, this far apart
+PUSH_SYNC_MAX_RETRIES = int(os.getenv("PUSH_SYNC_MAX_RETRIES", 3))
+PUSH_SYNC_RETRY_SECONDS = int(os.getenv("PUSH_SYNC_RETRY_SECONDS", 10))
+
+# Memory writes call Supermemory's addToSupermemory tool directly ("direct"). "agent" routes every
+# fact through the LLM agent; SUPERMEMORY_AGENT_FALLBACK retries failed direct writes via the agent.
+SUPERMEMORY_WRITE_MODE = os.getenv("SUPERMEMORY_WRITE_MODE", "direct").lower()
+SUPERMEMORY_AGENT_FALLBACK = os.getenv("SUPERMEMORY_AGENT_FALLBACK", "false").lower() == "true"
+SUPERMEMORY_ADD_TOOL_NAME = os.getenv("SUPERMEMORY_ADD_TOOL_NAME", "addToSupermemory")
+SUPERMEMORY_CALL_TIMEOUT_SECONDS = int(os.getenv("SUPERMEMORY_CALL_TIMEOUT_SECONDS", 30))
+SUPERMEMORY_CONNECTION_IDLE_SECONDS = int(os.getenv("SUPERMEMORY_CONNECTION_IDLE_SECONDS", 120))
+
+# Memory facts are buffered per user in Redis and written to Supermemory in batches:
+# a buffer is flushed MEMORY_BATCH_WINDOW_SECONDS after its first fact, or as soon as it
+# holds MEMORY_BATCH_MAX_SIZE facts.
+REDIS_URL = os.getenv("REDIS_URL", os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0"))
+MEMORY_BATCH_WINDOW_SECONDS = int(os.getenv("MEMORY_BATCH_WINDOW_SECONDS", 5))
+MEMORY_BATCH_MAX_SIZE = int(os.getenv("MEMORY_BATCH_MAX_SIZE", 25))
+MEMORY_BATCH_MAX_ATTEMPTS = int(os.getenv("MEMORY_BATCH_MAX_ATTEMPTS", 3))
+MEMORY_STORED_IDS_TTL_SECONDS = int(os.getenv("MEMORY_STORED_IDS_TTL_SECONDS", 7 * 24 * 3600))
+
+# Same value as the main server's PROFILE_CACHE_REDIS_URL. Workers publish on it after writing
+# to a user profile (e.g. refreshed Google tokens) so the servers' profile caches drop their copy.
+PROFILE_CACHE_REDIS_URL = os.getenv("PROFILE_CACHE_REDIS_URL")
+
+# Scheduling of polls and user tasks. "beat" scans Mongo on the Celery beat ticks; "due_queue" keeps
+# every due time in sharded Redis sorted sets that `python -m workers.scheduler` drains continuously
+# and dispatches to Celery with exact ETAs. Beat then only reseeds the queues as a safety net.
+SCHEDULER_MODE = os.getenv("SCHEDULER_MODE", "beat").lower()
+DUE_QUEUE_SHARDS = int(os.getenv("DUE_QUEUE_SHARDS", 16))
+DUE_QUEUE_TICK_SECONDS = float(os.getenv("DUE_QUEUE_TICK_SECONDS", 0.25))
+# Items due within this horizon are dispatched now with an ETA rather than on a later tick.
+DUE_QUEUE_DISPATCH_HORIZON_SECONDS = float(os.getenv("DUE_QUEUE_DISPATCH_HORIZON_SECONDS", 1.0))
+DUE_QUEUE_CLAIM_BATCH_SIZE = int(os.getenv("DUE_QUEUE_CLAIM_BATCH_SIZE", 500))
+# Visibility timeout: a claimed item that is not rescheduled or completed within this long after
+# its due time is put back on the queue (e.g. the worker running it died).
+DUE_QUEUE_LEASE_SECONDS = int(os.getenv("DUE_QUEUE_LEASE_SECONDS", 30 * 60))
+DUE_QUEUE_SHARD_OWNER_TTL_SECONDS = int(os.getenv("DUE_QUEUE_SHARD_OWNER_TTL_SECONDS", 10))
+# User tasks are seeded into the queue when due within this window (must exceed the run_due_tasks beat interval).
+DUE_QUEUE_TASK_LOOKAHEAD_SECONDS = int(os.getenv("DUE_QUEUE_TASK_LOOKAHEAD_SECONDS", 15 * 60))
+
+# Beat-mode dispatch of due user tasks: claimed and rescheduled in batches of this size. A claim
+# left behind by a crashed scheduler run expires after the timeout.
+TASK_DISPATCH_BATCH_SIZE = int(os.getenv("TASK_DISPATCH_BATCH_SIZE", 200))
+TASK_DISPATCH_CLAIM_TIMEOUT_SECONDS = int(os.getenv("TASK_DISPATCH_CLAIM_TIMEOUT_SECONDS", 300))
+
+# Shared MongoDB client used by every DB manager inside a Celery worker process
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/")
+WORKER_MONGO_MAX_POOL_SIZE = int(os.getenv("WORKER_MONGO_MAX_POOL_SIZE", 20))
+WORKER_MONGO_MIN_POOL_SIZE = int(os.getenv("WORKER_MONGO_MIN_POOL_SIZE", 0))
+WORKER_MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("WORKER_MONGO_WAIT_QUEUE_TIMEOUT_MS", 10000))
+
+# Async execution mode: one long-lived event loop per worker process runs the coroutines
+# of many Celery tasks concurrently. Pair with `celery worker -P threads --concurrency N`.
+WORKER_ASYNC_MODE = os.getenv("WORKER_ASYNC_MODE", "false").lower() == "true"
+WORKER_ASYNC_MAX_CONCURRENCY = int(os.getenv("WORKER_ASYNC_MAX_CONCURRENCY", 16))
+WORKER_ASYNC_DRAIN_TIMEOUT_SECONDS = int(os.getenv("WORKER_ASYNC_DRAIN_TIMEOUT_SECONDS", 60))
+# Celery task name -> pipeline stage, and the per-stage cap on concurrently running coroutines
+WORKER_TASK_TYPES = {
+    "extract_from_context": "extractor",
+    "process_action_item": "planner",
+    "generate_plan_from_context": "planner",
+    "execute_task_plan": "executor",
+    "process_memory_item": "memory",
+    "enqueue_memory_items": "memory",
+    "flush_memory_buffer": "memory",
+    "poll_gmail_for_user": "poller",
+    "poll_gcalendar_for_user": "poller",
+    "sync_user_on_push": "poller",
+    "run_scheduled_poll": "poller",
+}
+WORKER_TASK_TYPE_CONCURRENCY = {
+    "extractor": int(os.getenv("WORKER_CONCURRENCY_EXTRACTOR", 4)),
+    "planner": int(os.getenv("WORKER_CONCURRENCY_PLANNER", 4)),
+    "executor": int(os.getenv("WORKER_CONCURRENCY_EXECUTOR", 2)),
+    "memory": int(os.getenv("WORKER_CONCURRENCY_MEMORY", 8)),
+    "poller": int(os.getenv("WORKER_CONCURRENCY_POLLER", 8)),
+}
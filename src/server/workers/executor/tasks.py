@@ -4,13 +4,17 @@ import datetime
 import asyncio
 import motor.motor_asyncio
 import logging
+import time
 from typing import Dict, Any, List, Optional
 from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 from main.analytics import capture_event
+from main.mcp_cache import lease_function_list, record_agent_construction, get_mcp_cache_stats
 from qwen_agent.agents import Assistant
 from workers.celery_app import celery_app
 from workers.utils.api_client import notify_user
+from workers.utils.db_pool import get_shared_mongo_client
+from workers.utils.event_loop import run_async
 
 # Load environment variables for the worker from its own config
 from workers.executor.config import (MONGO_URI, MONGO_DB_NAME,
@@ -30,7 +34,8 @@ llm_cfg = {
 
 # --- Database Connection within Celery Task ---
 def get_db_client():
-    return motor.motor_asyncio.AsyncIOMotorClient(MONGO_URI)[MONGO_DB_NAME]
+    client = get_shared_mongo_client() or motor.motor_asyncio.AsyncIOMotorClient(MONGO_URI)
+    return client[MONGO_DB_NAME]
 
 async def update_task_status(db, task_id: str, status: str, user_id: str, details: Dict = None, block_id: Optional[str] = None):
     update_doc = {"status": status, "updated_at": datetime.datetime.now(datetime.timezone.utc)}
@@ -87,13 +92,7 @@ async def add_progress_update(db, task_id: str, user_id: str, message: str, bloc
 @celery_app.task(name="execute_task_plan")
 def execute_task_plan(task_id: str, user_id: str):
     logger.info(f"Celery worker received task 'execute_task_plan' for task_id: {task_id}, user_id: {user_id}")
-    try:
-        loop = asyncio.get_running_loop()
-    except RuntimeError:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-    
-    return loop.run_until_complete(async_execute_task_plan(task_id, user_id))
+    return run_async(async_execute_task_plan(task_id, user_id), task_name="execute_task_plan")
 
 
 async def async_execute_task_plan(task_id: str, user_id: str):
@@ -214,21 +213,31 @@ async def async_execute_task_plan(task_id: str, user_id: str):
         "\nNow, begin your work. Think step-by-step and start executing the plan."
     )
     
+    tool_lease = None
     try:
         await add_progress_update(db, task_id, user_id, f"Initializing executor agent with tools: {list(active_mcp_servers.keys())}", block_id=block_id)
         
+        started_at = time.perf_counter()
+        # Connecting to MCP servers is blocking; keep it off the event loop.
+        tool_lease = await asyncio.to_thread(lease_function_list, tools_config)
         executor_agent = Assistant(
             llm=llm_cfg, 
-            function_list=tools_config,
+            function_list=tool_lease.tools,
             system_message="You are an autonomous executor agent. Your sole purpose is to execute the given plan step-by-step using the available tools. You MUST call the 'update_progress' tool after each step to report on your progress."
         )
+        record_agent_construction("executor", time.perf_counter() - started_at)
+        logger.info(f"Task {task_id}: Executor agent constructed. MCP cache stats: {get_mcp_cache_stats()}")
         
         messages = [{'role': 'user', 'content': full_plan_prompt}]
         
         logger.info(f"Task {task_id}: Starting agent run.")
-        final_history = None
-        for responses in executor_agent.run(messages=messages):
-            final_history = responses
+        def _run_agent_sync():
+            final_history = None
+            for responses in executor_agent.run(messages=messages):
+                final_history = responses
+            return final_history
+
+        final_history = await asyncio.to_thread(_run_agent_sync)
 
         logger.info(f"Task {task_id}: Agent run finished.")
         final_content = "Plan execution finished with no specific output."
@@ -255,4 +264,8 @@ async def async_execute_task_plan(task_id: str, user_id: str):
         logger.error(f"Task {task_id}: {error_message}", exc_info=True)
         await add_progress_update(db, task_id, user_id, f"An error occurred during execution: {error_message}", block_id=block_id)
         await update_task_status(db, task_id, "error", user_id, details={"error": error_message}, block_id=block_id)
-        return {"status": "error", "message": error_message}
\ No newline at end of file
+        return {"status": "error", "message": error_message}
+    finally:
+        # The run is over; cached MCP sessions retired meanwhile can now be closed.
+        if tool_lease is not None:
+            tool_lease.release()
\ No newline at end of file
@@ -7,6 +7,7 @@ import logging
 from typing import Dict
 
 from workers.extractor.config import MONGO_URI, MONGO_DB_NAME
+from workers.utils.db_pool import get_shared_mongo_client
 
 logger = logging.getLogger(__name__)
 
@@ -17,7 +18,9 @@ class ExtractorMongoManager:
     def __init__(self):
         self.client = None
         try:
-            self.client = motor.motor_asyncio.AsyncIOMotorClient(MONGO_URI)
+            shared_client = get_shared_mongo_client()
+            self._owns_client = shared_client is None
+            self.client = shared_client or motor.motor_asyncio.AsyncIOMotorClient(MONGO_URI)
             self.db = self.client[MONGO_DB_NAME]
             self.processed_log_collection = self.db["extractor_processed_log"]
             logger.info("ExtractorMongoManager initialized.")
@@ -89,6 +92,6 @@ class ExtractorMongoManager:
         block_doc["_id"] = str(block_doc["_id"])
         return block_doc
     async def close(self):
-        if self.client:
+        if self.client and self._owns_client:
             self.client.close()
             logger.info("Extractor MongoDB connection closed.")
\ No newline at end of file
@@ -8,6 +8,7 @@ import json
 
 from workers.planner.config import MONGO_URI, MONGO_DB_NAME, INTEGRATIONS_CONFIG
 from workers.utils.crypto import aes_decrypt
+from workers.utils.db_pool import get_shared_mongo_client
 
 logger = logging.getLogger(__name__)
 
@@ -36,7 +37,9 @@ def get_all_mcp_descriptions() -> Dict[str, str]:
 class PlannerMongoManager:
     """A MongoDB manager for the planner worker."""
     def __init__(self):
-        self.client = motor.motor_asyncio.AsyncIOMotorClient(MONGO_URI)
+        shared_client = get_shared_mongo_client()
+        self._owns_client = shared_client is None
+        self.client = shared_client or motor.motor_asyncio.AsyncIOMotorClient(MONGO_URI)
         self.db = self.client[MONGO_DB_NAME]
         self.user_profiles_collection = self.db["user_profiles"]
         self.tasks_collection = self.db["tasks"]
@@ -189,6 +192,7 @@ class PlannerMongoManager:
 
 
     async def close(self):
-        if self.client:
+        # Borrowed worker clients are shared by every task in the process; leave them open.
+        if self.client and self._owns_client:
             self.client.close()
             logger.info("Planner MongoDB connection closed.")
\ No newline at end of file
@@ -1,10 +1,12 @@
 import logging
 import json
+import time
 from qwen_agent.agents import Assistant
 
 from workers.planner import config
 from workers.planner import prompts
 from workers.planner.db import get_all_mcp_descriptions
+from main.mcp_cache import lease_function_list, record_agent_construction
 
 logger = logging.getLogger(__name__)
 
@@ -35,11 +37,13 @@ def get_planner_agent(available_tools: dict, current_time_str: str, user_name: s
     }
 
     try:
+        started_at = time.perf_counter()
         agent = Assistant(
             llm=llm_cfg,
             system_message=system_prompt,
             function_list=[]  # Planner doesn't call tools, just generates the plan
         )
+        record_agent_construction("planner", time.perf_counter() - started_at)
         logger.info("Qwen Planner Agent initialized.")
         return agent
     except Exception as e:
@@ -70,9 +74,17 @@ def get_question_generator_agent(supermemory_mcp_url: str, original_context: dic
         }
     }]
     
-    agent = Assistant(
-        llm=llm_cfg,
-        system_message=system_prompt,
-        function_list=tools_config
-    )
+    started_at = time.perf_counter()
+    lease = lease_function_list(tools_config)
+    try:
+        agent = Assistant(
+            llm=llm_cfg,
+            system_message=system_prompt,
+            function_list=lease.tools
+        )
+    except Exception:
+        lease.release()
+        raise
+    lease.bind(agent)
+    record_agent_construction("question_generator", time.perf_counter() - started_at)
     return agent
\ No newline at end of file
@@ -31,4 +31,18 @@ RECENTLY_ACTIVE_THRESHOLD_HOURS_WORKER = int(os.getenv("WORKER_RECENT_THRESHOLD_
 PEAK_HOURS_START_WORKER = int(os.getenv("WORKER_PEAK_HOURS_START", 8))
 PEAK_HOURS_END_WORKER = int(os.getenv("WORKER_PEAK_HOURS_END", 22))
 
+# Incremental sync (syncToken). The first sync covers events between now minus the lookback
+# and now plus the lookahead, so recurring events don't expand into years of instances.
+GCAL_SYNC_PAGE_SIZE = int(os.getenv("GCAL_SYNC_PAGE_SIZE", 250))
+GCAL_INITIAL_SYNC_LOOKBACK_DAYS = int(os.getenv("GCAL_INITIAL_SYNC_LOOKBACK_DAYS", 1))
+GCAL_INITIAL_SYNC_LOOKAHEAD_DAYS = int(os.getenv("GCAL_INITIAL_SYNC_LOOKAHEAD_DAYS", 30))
+
+# Push notifications. When a watch is active for a user, polling only runs as a slow safety net.
+PUSH_SAFETY_NET_POLL_SECONDS = int(os.getenv("PUSH_SAFETY_NET_POLL_SECONDS", 6 * 60 * 60))
+PUSH_WATCH_RENEW_BEFORE_SECONDS = int(os.getenv("PUSH_WATCH_RENEW_BEFORE_SECONDS", 24 * 60 * 60))
+# Public HTTPS address of the main server's /integrations/push/gcalendar endpoint; unset disables Calendar push.
+GCAL_PUSH_WEBHOOK_URL = os.getenv("GCAL_PUSH_WEBHOOK_URL")
+if GCAL_PUSH_WEBHOOK_URL and not os.getenv("PUSH_NOTIFICATION_SECRET"):
+    print(f"[{datetime.datetime.now()}] [GCalendarPoller_Config_ERROR] GCAL_PUSH_WEBHOOK_URL is set but PUSH_NOTIFICATION_SECRET is not; Calendar push is disabled and polling runs at its normal rate.")
+
 print(f"[{datetime.datetime.now()}] [GCalendarPoller_Config] Config loaded.")
\ No newline at end of file
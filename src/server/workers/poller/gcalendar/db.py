@@ -1,11 +1,12 @@
 import motor.motor_asyncio
-from pymongo import ASCENDING, DESCENDING, IndexModel, ReturnDocument
-from pymongo.errors import DuplicateKeyError
-from typing import Dict, List, Optional, Any
+from pymongo import ASCENDING, DESCENDING, IndexModel, ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError, BulkWriteError
+from typing import Dict, List, Optional, Any, Set, Tuple
 import datetime
 from datetime import timezone # Ensure timezone imported
 
 from workers.poller.gcalendar.config import MONGO_URI, MONGO_DB_NAME # Import from local config
+from workers.utils.db_pool import get_shared_mongo_client
 
 USER_PROFILES_COLLECTION = "user_profiles"
 POLLING_STATE_COLLECTION = "polling_state_store"
@@ -13,7 +14,9 @@ PROCESSED_ITEMS_COLLECTION = "processed_items_log"
 
 class PollerMongoManager:
     def __init__(self):
-        self.client = motor.motor_asyncio.AsyncIOMotorClient(MONGO_URI)
+        shared_client = get_shared_mongo_client()
+        self._owns_client = shared_client is None
+        self.client = shared_client or motor.motor_asyncio.AsyncIOMotorClient(MONGO_URI)
         self.db = self.client[MONGO_DB_NAME]
         self.user_profiles_collection = self.db[USER_PROFILES_COLLECTION]
         self.polling_state_collection = self.db[POLLING_STATE_COLLECTION]
@@ -87,25 +90,107 @@ class PollerMongoManager:
         if result.modified_count > 0:
             print(f"[{datetime.datetime.now()}] [GCalendarPoller_MongoManager] Reset {result.modified_count} stale {service_name.upper()} polling locks.")
 
-    async def log_processed_item(self, user_id: str, service_name: str, item_id: str) -> bool:
+    async def filter_unprocessed(self, user_id: str, service_name: str, item_ids: List[str]) -> List[str]:
+        """Returns the item_ids not yet logged as processed, in input order, with one $in query."""
+        if not item_ids:
+            return []
+        cursor = self.processed_items_collection.find(
+            {"user_id": user_id, "service_name": service_name, "item_id": {"$in": item_ids}},
+            {"item_id": 1, "_id": 0}
+        )
+        processed = {doc["item_id"] async for doc in cursor}
+        return [item_id for item_id in item_ids if item_id not in processed]
+
+    async def mark_processed_many(self, user_id: str, service_name: str, item_ids: List[str]) -> Set[str]:
+        """
+        Logs items as processed with one unordered insert_many and returns the ids this call
+        inserted. Ids that were already logged (e.g. by a concurrent poll) are left out, so
+        only the caller that claimed an item dispatches it.
+        """
+        if not item_ids:
+            return set()
+        now_utc = datetime.datetime.now(timezone.utc)
+        documents = [
+            {"user_id": user_id, "service_name": service_name, "item_id": item_id, "processing_timestamp": now_utc}
+            for item_id in item_ids
+        ]
+        try:
+            await self.processed_items_collection.insert_many(documents, ordered=False)
+            return set(item_ids)
+        except BulkWriteError as e:
+            failed = {err["index"] for err in e.details.get("writeErrors", [])}
+            other_errors = [err for err in e.details.get("writeErrors", []) if err.get("code") != 11000]
+            if other_errors:
+                print(f"[{datetime.datetime.now()}] [GCalendarPoller_DB_ERROR] Logging processed items for {user_id}/{service_name}: {other_errors}")
+            return {item_id for index, item_id in enumerate(item_ids) if index not in failed}
+
+    async def get_item_hashes(self, user_id: str, service_name: str, item_ids: List[str]) -> Dict[str, Optional[str]]:
+        """Content hashes recorded for the given items; items never processed are absent."""
+        if not item_ids:
+            return {}
+        cursor = self.processed_items_collection.find(
+            {"user_id": user_id, "service_name": service_name, "item_id": {"$in": item_ids}},
+            {"item_id": 1, "content_hash": 1, "_id": 0}
+        )
+        return {doc["item_id"]: doc.get("content_hash") async for doc in cursor}
+
+    async def backfill_item_hashes(self, user_id: str, service_name: str, hashes: Dict[str, Tuple[Optional[str], str]]):
+        """
+        Upgrades stored hashes without claiming the items: `hashes` maps item id to (the hash
+        stored for it, None for rows written before hashes existed, and its current hash).
+        Rows changed in the meantime don't match and are left alone.
+        """
+        if not hashes:
+            return
+        operations = [
+            UpdateOne(
+                {"user_id": user_id, "service_name": service_name, "item_id": item_id, "content_hash": stored_hash},
+                {"$set": {"content_hash": new_hash}}
+            )
+            for item_id, (stored_hash, new_hash) in hashes.items()
+        ]
+        await self.processed_items_collection.bulk_write(operations, ordered=False)
+
+    async def claim_item_hashes(self, user_id: str, service_name: str, hashes: Dict[str, str]) -> Set[str]:
+        """
+        Records new content hashes in one unordered bulk_write and returns the item ids this
+        call claimed: items never seen before or whose stored hash differed. An item already
+        stored with the same hash (e.g. claimed by a concurrent poll), or stored without one,
+        fails the upsert with a duplicate key and is left out.
+        """
+        if not hashes:
+            return set()
+        now_utc = datetime.datetime.now(timezone.utc)
+        item_ids = list(hashes)
+        operations = [
+            UpdateOne(
+                # $exists keeps a legacy row without a hash from matching $ne; those are backfilled instead.
+                {"user_id": user_id, "service_name": service_name, "item_id": item_id,
+                 "content_hash": {"$exists": True, "$ne": hashes[item_id]}},
+                {"$set": {"content_hash": hashes[item_id], "processing_timestamp": now_utc}},
+                upsert=True
+            )
+            for item_id in item_ids
+        ]
         try:
-            await self.processed_items_collection.insert_one({
-                "user_id": user_id, "service_name": service_name, "item_id": item_id,
-                "processing_timestamp": datetime.datetime.now(timezone.utc)
-            })
-            return True
-        except DuplicateKeyError: return True
-        except Exception as e:
-            print(f"[{datetime.datetime.now()}] [GCalendarPoller_DB_ERROR] Logging processed item {user_id}/{service_name}/{item_id}: {e}")
-            return False
-
-    async def is_item_processed(self, user_id: str, service_name: str, item_id: str) -> bool:
-        count = await self.processed_items_collection.count_documents(
-            {"user_id": user_id, "service_name": service_name, "item_id": item_id}
+            await self.processed_items_collection.bulk_write(operations, ordered=False)
+            return set(item_ids)
+        except BulkWriteError as e:
+            failed = {err["index"] for err in e.details.get("writeErrors", [])}
+            other_errors = [err for err in e.details.get("writeErrors", []) if err.get("code") != 11000]
+            if other_errors:
+                print(f"[{datetime.datetime.now()}] [GCalendarPoller_DB_ERROR] Storing hashes for {user_id}/{service_name}: {other_errors}")
+            return {item_id for index, item_id in enumerate(item_ids) if index not in failed}
+
+    async def delete_processed_items(self, user_id: str, service_name: str, item_ids: List[str]) -> int:
+        if not item_ids:
+            return 0
+        result = await self.processed_items_collection.delete_many(
+            {"user_id": user_id, "service_name": service_name, "item_id": {"$in": item_ids}}
         )
-        return count > 0
+        return result.deleted_count
 
     async def close(self):
-        if self.client:
+        if self.client and self._owns_client:
             self.client.close()
             print(f"[{datetime.datetime.now()}] [GCalendarPoller_MongoManager] MongoDB connection closed.")
\ No newline at end of file
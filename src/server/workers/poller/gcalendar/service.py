@@ -2,11 +2,17 @@ import asyncio
 import datetime
 from datetime import timezone
 import traceback
+import time
 import logging
 
-from workers.poller.gcalendar.config import POLLING_INTERVALS_WORKER as POLL_CFG
+from workers.poller.gcalendar.config import POLLING_INTERVALS_WORKER as POLL_CFG, PUSH_SAFETY_NET_POLL_SECONDS
 from workers.poller.gcalendar.db import PollerMongoManager
-from workers.poller.gcalendar.utils import get_gcalendar_credentials, fetch_events
+from workers.poller.gcalendar.utils import (get_gcalendar_credentials, sync_events, compute_event_hash,
+                                            compute_legacy_event_hash, ensure_calendar_watch)
+from workers.config import SCHEDULER_MODE
+from workers.utils.due_queue import sync_polling_schedule
+from workers.utils.push_tokens import push_enabled
+from workers.utils.privacy_filter import get_privacy_matcher
 from googleapiclient.errors import HttpError
 
 logger = logging.getLogger(__name__)
@@ -67,9 +73,7 @@ class GCalendarPollingService:
                 updated_state["next_scheduled_poll_time"] = datetime.datetime.now(timezone.utc) + datetime.timedelta(days=1)
                 return
 
-            all_privacy_filters = user_profile.get("userData", {}).get("privacyFilters", {})
-            calendar_filters = all_privacy_filters.get("gcalendar", {})
-            keyword_filters = calendar_filters.get("keywords", [])
+            privacy_matcher = get_privacy_matcher(user_id, self.service_name, user_profile.get("userData", {}))
             
             creds = await get_gcalendar_credentials(user_id, self.db_manager)
             if not creds:
@@ -79,31 +83,61 @@ class GCalendarPollingService:
                 updated_state["next_scheduled_poll_time"] = datetime.datetime.now(timezone.utc) + datetime.timedelta(days=1)
                 return
 
-            last_updated_iso = polling_state.get("last_successful_poll_timestamp_iso")
-            events, new_last_updated_iso = await fetch_events(creds, last_updated_iso, max_results=50)
-            
-            processed_count = 0
-            for event in events:
+            sync_token = polling_state.get("gcalendar_sync_token")
+            events, next_sync_token = await sync_events(creds, sync_token)
+
+            # Cancelled events need no extraction; forget them so a re-created event is treated as new.
+            cancelled_ids = [e["id"] for e in events if e.get("status") == "cancelled"]
+            live_events = [e for e in events if e.get("status") != "cancelled"]
+            deleted_count = await self.db_manager.delete_processed_items(user_id, self.service_name, cancelled_ids)
+
+            known_hashes = await self.db_manager.get_item_hashes(user_id, self.service_name, [e["id"] for e in live_events])
+            changed = {}
+            backfill = {}
+            for event in live_events:
                 event_id = event["id"]
 
-                content_to_check = (event.get("summary", "") + " " + event.get("description", "")).lower()
-                if any(word.lower() in content_to_check for word in keyword_filters):
+                if privacy_matcher.matches_keyword(event.get("summary", ""), event.get("description", "")):
                     logger.info(f"Skipping event {event_id} for user {user_id} due to privacy filter match.")
-                    # Log as processed to avoid re-checking
                     continue
 
-                if not await self.db_manager.is_item_processed(user_id, self.service_name, event_id):
-                    # Dispatch a Celery task for each new event
-                    from workers.tasks import extract_from_context
-                    extract_from_context.delay(user_id, self.service_name, event_id, event)
-                    await self.db_manager.log_processed_item(user_id, self.service_name, event_id)
-                    processed_count += 1
+                content_hash = compute_event_hash(event)
+                stored_hash = known_hashes.get(event_id)
+                if event_id in known_hashes and stored_hash in (None, compute_legacy_event_hash(event)):
+                    # Processed before hashes (or the current hash) existed and unchanged since: record, don't re-extract.
+                    backfill[event_id] = (stored_hash, content_hash)
+                elif stored_hash != content_hash:
+                    # New event, or one whose summary, description, time or attendees changed
+                    changed[event_id] = (event, content_hash)
+            await self.db_manager.backfill_item_hashes(user_id, self.service_name, backfill)
+
+            # Claim before dispatching: a crash after this point can skip an extraction but never repeat one.
+            claimed_ids = await self.db_manager.claim_item_hashes(
+                user_id, self.service_name, {event_id: content_hash for event_id, (_, content_hash) in changed.items()}
+            )
+            processed_count = 0
+            if claimed_ids:
+                from workers.tasks import extract_from_context
+                for event_id, (event, _) in changed.items():
+                    if event_id in claimed_ids:
+                        extract_from_context.delay(user_id, self.service_name, event_id, event)
+                        processed_count += 1
 
             if processed_count > 0:
-                logger.info(f"Processed and sent {processed_count} new GCalendar events to Kafka for user {user_id}.")
-            
-            updated_state["last_successful_poll_timestamp_iso"] = new_last_updated_iso
-            updated_state["last_successful_poll_status_message"] = f"Successfully polled. Found {len(events)} updated events, processed {processed_count} new."
+                logger.info(f"Processed and sent {processed_count} new or changed GCalendar events for user {user_id}.")
+
+            if next_sync_token:
+                updated_state["gcalendar_sync_token"] = next_sync_token
+            updated_state["last_successful_poll_timestamp_iso"] = datetime.datetime.now(timezone.utc).isoformat()
+            updated_state["last_successful_poll_status_message"] = (
+                f"Successfully polled. Found {len(events)} changed events, processed {processed_count}, "
+                f"removed {deleted_count} cancelled."
+            )
+            try:
+                updated_state.update(await ensure_calendar_watch(creds, user_id, updated_state))
+            except Exception as watch_error:
+                # Polling keeps working without push; the next cycle retries the registration.
+                logger.warning(f"Could not register GCalendar push watch for user {user_id}: {watch_error}")
             updated_state["consecutive_failure_count"] = 0
             updated_state["error_backoff_until_timestamp"] = None
 
@@ -125,10 +159,15 @@ class GCalendarPollingService:
                     updated_state["next_scheduled_poll_time"] = datetime.datetime.now(timezone.utc) + datetime.timedelta(days=1)
             else:
                 next_interval = self._calculate_next_poll_interval(user_profile or {})
+                if push_enabled() and (updated_state.get("gcalendar_watch_expiration_ms") or 0) > time.time() * 1000:
+                    # Push notifications trigger syncs for this user; polling is just a safety net.
+                    next_interval = max(next_interval, PUSH_SAFETY_NET_POLL_SECONDS)
                 updated_state["next_scheduled_poll_time"] = datetime.datetime.now(timezone.utc) + datetime.timedelta(seconds=next_interval)
             
             updated_state["is_currently_polling"] = False
             await self.db_manager.update_polling_state(user_id, self.service_name, updated_state)
+            if SCHEDULER_MODE == "due_queue":
+                await sync_polling_schedule(self.service_name, user_id, updated_state)
             logger.info(f"GCalendar poll cycle finished for user {user_id}. Next poll at {updated_state['next_scheduled_poll_time']}.")
 
     async def run_scheduler_loop(self):
@@ -1,6 +1,7 @@
 import os
 import datetime
 import json
+import hashlib
 from datetime import timezone
 from google.oauth2.credentials import Credentials
 from google.auth.transport.requests import Request as GoogleAuthRequest
@@ -9,6 +10,10 @@ from googleapiclient.errors import HttpError
 
 from workers.utils.crypto import aes_decrypt, aes_encrypt
 from workers.poller.gcalendar.db import PollerMongoManager
+from workers.poller.gcalendar.config import (GCAL_SYNC_PAGE_SIZE, GCAL_INITIAL_SYNC_LOOKBACK_DAYS, GCAL_INITIAL_SYNC_LOOKAHEAD_DAYS,
+                                             GCAL_PUSH_WEBHOOK_URL, PUSH_WATCH_RENEW_BEFORE_SECONDS)
+from workers.utils.profile_invalidation import publish_profile_invalidation
+from workers.utils.push_tokens import make_channel_token, push_enabled
 from typing import Optional, List, Dict, Tuple
 
 async def get_gcalendar_credentials(user_id: str, db_manager: PollerMongoManager) -> Optional[Credentials]:
@@ -36,48 +41,138 @@ async def get_gcalendar_credentials(user_id: str, db_manager: PollerMongoManager
                 {"user_id": user_id},
                 {"$set": {"userData.integrations.gcalendar.credentials": encrypted_refreshed_creds}}
             )
+            await publish_profile_invalidation(user_id)
         
         return creds if creds.valid else None
     except Exception as e:
         print(f"[{datetime.datetime.now()}] [GCalendarPoller_Auth_ERROR] Failed to get credentials for {user_id}: {e}")
         return None
 
-async def fetch_events(creds: Credentials, last_updated_iso: Optional[str] = None, max_results: int = 50) -> Tuple[List[Dict], str]:
+class SyncTokenExpired(Exception):
+    """Google returned 410 Gone for the stored syncToken; a full sync is required."""
+
+
+def compute_event_hash(event: Dict) -> str:
+    """
+    Hash of the fields that matter to extraction, so edits to anything else are ignored.
+    Attendee RSVPs are left out: a response changes nothing worth re-extracting.
+    """
+    relevant = {
+        "summary": event.get("summary", ""),
+        "description": event.get("description", ""),
+        "start": event.get("start", {}),
+        "end": event.get("end", {}),
+        "attendees": sorted(a.get("email", "") for a in event.get("attendees", [])),
+    }
+    return hashlib.sha1(json.dumps(relevant, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def compute_legacy_event_hash(event: Dict) -> str:
+    """The hash stored before RSVPs were left out; recognized so those rows are upgraded, not re-extracted."""
+    relevant = {
+        "summary": event.get("summary", ""),
+        "description": event.get("description", ""),
+        "start": event.get("start", {}),
+        "end": event.get("end", {}),
+        "attendees": sorted(
+            (a.get("email", ""), a.get("responseStatus", "")) for a in event.get("attendees", [])
+        ),
+    }
+    return hashlib.sha1(json.dumps(relevant, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _list_all_event_changes(service, sync_token: Optional[str]) -> Tuple[List[Dict], Optional[str]]:
+    events: List[Dict] = []
+    page_token = None
+    list_params = {
+        'calendarId': 'primary',
+        'maxResults': GCAL_SYNC_PAGE_SIZE,
+        'singleEvents': True,
+        'showDeleted': True # Important to capture cancellations
+    }
+    if sync_token:
+        list_params['syncToken'] = sync_token
+    else:
+        # The first sync only covers recent and upcoming events; later syncs keep this scope.
+        now = datetime.datetime.now(timezone.utc)
+        list_params['timeMin'] = (now - datetime.timedelta(days=GCAL_INITIAL_SYNC_LOOKBACK_DAYS)).isoformat()
+        list_params['timeMax'] = (now + datetime.timedelta(days=GCAL_INITIAL_SYNC_LOOKAHEAD_DAYS)).isoformat()
+    while True:
+        try:
+            results = service.events().list(pageToken=page_token, **list_params).execute()
+        except HttpError as error:
+            if error.resp.status == 410:
+                raise SyncTokenExpired() from error
+            raise
+        events.extend(results.get('items', []))
+        page_token = results.get('nextPageToken')
+        if not page_token:
+            # nextSyncToken is only present on the last page.
+            return events, results.get('nextSyncToken')
+
+
+async def sync_events(creds: Credentials, sync_token: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+    """
+    Returns every event changed since `sync_token` (all pages, cancellations included) and
+    the token for the next sync. An expired token falls back to a full sync.
+    """
     import asyncio
     try:
         loop = asyncio.get_event_loop()
         service = await loop.run_in_executor(None, lambda: build('calendar', 'v3', credentials=creds))
-        
-        now = datetime.datetime.now(timezone.utc)
-        
-        list_params = {
-            'calendarId': 'primary',
-            'maxResults': max_results,
-            'singleEvents': True,
-            'orderBy': 'updated',
-            'showDeleted': True # Important to capture cancellations
-        }
-        if last_updated_iso:
-            list_params['updatedMin'] = last_updated_iso
-
-        results = await loop.run_in_executor(None, 
-            lambda: service.events().list(**list_params).execute()
-        )
-        events_data = results.get('items', [])
-        
-        # The new "last updated" time is now, to ensure we don't miss anything between polls.
-        new_last_updated_iso = now.isoformat()
+        try:
+            events, next_sync_token = await loop.run_in_executor(None, _list_all_event_changes, service, sync_token)
+        except SyncTokenExpired:
+            print(f"[{datetime.datetime.now()}] [GCalendarPoller_Sync] Sync token expired. Running a full sync.")
+            events, next_sync_token = await loop.run_in_executor(None, _list_all_event_changes, service, None)
 
-        if not events_data:
-            return [], new_last_updated_iso
+        if events:
+            print(f"[{datetime.datetime.now()}] [GCalendarPoller_Sync] Found {len(events)} changed events.")
+        return events, next_sync_token
 
-        print(f"[{datetime.datetime.now()}] [GCalendarPoller_Fetch] Found {len(events_data)} updated events.")
-        
-        return events_data, new_last_updated_iso
-        
     except HttpError as error:
-        print(f"[{datetime.datetime.now()}] [GCalendarPoller_Fetch_ERROR] An API error occurred: {error}")
+        print(f"[{datetime.datetime.now()}] [GCalendarPoller_Sync_ERROR] An API error occurred: {error}")
         raise error
-    except Exception as e:
-        print(f"[{datetime.datetime.now()}] [GCalendarPoller_Fetch_ERROR] Unexpected error fetching events: {e}")
-        return [], datetime.datetime.now(timezone.utc).isoformat()
\ No newline at end of file
+
+
+async def ensure_calendar_watch(creds: Credentials, user_id: str, polling_state: Dict) -> Dict:
+    """
+    Opens (or renews, when close to expiry) a push channel on the primary calendar that
+    posts to GCAL_PUSH_WEBHOOK_URL. The replaced channel is stopped on a best-effort basis.
+    Returns the polling state fields to update.
+    """
+    import asyncio
+    import time
+    import uuid
+    if not GCAL_PUSH_WEBHOOK_URL or not push_enabled():
+        return {}
+    expiration_ms = polling_state.get("gcalendar_watch_expiration_ms") or 0
+    if expiration_ms > (time.time() + PUSH_WATCH_RENEW_BEFORE_SECONDS) * 1000:
+        return {}
+
+    loop = asyncio.get_event_loop()
+    service = await loop.run_in_executor(None, lambda: build('calendar', 'v3', credentials=creds))
+    channel_body = {
+        'id': str(uuid.uuid4()),
+        'type': 'web_hook',
+        'address': GCAL_PUSH_WEBHOOK_URL,
+        'token': make_channel_token(user_id),
+    }
+    response = await loop.run_in_executor(None, lambda: service.events().watch(calendarId='primary', body=channel_body).execute())
+
+    old_channel_id = polling_state.get("gcalendar_channel_id")
+    old_resource_id = polling_state.get("gcalendar_resource_id")
+    if old_channel_id and old_resource_id:
+        try:
+            await loop.run_in_executor(None, lambda: service.channels().stop(
+                body={'id': old_channel_id, 'resourceId': old_resource_id}
+            ).execute())
+        except HttpError as error:
+            print(f"[{datetime.datetime.now()}] [GCalendarPoller_Push] Could not stop old channel {old_channel_id}: {error}")
+
+    print(f"[{datetime.datetime.now()}] [GCalendarPoller_Push] Opened channel {channel_body['id']}, expires at {response.get('expiration')}.")
+    return {
+        "gcalendar_channel_id": channel_body['id'],
+        "gcalendar_resource_id": response.get('resourceId'),
+        "gcalendar_watch_expiration_ms": int(response.get('expiration', 0)),
+    }
@@ -42,4 +42,27 @@ RECENTLY_ACTIVE_THRESHOLD_HOURS_WORKER = int(os.getenv("WORKER_RECENT_THRESHOLD_
 PEAK_HOURS_START_WORKER = int(os.getenv("WORKER_PEAK_HOURS_START", 8))
 PEAK_HOURS_END_WORKER = int(os.getenv("WORKER_PEAK_HOURS_END", 22))
 
+# Message fetching. Gmail accepts up to 100 calls per batch request but recommends <= 50
+# to stay under per-user rate limits.
+GMAIL_POLL_MAX_RESULTS = int(os.getenv("GMAIL_POLL_MAX_RESULTS", 25))
+GMAIL_FETCH_BATCH_SIZE = min(int(os.getenv("GMAIL_FETCH_BATCH_SIZE", 50)), 100)
+
+# "history" syncs incrementally from the stored mailbox historyId; "query" re-runs the
+# "is:unread after:<ts>" search every poll.
+GMAIL_SYNC_MODE = os.getenv("GMAIL_SYNC_MODE", "history")
+GMAIL_HISTORY_MAX_MESSAGES = int(os.getenv("GMAIL_HISTORY_MAX_MESSAGES", 200))
+# history.list pages (500 records each) read per poll; a longer backlog falls back to the resync below.
+GMAIL_HISTORY_MAX_PAGES = int(os.getenv("GMAIL_HISTORY_MAX_PAGES", 10))
+# Bounds for the full resync used on first poll or when the stored historyId has expired.
+GMAIL_RESYNC_MAX_RESULTS = int(os.getenv("GMAIL_RESYNC_MAX_RESULTS", 50))
+GMAIL_RESYNC_LOOKBACK_DAYS = int(os.getenv("GMAIL_RESYNC_LOOKBACK_DAYS", 1))
+
+# Push notifications. When a watch is active for a user, polling only runs as a slow safety net.
+PUSH_SAFETY_NET_POLL_SECONDS = int(os.getenv("PUSH_SAFETY_NET_POLL_SECONDS", 6 * 60 * 60))
+PUSH_WATCH_RENEW_BEFORE_SECONDS = int(os.getenv("PUSH_WATCH_RENEW_BEFORE_SECONDS", 24 * 60 * 60))
+# Cloud Pub/Sub topic for users.watch (projects/<project>/topics/<topic>); unset disables Gmail push.
+GMAIL_PUSH_TOPIC = os.getenv("GMAIL_PUSH_TOPIC")
+if GMAIL_PUSH_TOPIC and not os.getenv("PUSH_NOTIFICATION_SECRET"):
+    print(f"[{datetime.datetime.now()}] [GmailPoller_Config_ERROR] GMAIL_PUSH_TOPIC is set but PUSH_NOTIFICATION_SECRET is not; Gmail push is disabled and polling runs at its normal rate.")
+
 print(f"[{datetime.datetime.now()}] [GmailPoller_Config] Config loaded.")
\ No newline at end of file
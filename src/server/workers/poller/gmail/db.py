@@ -2,12 +2,13 @@
 # Replicated MongoManager, tailored for poller needs
 import motor.motor_asyncio
 from pymongo import ASCENDING, DESCENDING, IndexModel, ReturnDocument
-from pymongo.errors import DuplicateKeyError
-from typing import Dict, List, Optional, Any
+from pymongo.errors import DuplicateKeyError, BulkWriteError
+from typing import Dict, List, Optional, Any, Set
 import datetime
 from datetime import timezone # Ensure timezone imported
 
 from workers.poller.gmail.config import MONGO_URI, MONGO_DB_NAME # Import from local config
+from workers.utils.db_pool import get_shared_mongo_client
 
 USER_PROFILES_COLLECTION = "user_profiles"
 POLLING_STATE_COLLECTION = "polling_state_store"
@@ -15,7 +16,9 @@ PROCESSED_ITEMS_COLLECTION = "processed_items_log"
 
 class PollerMongoManager:
     def __init__(self):
-        self.client = motor.motor_asyncio.AsyncIOMotorClient(MONGO_URI)
+        shared_client = get_shared_mongo_client()
+        self._owns_client = shared_client is None
+        self.client = shared_client or motor.motor_asyncio.AsyncIOMotorClient(MONGO_URI)
         self.db = self.client[MONGO_DB_NAME]
         self.user_profiles_collection = self.db[USER_PROFILES_COLLECTION]
         self.polling_state_collection = self.db[POLLING_STATE_COLLECTION]
@@ -83,6 +86,40 @@ class PollerMongoManager:
         )
         return doc
     
+    async def get_enabled_polling_schedules(self, service_name: str) -> List[Dict[str, Any]]:
+        """user_id and next poll time of every enabled polling state, for seeding the due queue."""
+        cursor = self.polling_state_collection.find(
+            {"service_name": service_name, "is_enabled": True},
+            {"user_id": 1, "next_scheduled_poll_time": 1, "_id": 0}
+        )
+        return await cursor.to_list(length=None)
+
+    async def claim_polling_state_for_push(self, user_id: str, service_name: str, received_at: datetime.datetime) -> Optional[Dict[str, Any]]:
+        """
+        Locks a user's polling state for a push-triggered sync regardless of its schedule.
+        Returns None if polling is disabled or backing off, if a poll is already running,
+        or if a poll started after the notification arrived (it already covers the change).
+        """
+        now_utc = datetime.datetime.now(timezone.utc)
+        return await self.polling_state_collection.find_one_and_update(
+            {"user_id": user_id, "service_name": service_name, "is_enabled": True, "is_currently_polling": False,
+             "$and": [
+                 {"$or": [{"error_backoff_until_timestamp": None}, {"error_backoff_until_timestamp": {"$lte": now_utc}}]},
+                 {"$or": [{"last_attempted_poll_timestamp": None}, {"last_attempted_poll_timestamp": {"$lt": received_at}}]}
+             ]},
+            {"$set": {"is_currently_polling": True, "last_attempted_poll_timestamp": now_utc}},
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def is_poll_running_since_before(self, user_id: str, service_name: str, received_at: datetime.datetime) -> bool:
+        """True if a poll that started before `received_at` is still running (so it may miss the change)."""
+        count = await self.polling_state_collection.count_documents(
+            {"user_id": user_id, "service_name": service_name, "is_enabled": True,
+             "is_currently_polling": True, "last_attempted_poll_timestamp": {"$lt": received_at}},
+            limit=1
+        )
+        return count > 0
+
     async def reset_stale_polling_locks(self, service_name: str, timeout_minutes: int = 30):
         stale_threshold = datetime.datetime.now(timezone.utc) - datetime.timedelta(minutes=timeout_minutes)
         result = await self.polling_state_collection.update_many(
@@ -94,25 +131,41 @@ class PollerMongoManager:
             print(f"[{datetime.datetime.now()}] [GmailPoller_MongoManager] Reset {result.modified_count} stale GMAIL polling locks.")
 
 
-    async def log_processed_item(self, user_id: str, service_name: str, item_id: str) -> bool:
-        try:
-            await self.processed_items_collection.insert_one({
-                "user_id": user_id, "service_name": service_name, "item_id": item_id,
-                "processing_timestamp": datetime.datetime.now(timezone.utc)
-            })
-            return True
-        except DuplicateKeyError: return True # Already processed
-        except Exception as e:
-            print(f"[{datetime.datetime.now()}] [GmailPoller_DB_ERROR] Logging processed item {user_id}/{service_name}/{item_id}: {e}")
-            return False
-
-    async def is_item_processed(self, user_id: str, service_name: str, item_id: str) -> bool:
-        count = await self.processed_items_collection.count_documents(
-            {"user_id": user_id, "service_name": service_name, "item_id": item_id}
+    async def filter_unprocessed(self, user_id: str, service_name: str, item_ids: List[str]) -> List[str]:
+        """Returns the item_ids not yet logged as processed, in input order, with one $in query."""
+        if not item_ids:
+            return []
+        cursor = self.processed_items_collection.find(
+            {"user_id": user_id, "service_name": service_name, "item_id": {"$in": item_ids}},
+            {"item_id": 1, "_id": 0}
         )
-        return count > 0
+        processed = {doc["item_id"] async for doc in cursor}
+        return [item_id for item_id in item_ids if item_id not in processed]
+
+    async def mark_processed_many(self, user_id: str, service_name: str, item_ids: List[str]) -> Set[str]:
+        """
+        Logs items as processed with one unordered insert_many and returns the ids this call
+        inserted. Ids that were already logged (e.g. by a concurrent poll) are left out, so
+        only the caller that claimed an item dispatches it.
+        """
+        if not item_ids:
+            return set()
+        now_utc = datetime.datetime.now(timezone.utc)
+        documents = [
+            {"user_id": user_id, "service_name": service_name, "item_id": item_id, "processing_timestamp": now_utc}
+            for item_id in item_ids
+        ]
+        try:
+            await self.processed_items_collection.insert_many(documents, ordered=False)
+            return set(item_ids)
+        except BulkWriteError as e:
+            failed = {err["index"] for err in e.details.get("writeErrors", [])}
+            other_errors = [err for err in e.details.get("writeErrors", []) if err.get("code") != 11000]
+            if other_errors:
+                print(f"[{datetime.datetime.now()}] [GmailPoller_DB_ERROR] Logging processed items for {user_id}/{service_name}: {other_errors}")
+            return {item_id for index, item_id in enumerate(item_ids) if index not in failed}
 
     async def close(self):
-        if self.client:
+        if self.client and self._owns_client:
             self.client.close()
             print(f"[{datetime.datetime.now()}] [GmailPoller_MongoManager] MongoDB connection closed.")
\ No newline at end of file
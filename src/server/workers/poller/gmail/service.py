@@ -4,11 +4,15 @@ from datetime import timezone
 import traceback
 import time # For sleep
 import logging # Import logging
-import re
 
-from workers.poller.gmail.config import POLLING_INTERVALS_WORKER as POLL_CFG
+from workers.poller.gmail.config import (POLLING_INTERVALS_WORKER as POLL_CFG, GMAIL_POLL_MAX_RESULTS, GMAIL_SYNC_MODE,
+                                         PUSH_SAFETY_NET_POLL_SECONDS)
 from workers.poller.gmail.db import PollerMongoManager
-from workers.poller.gmail.utils import get_gmail_credentials, fetch_emails
+from workers.poller.gmail.utils import get_gmail_credentials, fetch_emails, sync_emails, ensure_gmail_watch
+from workers.config import SCHEDULER_MODE
+from workers.utils.due_queue import sync_polling_schedule
+from workers.utils.push_tokens import push_enabled
+from workers.utils.privacy_filter import PrivacyFilterMatcher, get_privacy_matcher
 from googleapiclient.errors import HttpError # Import HttpError
 
 logger = logging.getLogger(__name__)
@@ -56,6 +60,18 @@ class GmailPollingService:
         polling_state["next_scheduled_poll_time"] = datetime.datetime.now(timezone.utc) + datetime.timedelta(seconds=backoff_seconds)
         logger.warning(f"User {user_id} experiencing {failures} failures. Backing off for {backoff_seconds}s.")
 
+    @staticmethod
+    def _filter_reason(email: dict, matcher: PrivacyFilterMatcher, with_body: bool):
+        """Returns which privacy filter (keyword, sender or label) excludes the email, or None."""
+        text = email.get("body", "") if with_body else email.get("snippet", "")
+        if matcher.matches_keyword(email.get("subject", ""), text):
+            return "keyword"
+        if matcher.blocks_sender(email.get("from", "")):
+            return "sender"
+        if matcher.blocks_labels(email.get("labels", [])):
+            return "label"
+        return None
+
     async def _run_single_user_poll_cycle(self, user_id: str, polling_state: dict):
         logger.info(f"Starting poll cycle for user {user_id}")
         updated_state = polling_state.copy() # To modify and save later
@@ -69,11 +85,7 @@ class GmailPollingService:
                 updated_state["next_scheduled_poll_time"] = datetime.datetime.now(timezone.utc) + datetime.timedelta(days=1)
                 return
 
-            all_privacy_filters = user_profile.get("userData", {}).get("privacyFilters", {})
-            gmail_filters = all_privacy_filters.get("gmail", {})
-            keyword_filters = gmail_filters.get("keywords", [])
-            email_filters = [email.lower() for email in gmail_filters.get("emails", [])]
-            label_filters = [label.lower() for label in gmail_filters.get("labels", [])]
+            privacy_matcher = get_privacy_matcher(user_id, self.service_name, user_profile.get("userData", {}))
 
             creds = await get_gmail_credentials(user_id, self.db_manager)
             if not creds:
@@ -85,40 +97,48 @@ class GmailPollingService:
                 return
 
             last_ts_unix = polling_state.get("last_successful_poll_timestamp_unix")
-            emails = await fetch_emails(creds, last_ts_unix, max_results=25) # Fetch up to 25 new emails
-            
-            processed_count = 0
 
-            for email in emails:
-                email_item_id = email["id"]
-                
-                # Keyword check
-                content_to_check = (email.get("subject", "") + " " + email.get("body", "")).lower()
-                if any(word.lower() in content_to_check for word in keyword_filters):
-                    logger.info(f"Skipping email {email['id']} for user {user_id} due to keyword filter match.")
-                    continue
-                
-                # Sender email check
-                sender_header = email.get("from", "")
-                sender_match = re.search(r'<(.+?)>', sender_header)
-                sender_email = sender_match.group(1).lower() if sender_match else sender_header.lower()
-                if any(blocked_email in sender_email for blocked_email in email_filters):
-                    logger.info(f"Skipping email {email['id']} for user {user_id} due to sender filter match: {sender_email}")
-                    continue
+            def passes_metadata_filters(email: dict) -> bool:
+                # Runs on metadata only, so filtered messages never have their bodies downloaded.
+                # The snippet is the start of the body, so a keyword found there is a body match too.
+                return self._filter_reason(email, privacy_matcher, with_body=False) is None
 
-                # Label check
-                email_labels = [label.lower() for label in email.get("labels", [])]
-                if any(blocked_label in email_labels for blocked_label in label_filters):
-                    logger.info(f"Skipping email {email['id']} for user {user_id} due to label filter match.")
+            if GMAIL_SYNC_MODE == "history":
+                emails, history_id, failed_ids = await sync_emails(creds, polling_state.get("gmail_history_id"), last_ts_unix,
+                                                                   should_fetch_body=passes_metadata_filters)
+            else:
+                history_id = None
+                emails, failed_ids = await fetch_emails(creds, last_ts_unix, max_results=GMAIL_POLL_MAX_RESULTS,
+                                                        should_fetch_body=passes_metadata_filters)
+            
+            candidates = []
+            for email in emails:
+                reason = self._filter_reason(email, privacy_matcher, with_body=True)
+                if reason:
+                    logger.info(f"Skipping email {email['id']} for user {user_id} due to {reason} filter match.")
                     continue
+                candidates.append(email)
 
-                if not await self.db_manager.is_item_processed(user_id, self.service_name, email_item_id):
-                    from workers.tasks import extract_from_context
-                    extract_from_context.delay(user_id, self.service_name, email_item_id, email)
-                    await self.db_manager.log_processed_item(user_id, self.service_name, email_item_id)
-                    processed_count += 1
-
-            if processed_count > 0:
+            unprocessed_ids = await self.db_manager.filter_unprocessed(user_id, self.service_name, [e["id"] for e in candidates])
+            # Claim before dispatching: a crash after this point can skip an extraction but never repeat one.
+            claimed_ids = await self.db_manager.mark_processed_many(user_id, self.service_name, unprocessed_ids)
+            processed_count = 0
+            if claimed_ids:
+                from workers.tasks import extract_from_context
+                for email in candidates:
+                    if email["id"] in claimed_ids:
+                        extract_from_context.delay(user_id, self.service_name, email["id"], email)
+                        processed_count += 1
+            if history_id:
+                # Only advanced once every fetched email is claimed and dispatched; a failure before
+                # this point leaves the old id, so the next poll sees the same messages again.
+                updated_state["gmail_history_id"] = history_id
+
+            if failed_ids:
+                # Their timestamps may be unknown, so the cursor stays put and the next poll lists
+                # them again; messages dispatched this cycle are skipped then as already processed.
+                logger.warning(f"Could not fetch {len(failed_ids)} email(s) for user {user_id}; keeping the sync cursor for a retry.")
+            elif processed_count > 0:
                 # If we processed emails, update the timestamp to the newest one we saw.
                 highest_email_ts_ms = max(email["timestamp_ms"] for email in emails) if emails else 0
                 updated_state["last_successful_poll_timestamp_unix"] = highest_email_ts_ms // 1000
@@ -127,6 +147,11 @@ class GmailPollingService:
                 logger.info(f"Processed and sent {processed_count} new emails to Kafka for user {user_id}.")
             
             updated_state["last_successful_poll_status_message"] = f"Successfully polled. Found {len(emails)} messages, processed {processed_count} new."
+            try:
+                updated_state.update(await ensure_gmail_watch(creds, updated_state))
+            except Exception as watch_error:
+                # Polling keeps working without push; the next cycle retries the registration.
+                logger.warning(f"Could not register Gmail push watch for user {user_id}: {watch_error}")
             updated_state["consecutive_failure_count"] = 0
             updated_state["error_backoff_until_timestamp"] = None
 
@@ -150,10 +175,15 @@ class GmailPollingService:
                     updated_state["next_scheduled_poll_time"] = datetime.datetime.now(timezone.utc) + datetime.timedelta(days=1) # Check much later
             else:
                 next_interval = self._calculate_next_poll_interval(user_profile or {})
+                if push_enabled() and (updated_state.get("gmail_watch_expiration_ms") or 0) > time.time() * 1000:
+                    # Push notifications trigger syncs for this user; polling is just a safety net.
+                    next_interval = max(next_interval, PUSH_SAFETY_NET_POLL_SECONDS)
                 updated_state["next_scheduled_poll_time"] = datetime.datetime.now(timezone.utc) + datetime.timedelta(seconds=next_interval)
             
             updated_state["is_currently_polling"] = False # Release lock
             await self.db_manager.update_polling_state(user_id, self.service_name, updated_state)
+            if SCHEDULER_MODE == "due_queue":
+                await sync_polling_schedule(self.service_name, user_id, updated_state)
             logger.info(f"Poll cycle finished for user {user_id}. Next poll at {updated_state['next_scheduled_poll_time']}.")
 
 
@@ -9,7 +9,12 @@ from googleapiclient.errors import HttpError
 
 from workers.utils.crypto import aes_decrypt, aes_encrypt
 from workers.poller.gmail.db import PollerMongoManager
-from typing import Optional, List, Dict
+from workers.utils.profile_invalidation import publish_profile_invalidation
+from workers.utils.push_tokens import push_enabled
+from workers.poller.gmail.config import (GMAIL_FETCH_BATCH_SIZE, GMAIL_HISTORY_MAX_MESSAGES, GMAIL_HISTORY_MAX_PAGES,
+                                         GMAIL_RESYNC_MAX_RESULTS, GMAIL_RESYNC_LOOKBACK_DAYS,
+                                         GMAIL_PUSH_TOPIC, PUSH_WATCH_RENEW_BEFORE_SECONDS)
+from typing import Optional, List, Dict, Callable, Tuple
 
 async def get_gmail_credentials(user_id: str, db_manager: PollerMongoManager) -> Optional[Credentials]:
     import asyncio
@@ -42,6 +47,7 @@ async def get_gmail_credentials(user_id: str, db_manager: PollerMongoManager) ->
                     {"user_id": user_id},
                     {"$set": {"userData.integrations.gmail.credentials": encrypted_refreshed_creds}}
                 )
+                await publish_profile_invalidation(user_id)
                 print(f"[{datetime.datetime.now()}] [GmailPoller_Auth] Gmail token refreshed and saved for {user_id}.")
             except Exception as e:
                 print(f"[{datetime.datetime.now()}] [GmailPoller_Auth_ERROR] Failed to refresh Google token for {user_id}: {e}. User may need to re-auth.")
@@ -56,7 +62,242 @@ async def get_gmail_credentials(user_id: str, db_manager: PollerMongoManager) ->
         print(f"[{datetime.datetime.now()}] [GmailPoller_Auth_ERROR] Failed to get credentials for {user_id}: {e}")
         return None
 
-async def fetch_emails(creds: Credentials, last_processed_timestamp_unix: Optional[int] = None, max_results: int = 10) -> List[Dict]:
+METADATA_HEADERS = ["Subject", "From", "To"]
+
+
+def _decode_plain_text_body(payload: Dict) -> str:
+    if payload.get('mimeType') == 'text/plain' and payload.get('body', {}).get('data'):
+        return base64.urlsafe_b64decode(payload['body']['data']).decode('utf-8')
+    for part in payload.get('parts', []) or []:
+        if part.get('mimeType') == 'text/plain' and part.get('body', {}).get('data'):
+            return base64.urlsafe_b64decode(part['body']['data']).decode('utf-8')
+    return ""
+
+
+def _parse_message(msg: Dict) -> Dict:
+    headers = {h['name']: h['value'] for h in msg.get('payload', {}).get('headers', [])}
+    return {
+        "id": msg.get('id'),
+        "threadId": msg.get('threadId'),
+        "snippet": msg.get('snippet', ''),
+        "timestamp_ms": int(msg.get('internalDate', '0')),
+        "subject": headers.get('Subject', ''),
+        "from": headers.get('From', ''),
+        "to": headers.get('To', ''),
+        "body": "",
+        "labels": msg.get('labelIds', [])
+    }
+
+
+def _batch_get_messages(service, message_ids: List[str], message_format: str) -> Tuple[Dict[str, Dict], List[str]]:
+    """
+    Fetches messages through Gmail's HTTP batch endpoint, GMAIL_FETCH_BATCH_SIZE per round trip.
+    Sub-requests that fail (usually per-user rate limiting) are retried once in a later batch;
+    the ids still failing after that are returned alongside the results. Auth errors are
+    raised so the caller can disable polling. Blocking; run it in an executor.
+    """
+    results: Dict[str, Dict] = {}
+    pending = list(message_ids)
+    failed: List[str] = []
+    for attempt in range(2):
+        failed = []
+        auth_errors: List[HttpError] = []
+
+        def _on_response(request_id, response, exception):
+            if exception is None:
+                results[request_id] = response
+            elif isinstance(exception, HttpError) and exception.resp.status in [401, 403]:
+                auth_errors.append(exception)
+            else:
+                failed.append(request_id)
+
+        for start in range(0, len(pending), GMAIL_FETCH_BATCH_SIZE):
+            batch = service.new_batch_http_request(callback=_on_response)
+            for msg_id in pending[start:start + GMAIL_FETCH_BATCH_SIZE]:
+                kwargs = {"userId": "me", "id": msg_id, "format": message_format}
+                if message_format == 'metadata':
+                    kwargs["metadataHeaders"] = METADATA_HEADERS
+                batch.add(service.users().messages().get(**kwargs), request_id=msg_id)
+            batch.execute()
+        if auth_errors:
+            raise auth_errors[0]
+        if not failed:
+            break
+        print(f"[{datetime.datetime.now()}] [GmailPoller_Fetch] {len(failed)} message fetch(es) failed in batch (attempt {attempt + 1}).")
+        pending = failed
+    return results, failed
+
+
+def _list_message_ids(service, query: str, max_results: int) -> List[str]:
+    message_ids: List[str] = []
+    page_token = None
+    while len(message_ids) < max_results:
+        response = service.users().messages().list(
+            userId='me', q=query, maxResults=min(max_results - len(message_ids), 500), pageToken=page_token
+        ).execute()
+        message_ids.extend(m['id'] for m in response.get('messages', []))
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            break
+    return message_ids
+
+
+async def _fetch_messages(service, message_ids: List[str], should_fetch_body: Optional[Callable[[Dict], bool]]) -> Tuple[List[Dict], List[str]]:
+    """
+    Fetches metadata for `message_ids` in batches, then downloads bodies (again batched)
+    only for messages that `should_fetch_body` accepts. Returns the emails and the ids that
+    could not be fetched, so the caller can keep its sync cursor from moving past them.
+    """
+    import asyncio
+    loop = asyncio.get_event_loop()
+    print(f"[{datetime.datetime.now()}] [GmailPoller_Fetch] Found {len(message_ids)} new message(s). Fetching metadata...")
+
+    metadata, failed_ids = await loop.run_in_executor(None, _batch_get_messages, service, message_ids, 'metadata')
+    candidates = [_parse_message(metadata[msg_id]) for msg_id in message_ids if msg_id in metadata]
+    if should_fetch_body is not None:
+        candidates = [email for email in candidates if should_fetch_body(email)]
+    if not candidates:
+        return [], failed_ids
+
+    full_messages, failed_bodies = await loop.run_in_executor(None, _batch_get_messages, service, [e["id"] for e in candidates], 'full')
+    failed_ids = failed_ids + failed_bodies
+    emails_data = []
+    for email_data in candidates:
+        msg_full = full_messages.get(email_data["id"])
+        if msg_full is None:
+            continue
+        email_data["body"] = _decode_plain_text_body(msg_full.get('payload', {}))
+        emails_data.append(email_data)
+    return emails_data, failed_ids
+
+
+class _HistoryBacklogTooLarge(Exception):
+    pass
+
+
+def _list_history_message_ids(service, start_history_id: str, max_results: int) -> Tuple[List[str], str]:
+    """
+    Returns the inbox messages added since `start_history_id` (oldest first, at most
+    `max_results`) and the mailbox historyId to resume from next time. Raises
+    _HistoryBacklogTooLarge instead of reading more than GMAIL_HISTORY_MAX_PAGES pages.
+    """
+    message_ids: List[str] = []
+    seen = set()
+    page_token = None
+    latest_history_id = start_history_id
+    for _ in range(GMAIL_HISTORY_MAX_PAGES):
+        response = service.users().history().list(
+            userId='me', startHistoryId=start_history_id, historyTypes=['messageAdded'],
+            labelId='INBOX', maxResults=500, pageToken=page_token
+        ).execute()
+        latest_history_id = response.get('historyId', latest_history_id)
+        for record in response.get('history', []):
+            for added in record.get('messagesAdded', []):
+                msg_id = added.get('message', {}).get('id')
+                if msg_id and msg_id not in seen:
+                    seen.add(msg_id)
+                    message_ids.append(msg_id)
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            break
+    else:
+        raise _HistoryBacklogTooLarge()
+    if len(message_ids) > max_results:
+        print(f"[{datetime.datetime.now()}] [GmailPoller_Sync] {len(message_ids)} messages added since last poll; keeping the newest {max_results}.")
+        message_ids = message_ids[-max_results:]
+    return message_ids, latest_history_id
+
+
+async def sync_emails(creds: Credentials, history_id: Optional[str], last_processed_timestamp_unix: Optional[int] = None,
+                      should_fetch_body: Optional[Callable[[Dict], bool]] = None) -> Tuple[List[Dict], Optional[str], List[str]]:
+    """
+    Incremental sync: fetches only the messages added to the inbox since `history_id`.
+    Without a usable history id (first poll, or Gmail returned 404 because it expired)
+    it does a bounded resync of recent inbox mail instead. Returns the emails, the
+    historyId to store for the next poll and the ids that could not be fetched. On
+    non-auth errors, or when any message failed, the old id is returned so the next
+    poll lists those messages again.
+    """
+    import asyncio
+    try:
+        loop = asyncio.get_event_loop()
+        service = await loop.run_in_executor(None, lambda: build('gmail', 'v1', credentials=creds))
+
+        if history_id:
+            try:
+                message_ids, new_history_id = await loop.run_in_executor(
+                    None, _list_history_message_ids, service, history_id, GMAIL_HISTORY_MAX_MESSAGES
+                )
+                if not message_ids:
+                    return [], new_history_id, []
+                emails, failed_ids = await _fetch_messages(service, message_ids, should_fetch_body)
+                return emails, (history_id if failed_ids else new_history_id), failed_ids
+            except HttpError as error:
+                if error.resp.status != 404:
+                    raise
+                print(f"[{datetime.datetime.now()}] [GmailPoller_Sync] historyId {history_id} is no longer valid. Falling back to a full resync.")
+            except _HistoryBacklogTooLarge:
+                print(f"[{datetime.datetime.now()}] [GmailPoller_Sync] More than {GMAIL_HISTORY_MAX_PAGES} history pages since {history_id}. Falling back to a full resync.")
+
+        # Read the current historyId before listing, so mail arriving during the resync is
+        # picked up by the next incremental poll rather than lost.
+        profile = await loop.run_in_executor(None, lambda: service.users().getProfile(userId='me').execute())
+        new_history_id = profile.get('historyId')
+        if last_processed_timestamp_unix:
+            query = f'in:inbox after:{last_processed_timestamp_unix}'
+        else:
+            query = f'in:inbox newer_than:{GMAIL_RESYNC_LOOKBACK_DAYS}d'
+        message_ids = await loop.run_in_executor(None, _list_message_ids, service, query, GMAIL_RESYNC_MAX_RESULTS)
+        if not message_ids:
+            return [], new_history_id, []
+        # messages.list returns newest first; process oldest first like the history path.
+        emails, failed_ids = await _fetch_messages(service, list(reversed(message_ids)), should_fetch_body)
+        return emails, (history_id if failed_ids else new_history_id), failed_ids
+    except HttpError as error:
+        print(f"[{datetime.datetime.now()}] [GmailPoller_Sync_ERROR] An API error occurred: {error}")
+        if error.resp.status in [401, 403]:
+            print(f"[{datetime.datetime.now()}] [GmailPoller_Sync_ERROR] Gmail token error. User may need to re-authenticate.")
+            raise error
+        return [], history_id, []
+    except Exception as e:
+        print(f"[{datetime.datetime.now()}] [GmailPoller_Sync_ERROR] Unexpected error syncing emails: {e}")
+        return [], history_id, []
+
+
+async def ensure_gmail_watch(creds: Credentials, polling_state: Dict) -> Dict:
+    """
+    Registers (or renews, when close to expiry) a users.watch on the inbox so Gmail
+    publishes changes to GMAIL_PUSH_TOPIC. Returns the polling state fields to update.
+    """
+    import asyncio
+    import time
+    if not GMAIL_PUSH_TOPIC or not push_enabled():
+        return {}
+    expiration_ms = polling_state.get("gmail_watch_expiration_ms") or 0
+    if expiration_ms > (time.time() + PUSH_WATCH_RENEW_BEFORE_SECONDS) * 1000:
+        return {}
+
+    loop = asyncio.get_event_loop()
+    service = await loop.run_in_executor(None, lambda: build('gmail', 'v1', credentials=creds))
+    profile = await loop.run_in_executor(None, lambda: service.users().getProfile(userId='me').execute())
+    response = await loop.run_in_executor(None, lambda: service.users().watch(
+        userId='me', body={'topicName': GMAIL_PUSH_TOPIC, 'labelIds': ['INBOX'], 'labelFilterBehavior': 'INCLUDE'}
+    ).execute())
+    print(f"[{datetime.datetime.now()}] [GmailPoller_Push] Registered inbox watch, expires at {response.get('expiration')}.")
+    return {
+        # Notifications only carry the address, so it is what maps them back to a user.
+        "gmail_email_address": profile.get('emailAddress', '').lower(),
+        "gmail_watch_expiration_ms": int(response.get('expiration', 0)),
+    }
+
+
+async def fetch_emails(creds: Credentials, last_processed_timestamp_unix: Optional[int] = None, max_results: int = 10,
+                       should_fetch_body: Optional[Callable[[Dict], bool]] = None) -> Tuple[List[Dict], List[str]]:
+    """
+    Query-based fetch of unread mail after a timestamp (GMAIL_SYNC_MODE=query). Messages
+    that `should_fetch_body` rejects are dropped without their bodies being requested.
+    Returns the emails and the ids that could not be fetched.
+    """
     import asyncio
     try:
         loop = asyncio.get_event_loop()
@@ -65,54 +306,18 @@ async def fetch_emails(creds: Credentials, last_processed_timestamp_unix: Option
         query = 'is:unread'
         if last_processed_timestamp_unix:
             query += f' after:{last_processed_timestamp_unix}'
-            
-        results = await loop.run_in_executor(None, 
-            lambda: service.users().messages().list(userId='me', q=query, maxResults=max_results).execute()
-        )
-        messages_info = results.get('messages', [])
-        
-        emails_data = []
-        if not messages_info:
-            return []
-
-        print(f"[{datetime.datetime.now()}] [GmailPoller_Fetch] Found {len(messages_info)} new message(s). Fetching details...")
-
-        for msg_info in messages_info:
-            msg_id = msg_info['id']
-            msg_full = await loop.run_in_executor(None, 
-                lambda: service.users().messages().get(userId='me', id=msg_id, format='full').execute()
-            )
-            
-            headers = {h['name']: h['value'] for h in msg_full.get('payload', {}).get('headers', [])}
-            email_data = {
-                "id": msg_full.get('id'),
-                "threadId": msg_full.get('threadId'),
-                "snippet": msg_full.get('snippet', ''),
-                "timestamp_ms": int(msg_full.get('internalDate', '0')),
-                "subject": headers.get('Subject', ''),
-                "from": headers.get('From', ''),
-                "to": headers.get('To', ''),
-                "body": "",
-                "labels": msg_full.get('labelIds', [])
-            }
-
-            payload = msg_full.get('payload', {})
-            if payload.get('mimeType') == 'text/plain' and payload.get('body', {}).get('data'):
-                email_data["body"] = base64.urlsafe_b64decode(payload['body']['data']).decode('utf-8')
-            elif payload.get('parts'):
-                for part in payload['parts']:
-                    if part.get('mimeType') == 'text/plain' and part.get('body', {}).get('data'):
-                        email_data["body"] = base64.urlsafe_b64decode(part['body']['data']).decode('utf-8')
-                        break
-            emails_data.append(email_data)
-        
-        return emails_data
+
+        message_ids = await loop.run_in_executor(None, _list_message_ids, service, query, max_results)
+        if not message_ids:
+            return [], []
+
+        return await _fetch_messages(service, message_ids, should_fetch_body)
     except HttpError as error:
         print(f"[{datetime.datetime.now()}] [GmailPoller_Fetch_ERROR] An API error occurred: {error}")
         if error.resp.status in [401, 403]:
             print(f"[{datetime.datetime.now()}] [GmailPoller_Fetch_ERROR] Gmail token error. User may need to re-authenticate.")
             raise error
-        return []
+        return [], []
     except Exception as e:
         print(f"[{datetime.datetime.now()}] [GmailPoller_Fetch_ERROR] Unexpected error fetching emails: {e}")
-        return []
\ No newline at end of file
+        return [], []
\ No newline at end of file
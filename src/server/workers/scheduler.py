@@ -0,0 +1,100 @@
+# src/server/workers/scheduler.py
+# Due-queue scheduler (SCHEDULER_MODE=due_queue). Run one or more instances with
+#   python -m workers.scheduler
+# Instances split the queue shards between them through short-lived Redis ownership locks,
+# so adding an instance spreads the load and a dead instance's shards are taken over.
+import os
+import math
+import time
+import uuid
+import socket
+import asyncio
+import logging
+import datetime
+from typing import List, Set, Tuple
+
+from workers.config import (SCHEDULER_MODE, DUE_QUEUE_SHARDS, DUE_QUEUE_TICK_SECONDS,
+                            DUE_QUEUE_DISPATCH_HORIZON_SECONDS, DUE_QUEUE_SHARD_OWNER_TTL_SECONDS,
+                            DUE_QUEUE_CLAIM_BATCH_SIZE)
+from workers.celery_app import celery_app
+from workers.utils import due_queue
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _dispatch(queue: str, items: List[Tuple[str, float]]):
+    """Sends claimed items to Celery with an ETA at their due time (blocking broker publishes)."""
+    for member, due_at_unix in items:
+        eta = datetime.datetime.fromtimestamp(due_at_unix, datetime.timezone.utc)
+        if queue == due_queue.POLLING_QUEUE:
+            service_name, user_id = due_queue.parse_polling_member(member)
+            celery_app.send_task("run_scheduled_poll", args=(service_name, user_id), eta=eta)
+        elif queue == due_queue.USER_TASKS_QUEUE:
+            celery_app.send_task("run_scheduled_user_task", args=(member,), eta=eta)
+
+
+class DueQueueScheduler:
+    def __init__(self):
+        self.owner_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.owned: Set[Tuple[str, int]] = set()
+        self._last_ownership_refresh = 0.0
+        self.dispatched = 0
+
+    async def _refresh_ownership(self):
+        # Renew often enough that a lock never lapses between two refreshes.
+        if time.monotonic() - self._last_ownership_refresh < DUE_QUEUE_SHARD_OWNER_TTL_SECONDS / 3:
+            return
+        self._last_ownership_refresh = time.monotonic()
+        all_shards = [(queue, shard) for queue in due_queue.QUEUES for shard in range(DUE_QUEUE_SHARDS)]
+        live_instances = await due_queue.heartbeat(self.owner_id)
+        fair_share = math.ceil(len(all_shards) / live_instances)
+
+        owned = set()
+        # Renew what we hold first, then pick up unowned shards up to our fair share.
+        for key in sorted(self.owned) + [k for k in all_shards if k not in self.owned]:
+            if len(owned) >= fair_share:
+                break
+            if await due_queue.acquire_shard(key[0], key[1], self.owner_id):
+                owned.add(key)
+        # Hand back anything over our share so a newly started instance can take it.
+        for queue, shard in self.owned - owned:
+            await due_queue.release_shard(queue, shard, self.owner_id)
+        if owned != self.owned:
+            logger.info(f"Scheduler {self.owner_id} now owns {len(owned)} shard(s) ({live_instances} instance(s) live).")
+        self.owned = owned
+
+    async def _drain(self, queue: str, shard: int):
+        # Keep claiming until the shard has nothing due within the horizon, so a backlog
+        # (e.g. after a restart) is cleared in one tick rather than one batch per tick.
+        while True:
+            items = await due_queue.claim_due(queue, shard, DUE_QUEUE_DISPATCH_HORIZON_SECONDS)
+            if not items:
+                return
+            await asyncio.to_thread(_dispatch, queue, items)
+            self.dispatched += len(items)
+            if len(items) < DUE_QUEUE_CLAIM_BATCH_SIZE:
+                return
+
+    async def run(self):
+        logger.info(f"Due-queue scheduler {self.owner_id} starting ({DUE_QUEUE_SHARDS} shards per queue).")
+        try:
+            while True:
+                tick_started = time.monotonic()
+                try:
+                    await self._refresh_ownership()
+                    await asyncio.gather(*(self._drain(queue, shard) for queue, shard in self.owned))
+                except Exception as e:
+                    logger.error(f"Due-queue scheduler tick failed: {e}", exc_info=True)
+                await asyncio.sleep(max(0.0, DUE_QUEUE_TICK_SECONDS - (time.monotonic() - tick_started)))
+        finally:
+            for queue, shard in self.owned:
+                await due_queue.release_shard(queue, shard, self.owner_id)
+            await due_queue.leave(self.owner_id)
+
+
+if __name__ == "__main__":
+    if SCHEDULER_MODE != "due_queue":
+        logger.info("SCHEDULER_MODE is not 'due_queue'; the due-queue scheduler has nothing to do.")
+    else:
+        asyncio.run(DueQueueScheduler().run())
@@ -1,7 +1,9 @@
 import logging
+import time
 from qwen_agent.agents import Assistant
 from workers.planner.db import PlannerMongoManager # Re-use for DB access
 from workers.planner.config import OPENAI_API_BASE_URL, OPENAI_MODEL_NAME, OPENAI_API_KEY
+from main.mcp_cache import lease_function_list, record_agent_construction
 
 logger = logging.getLogger(__name__)
 
@@ -43,12 +45,20 @@ def get_supermemory_qwen_agent(supermemory_mcp_url: str):
     }]
 
     try:
-        agent = Assistant(
-            llm=llm_cfg,
-            system_message=SYSTEM_PROMPT_SUPERMEMORY_CELERY,
-            function_list=tools_config,
-            description="An agent that uses a remote MCP server to manage memories.",
-        )
+        started_at = time.perf_counter()
+        lease = lease_function_list(tools_config)
+        try:
+            agent = Assistant(
+                llm=llm_cfg,
+                system_message=SYSTEM_PROMPT_SUPERMEMORY_CELERY,
+                function_list=lease.tools,
+                description="An agent that uses a remote MCP server to manage memories.",
+            )
+        except Exception:
+            lease.release()
+            raise
+        lease.bind(agent)
+        record_agent_construction("supermemory", time.perf_counter() - started_at)
         logger.info(f"Supermemory Qwen Agent initialized successfully for MCP: {supermemory_mcp_url}")
         return agent
     except Exception as e:
@@ -4,17 +4,29 @@ import uuid
 import json
 import re
 import datetime
+import time
 import os
 import httpx
-from dateutil import rrule
 from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 from typing import Dict, Any, Optional, List
+from pymongo import UpdateOne
 from main.analytics import capture_event
 
-from workers.config import SUPERMEMORY_MCP_BASE_URL, SUPERMEMORY_MCP_ENDPOINT_SUFFIX, SUPPORTED_POLLING_SERVICES
+from workers.config import (SUPERMEMORY_MCP_BASE_URL, SUPERMEMORY_MCP_ENDPOINT_SUFFIX, SUPPORTED_POLLING_SERVICES,
+                            SUPERMEMORY_WRITE_MODE, SUPERMEMORY_AGENT_FALLBACK, MEMORY_BATCH_WINDOW_SECONDS,
+                            MEMORY_BATCH_MAX_ATTEMPTS, PUSH_SYNC_MAX_RETRIES, PUSH_SYNC_RETRY_SECONDS,
+                            SCHEDULER_MODE, DUE_QUEUE_TASK_LOOKAHEAD_SECONDS, DUE_QUEUE_DISPATCH_HORIZON_SECONDS,
+                            TASK_DISPATCH_BATCH_SIZE, TASK_DISPATCH_CLAIM_TIMEOUT_SECONDS)
 from main.agents.utils import clean_llm_output
 from json_extractor import JsonExtractor
 from workers.utils.api_client import notify_user 
+from workers.utils.event_loop import run_async
+from workers.utils import due_queue
+from workers.utils.recurrence import compile_schedule, next_occurrences
+from workers.utils.supermemory_client import add_to_supermemory
+from workers.utils.memory_buffer import (buffer_facts, pop_batch, requeue_front, has_pending,
+                                         acquire_flush_lock, extend_flush_lock, release_flush_lock, filter_already_stored,
+                                         mark_stored, record_flush)
 from workers.celery_app import celery_app
 from workers.planner.llm import get_planner_agent, get_question_generator_agent
 from workers.planner.db import PlannerMongoManager, get_all_mcp_descriptions
@@ -45,21 +57,62 @@ def get_date_from_text(text: str) -> str:
     if match:
         return match.group(1)
     return datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%d')
-# Helper to run async code in Celery's sync context
-def run_async(coro):
-    try:
-        loop = asyncio.get_running_loop()
-    except RuntimeError:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-    return loop.run_until_complete(coro)
 
 # --- Memory Processing Task (Modified for Supermemory) ---
+def _store_fact_via_agent(supermemory_mcp_url: str, fact_text: str):
+    """
+    Legacy write path: asks a Qwen agent to call `supermemory-addToSupermemory`.
+    Blocking; returns (succeeded, tool_response_content).
+    """
+    agent = get_supermemory_qwen_agent(supermemory_mcp_url)
+    messages = [{'role': 'user', 'content': f"Remember this fact: {fact_text}"}]
+
+    all_responses = list(agent.run(messages=messages))
+    final_history = all_responses[-1] if all_responses else None
+    if not final_history:
+        return False, "Agent produced no output"
+
+    for message in reversed(final_history):
+        if message.get("role") == "function" and message.get("name") == "supermemory-addToSupermemory":
+            tool_response_content = message.get("content", "")
+            succeeded = isinstance(tool_response_content, str) and "success" in tool_response_content.lower()
+            return succeeded, tool_response_content
+    return False, "No tool response received."
+
+async def _store_fact(supermemory_mcp_url: str, fact_text: str):
+    """
+    Stores one fact, directly via MCP unless SUPERMEMORY_WRITE_MODE is "agent", with the
+    optional agent fallback. Returns (succeeded, tool_response_content).
+    """
+    succeeded, tool_response_content = False, ""
+    if SUPERMEMORY_WRITE_MODE != "agent":
+        try:
+            succeeded, tool_response_content = await add_to_supermemory(supermemory_mcp_url, fact_text)
+        except Exception as e:
+            tool_response_content = f"Direct Supermemory call failed: {e}"
+            logger.error(tool_response_content)
+
+    if not succeeded and (SUPERMEMORY_WRITE_MODE == "agent" or SUPERMEMORY_AGENT_FALLBACK):
+        # agent.run is blocking; keep it off the event loop so other tasks can proceed.
+        succeeded, tool_response_content = await asyncio.to_thread(_store_fact_via_agent, supermemory_mcp_url, fact_text)
+    return succeeded, tool_response_content
+
+async def _get_supermemory_mcp_url(db_manager: PlannerMongoManager, user_id: str) -> Optional[str]:
+    user_profile = await db_manager.user_profiles_collection.find_one(
+        {"user_id": user_id}, {"userData.supermemory_user_id": 1}
+    )
+    supermemory_user_id = user_profile.get("userData", {}).get("supermemory_user_id") if user_profile else None
+    if not supermemory_user_id:
+        return None
+    return f"{SUPERMEMORY_MCP_BASE_URL.rstrip('/')}/{supermemory_user_id}{SUPERMEMORY_MCP_ENDPOINT_SUFFIX}"
+
 @celery_app.task(name="process_memory_item")
 def process_memory_item(user_id: str, fact_text: str, source_event_id: Optional[str] = None):
     """
-    Celery task to process a single memory item by calling the Supermemory MCP
-    via a dedicated Qwen agent.
+    Celery task to store a single memory item in the user's Supermemory.
+    Calls the add-memory MCP tool directly; the Qwen agent path is used only when
+    SUPERMEMORY_WRITE_MODE is "agent" or as a fallback if SUPERMEMORY_AGENT_FALLBACK is set.
+    Prefer `enqueue_memory_items`, which batches facts per user.
     """
     log_prefix = f"Event {source_event_id}: " if source_event_id else ""
     logger.info(f"{log_prefix}Celery worker received Supermemory task for user {user_id}: '{fact_text[:80]}...'")
@@ -67,49 +120,105 @@ def process_memory_item(user_id: str, fact_text: str, source_event_id: Optional[
     async def async_process_memory():
         db_manager = get_memory_db_manager() # This is a PlannerMongoManager instance
         try:
-            user_profile = await db_manager.user_profiles_collection.find_one({"user_id": user_id})
-            if not user_profile:
-                logger.error(f"User profile not found for {user_id}. Cannot process memory item.")
-                return {"status": "failure", "reason": "User profile not found"}
-
-            supermemory_user_id = user_profile.get("userData", {}).get("supermemory_user_id")
-            if not supermemory_user_id:
+            supermemory_mcp_url = await _get_supermemory_mcp_url(db_manager, user_id)
+            if not supermemory_mcp_url:
                 logger.warning(f"User {user_id} has no Supermemory User ID. Skipping memory item: '{fact_text[:50]}...'")
                 return {"status": "skipped", "reason": "Supermemory MCP URL not configured"}
 
-            supermemory_mcp_url = f"{SUPERMEMORY_MCP_BASE_URL.rstrip('/')}/{supermemory_user_id}{SUPERMEMORY_MCP_ENDPOINT_SUFFIX}"
-
-            agent = get_supermemory_qwen_agent(supermemory_mcp_url)
-            messages = [{'role': 'user', 'content': f"Remember this fact: {fact_text}"}]
-
-            all_responses = list(agent.run(messages=messages))
-            final_history = all_responses[-1] if all_responses else None
-            
-            if not final_history:
-                logger.error(f"Supermemory agent produced no output for user {user_id}.")
-                return {"status": "failure", "reason": "Agent produced no output"}
-
-            function_call_succeeded = False
-            tool_response_content = "No tool response received."
-
-            for message in reversed(final_history):
-                if message.get("role") == "function" and message.get("name") == "supermemory-addToSupermemory":
-                    tool_response_content = message.get("content", "")
-                    if isinstance(tool_response_content, str) and "success" in tool_response_content.lower():
-                        function_call_succeeded = True
-                    break
-
-            if function_call_succeeded:
+            succeeded, tool_response_content = await _store_fact(supermemory_mcp_url, fact_text)
+            if succeeded:
                 logger.info(f"Successfully executed Supermemory store for user {user_id}. MCP Response: '{tool_response_content}'. Fact: '{fact_text[:50]}...'")
                 return {"status": "success", "fact": fact_text, "mcp_response": tool_response_content}
             else:
-                logger.error(f"Supermemory agent tool call failed for user {user_id}. Response: {tool_response_content}")
+                logger.error(f"Supermemory store failed for user {user_id}. Response: {tool_response_content}")
                 return {"status": "failure", "reason": "Supermemory tool call did not succeed", "mcp_response": tool_response_content}
         finally:
             if 'db_manager' in locals() and db_manager:
                 await db_manager.close()
 
-    return run_async(async_process_memory())
+    return run_async(async_process_memory(), task_name="process_memory_item")
+
+@celery_app.task(name="enqueue_memory_items")
+def enqueue_memory_items(user_id: str, facts: List[str], source_event_id: Optional[str] = None):
+    """
+    Adds facts to the user's memory ingest buffer. The buffer is written to Supermemory
+    by `flush_memory_buffer` after a short window, or immediately once it is full.
+    """
+    async def async_enqueue():
+        countdown = await buffer_facts(user_id, facts, source_event_id)
+        if countdown is not None:
+            flush_memory_buffer.apply_async(args=[user_id], countdown=countdown)
+
+    run_async(async_enqueue(), task_name="enqueue_memory_items")
+
+@celery_app.task(name="flush_memory_buffer")
+def flush_memory_buffer(user_id: str):
+    """Writes the next batch of buffered facts for a user through one pooled Supermemory session."""
+    async def async_flush():
+        token = str(uuid.uuid4())
+        if not await acquire_flush_lock(user_id, token):
+            # Another flush for this user is running; try again shortly to keep batches in order.
+            flush_memory_buffer.apply_async(args=[user_id], countdown=1)
+            return
+
+        db_manager = get_memory_db_manager()
+        next_countdown = 0
+        try:
+            # Resolved before popping, so a lookup failure leaves the buffer untouched.
+            supermemory_mcp_url = await _get_supermemory_mcp_url(db_manager, user_id)
+            entries = await pop_batch(user_id)
+            if not entries:
+                return
+            if not supermemory_mcp_url:
+                logger.warning(f"User {user_id} has no Supermemory User ID. Dropping {len(entries)} buffered memory items.")
+                return
+            try:
+                fresh = await filter_already_stored(user_id, entries)
+            except Exception:
+                await requeue_front(user_id, entries)
+                next_countdown = MEMORY_BATCH_WINDOW_SECONDS
+                raise
+
+            stored_ids = []
+            try:
+                for index, entry in enumerate(fresh):
+                    if not await extend_flush_lock(user_id, token, len(fresh) - index):
+                        # Our lock expired, so another flush may be running; hand the rest back in order.
+                        logger.warning(f"Lost the memory flush lock for user {user_id}; requeueing {len(fresh) - index} item(s).")
+                        await requeue_front(user_id, fresh[index:])
+                        break
+                    succeeded, tool_response_content = await _store_fact(supermemory_mcp_url, entry["fact"])
+                    if succeeded:
+                        stored_ids.append(entry["id"])
+                        continue
+
+                    # Stop at the first failure and put it back with everything after it.
+                    entry["attempts"] = entry.get("attempts", 0) + 1
+                    remaining = fresh[index:]
+                    if entry["attempts"] >= MEMORY_BATCH_MAX_ATTEMPTS:
+                        logger.error(f"Giving up on memory item for user {user_id} after {entry['attempts']} attempts: '{entry['fact'][:50]}...'. Response: {tool_response_content}")
+                        remaining = fresh[index + 1:]
+                    await requeue_front(user_id, remaining)
+                    next_countdown = MEMORY_BATCH_WINDOW_SECONDS
+                    break
+            except Exception:
+                await requeue_front(user_id, fresh[len(stored_ids):])
+                next_countdown = MEMORY_BATCH_WINDOW_SECONDS
+                raise
+            finally:
+                await mark_stored(user_id, stored_ids)
+
+            record_flush(len(stored_ids), len(entries) - len(fresh), min(e["enqueued_at"] for e in entries))
+        except Exception as e:
+            logger.error(f"Error flushing memory buffer for user {user_id}: {e}", exc_info=True)
+        finally:
+            await release_flush_lock(user_id, token)
+            await db_manager.close()
+
+        if await has_pending(user_id):
+            flush_memory_buffer.apply_async(args=[user_id], countdown=next_countdown)
+
+    run_async(async_flush(), task_name="flush_memory_buffer")
 
 # --- Extractor Task ---
 @celery_app.task(name="extract_from_context")
@@ -164,12 +273,16 @@ def extract_from_context(user_id: str, service_name: str, event_id: str, event_d
             agent = get_extractor_agent(user_name, user_location, user_timezone)
             messages = [{'role': 'user', 'content': full_llm_input}]
             
-            final_content_str = ""
-            for chunk in agent.run(messages=messages):
-                if isinstance(chunk, list) and chunk:
-                    last_message = chunk[-1]
-                    if last_message.get("role") == "assistant" and isinstance(last_message.get("content"), str):
-                        final_content_str = last_message["content"]
+            def _run_agent_sync():
+                final_content_str = ""
+                for chunk in agent.run(messages=messages):
+                    if isinstance(chunk, list) and chunk:
+                        last_message = chunk[-1]
+                        if last_message.get("role") == "assistant" and isinstance(last_message.get("content"), str):
+                            final_content_str = last_message["content"]
+                return final_content_str
+
+            final_content_str = await asyncio.to_thread(_run_agent_sync)
 
             if not final_content_str.strip():
                 logger.error(f"Extractor LLM returned no response for event_id: {event_id}.")
@@ -207,9 +320,9 @@ def extract_from_context(user_id: str, service_name: str, event_id: str, event_d
                 if action_items and topics:
                     process_action_item.delay(user_id, action_items, topics, event_id, event_data)
 
-            for fact in memory_items:
-                if isinstance(fact, str) and fact.strip():
-                    process_memory_item.delay(user_id, fact, event_id)
+            facts = [fact for fact in memory_items if isinstance(fact, str) and fact.strip()]
+            if facts:
+                enqueue_memory_items.delay(user_id, facts, event_id)
 
             await db_manager.log_extraction_result(event_id, user_id, len(memory_items), len(action_items))
         
@@ -218,12 +331,12 @@ def extract_from_context(user_id: str, service_name: str, event_id: str, event_d
         finally:
             await db_manager.close()
 
-    run_async(async_extract())
+    run_async(async_extract(), task_name="extract_from_context")
 
 @celery_app.task(name="process_action_item")
 def process_action_item(user_id: str, action_items: list, topics: list, source_event_id: str, original_context: dict):
     """Orchestrates the pre-planning phase for a new proactive task."""
-    run_async(async_process_action_item(user_id, action_items, topics, source_event_id, original_context))
+    run_async(async_process_action_item(user_id, action_items, topics, source_event_id, original_context), task_name="process_action_item")
 
 async def get_clarifying_questions(user_id: str, task_description: str, topics: list, original_context: dict, db_manager: PlannerMongoManager) -> List[str]:
     """
@@ -250,10 +363,14 @@ async def get_clarifying_questions(user_id: str, task_description: str, topics:
     user_prompt = f"Based on the task '{task_description}' and the provided context, please determine if any clarifying questions are necessary."
     messages = [{'role': 'user', 'content': user_prompt}]
 
-    final_response_str = ""
-    for chunk in agent.run(messages=messages):
-        if isinstance(chunk, list) and chunk and chunk[-1].get("role") == "assistant":
-            final_response_str = chunk[-1].get("content", "")
+    def _run_agent_sync():
+        final_response_str = ""
+        for chunk in agent.run(messages=messages):
+            if isinstance(chunk, list) and chunk and chunk[-1].get("role") == "assistant":
+                final_response_str = chunk[-1].get("content", "")
+        return final_response_str
+
+    final_response_str = await asyncio.to_thread(_run_agent_sync)
     
     response_data = JsonExtractor.extract_valid_json(clean_llm_output(final_response_str))
     if response_data and isinstance(response_data.get("clarifying_questions"), list):
@@ -321,7 +438,7 @@ async def async_process_action_item(user_id: str, action_items: list, topics: li
 @celery_app.task(name="generate_plan_from_context")
 def generate_plan_from_context(task_id: str):
     """Generates a plan for a task once all context is available."""
-    run_async(async_generate_plan(task_id))
+    run_async(async_generate_plan(task_id), task_name="generate_plan_from_context")
 
 async def async_generate_plan(task_id: str):
     """Async logic for plan generation."""
@@ -373,10 +490,14 @@ async def async_generate_plan(task_id: str):
         user_prompt_content = "Please create a plan for the following action items:\n- " + "\n- ".join(action_items)
         messages = [{'role': 'user', 'content': user_prompt_content}]
 
-        final_response_str = ""
-        for chunk in planner_agent.run(messages=messages):
-            if isinstance(chunk, list) and chunk and chunk[-1].get("role") == "assistant":
-                final_response_str = chunk[-1].get("content", "")
+        def _run_agent_sync():
+            final_response_str = ""
+            for chunk in planner_agent.run(messages=messages):
+                if isinstance(chunk, list) and chunk and chunk[-1].get("role") == "assistant":
+                    final_response_str = chunk[-1].get("content", "")
+            return final_response_str
+
+        final_response_str = await asyncio.to_thread(_run_agent_sync)
 
         if not final_response_str:
             raise Exception("Planner agent returned no response.")
@@ -475,8 +596,8 @@ def process_linkedin_profile(user_id: str, linkedin_url: str):
         
         logger.info(f"Formatted {len(facts_to_remember)} facts from LinkedIn profile.")
 
-        for fact in facts_to_remember:
-            process_memory_item.delay(user_id, fact)
+        if facts_to_remember:
+            enqueue_memory_items.delay(user_id, facts_to_remember)
         
         logger.info(f"Dispatched {len(facts_to_remember)} facts to Supermemory for user {user_id}.")
         return {"status": "success", "facts_generated": len(facts_to_remember)}
@@ -495,19 +616,80 @@ def poll_gmail_for_user(user_id: str, polling_state: dict):
     logger.info(f"Polling Gmail for user {user_id}")
     db_manager = GmailPollerDB()
     service = GmailPollingService(db_manager)
-    run_async(service._run_single_user_poll_cycle(user_id, polling_state))
+    run_async(service._run_single_user_poll_cycle(user_id, polling_state), task_name="poll_gmail_for_user")
 
 @celery_app.task(name="poll_gcalendar_for_user")
 def poll_gcalendar_for_user(user_id: str, polling_state: dict):
     logger.info(f"Polling GCalendar for user {user_id}")
     db_manager = GCalPollerDB()
     service = GCalendarPollingService(db_manager)
-    run_async(service._run_single_user_poll_cycle(user_id, polling_state))
+    run_async(service._run_single_user_poll_cycle(user_id, polling_state), task_name="poll_gcalendar_for_user")
+
+@celery_app.task(name="sync_user_on_push")
+def sync_user_on_push(user_id: str, service_name: str, received_at_unix: float, attempt: int = 0):
+    """
+    Targeted incremental sync for one user, triggered by a Gmail/Calendar push notification.
+    If a poll that started before the notification is still running, retries shortly so the
+    change is not missed; if a later poll already ran, there is nothing to do.
+    """
+    async def async_sync():
+        received_at = datetime.datetime.fromtimestamp(received_at_unix, datetime.timezone.utc)
+        db_manager = GmailPollerDB()
+        try:
+            locked_state = await db_manager.claim_polling_state_for_push(user_id, service_name, received_at)
+            if not locked_state:
+                if attempt < PUSH_SYNC_MAX_RETRIES and await db_manager.is_poll_running_since_before(user_id, service_name, received_at):
+                    sync_user_on_push.apply_async(
+                        (user_id, service_name, received_at_unix, attempt + 1), countdown=PUSH_SYNC_RETRY_SECONDS
+                    )
+                return
+        finally:
+            await db_manager.close()
+
+        logger.info(f"Push-triggered {service_name} sync for user {user_id}")
+        if service_name == "gmail":
+            service = GmailPollingService(GmailPollerDB())
+        else:
+            service = GCalendarPollingService(GCalPollerDB())
+        await service._run_single_user_poll_cycle(user_id, locked_state)
+
+    run_async(async_sync(), task_name="sync_user_on_push")
+
+@celery_app.task(name="run_scheduled_poll")
+def run_scheduled_poll(service_name: str, user_id: str):
+    """Dispatched by the due-queue scheduler with an ETA at the user's next poll time."""
+    async def async_poll():
+        member = due_queue.polling_member(service_name, user_id)
+        db_manager = GmailPollerDB()
+        try:
+            locked_state = await db_manager.set_polling_status_and_get(user_id, service_name)
+            if not locked_state:
+                state = await db_manager.get_polling_state(user_id, service_name)
+                if not state or not state.get("is_enabled"):
+                    await due_queue.complete(due_queue.POLLING_QUEUE, member)
+                elif not state.get("is_currently_polling"):
+                    # Not due any more (e.g. a push-triggered sync moved it); follow Mongo.
+                    await due_queue.sync_polling_schedule(service_name, user_id, state)
+                # Otherwise a poll is running and reschedules the user when it finishes.
+                return
+        finally:
+            await db_manager.close()
+
+        if service_name == "gmail":
+            service = GmailPollingService(GmailPollerDB())
+        else:
+            service = GCalendarPollingService(GCalPollerDB())
+        await service._run_single_user_poll_cycle(user_id, locked_state)
+
+    run_async(async_poll(), task_name="run_scheduled_poll")
 
 # --- Scheduler Tasks ---
 @celery_app.task(name="schedule_all_polling")
 def schedule_all_polling():
-    """Celery Beat task to check for and queue polling tasks for all services."""
+    """
+    Celery Beat task to check for and queue polling tasks for all services. In due_queue
+    mode the scheduler process dispatches polls; this only seeds states missing from the queue.
+    """
     logger.info("Polling Scheduler: Checking for due polling tasks...")
     
     async def async_schedule():
@@ -517,6 +699,17 @@ def schedule_all_polling():
             await db_manager.reset_stale_polling_locks("gcalendar")
 
             for service_name in SUPPORTED_POLLING_SERVICES:
+                if SCHEDULER_MODE == "due_queue":
+                    now_unix = time.time()
+                    schedules = await db_manager.get_enabled_polling_schedules(service_name)
+                    added = await due_queue.add_many_if_absent(due_queue.POLLING_QUEUE, (
+                        (due_queue.polling_member(service_name, state["user_id"]),
+                         due_queue.to_unix(state["next_scheduled_poll_time"]) if state.get("next_scheduled_poll_time") else now_unix)
+                        for state in schedules
+                    ))
+                    logger.info(f"Seeded {added} of {len(schedules)} {service_name} polling states into the due queue.")
+                    continue
+
                 due_tasks_states = await db_manager.get_due_polling_tasks_for_service(service_name)
                 logger.info(f"Found {len(due_tasks_states)} due tasks for {service_name}.")
                 
@@ -535,35 +728,15 @@ def schedule_all_polling():
     run_async(async_schedule())
 
 def calculate_next_run(schedule: Dict[str, Any], last_run: Optional[datetime.datetime] = None) -> Optional[datetime.datetime]:
-    """Calculates the next execution time for a scheduled task."""
-    now = datetime.datetime.now(datetime.timezone.utc)
-    start_time = last_run or now
-
-    try:
-        frequency = schedule.get("frequency")
-        time_str = schedule.get("time", "00:00")
-        hour, minute = map(int, time_str.split(':'))
-        dtstart = start_time.replace(hour=hour, minute=minute, second=0, microsecond=0)
-
-        rule = None
-        if frequency == 'daily':
-            rule = rrule.rrule(rrule.DAILY, dtstart=dtstart)
-        elif frequency == 'weekly':
-            days = schedule.get("days", [])
-            if not days: return None
-            weekday_map = {"Sunday": rrule.SU, "Monday": rrule.MO, "Tuesday": rrule.TU, "Wednesday": rrule.WE, "Thursday": rrule.TH, "Friday": rrule.FR, "Saturday": rrule.SA}
-            byweekday = [weekday_map[day] for day in days if day in weekday_map]
-            if not byweekday: return None
-            rule = rrule.rrule(rrule.WEEKLY, dtstart=dtstart, byweekday=byweekday)
-
-        if rule:
-            next_run = rule.after(start_time)
-            if next_run and next_run.tzinfo is None:
-                next_run = next_run.replace(tzinfo=datetime.timezone.utc)
-            return next_run
-    except Exception as e:
-        logger.error(f"Error calculating next run time for schedule {schedule}: {e}")
-    return None
+    """
+    Calculates the next execution time (UTC) for a scheduled task. The schedule's "time" is
+    local to its "timezone" (UTC when none is recorded, which is how the task UI collects it).
+    """
+    compiled = compile_schedule(schedule)
+    if compiled is None:
+        logger.error(f"Error calculating next run time for schedule {schedule}: unsupported or invalid schedule.")
+        return None
+    return compiled.next_after(last_run or datetime.datetime.now(datetime.timezone.utc))
 
 @celery_app.task(name="run_due_tasks")
 def run_due_tasks():
@@ -580,49 +753,141 @@ def run_due_tasks():
     # This `run_due_tasks` function is a good place to trigger that logic on a schedule.
 
 
+async def _claim_and_dispatch_due_tasks(db_manager: PlannerMongoManager) -> int:
+    """
+    Claims up to TASK_DISPATCH_BATCH_SIZE due tasks under a fresh claim token, reschedules
+    them in one bulk_write and then queues them. Claiming is a single update_many that only
+    matches unclaimed (or stale-claimed) due tasks, so overlapping scheduler runs never
+    dispatch the same task twice. Returns the number of tasks dispatched.
+    """
+    now = datetime.datetime.now(datetime.timezone.utc)
+    claim_token = str(uuid.uuid4())
+    # Fetch tasks that are due and are either 'active' (recurring) or 'pending' (scheduled-once)
+    due_query = {
+        "enabled": True,
+        "status": {"$in": ["active", "pending"]},
+        "next_execution_at": {"$lte": now},
+        "$or": [
+            {"dispatch_claim": None},
+            {"dispatch_claimed_at": {"$lt": now - datetime.timedelta(seconds=TASK_DISPATCH_CLAIM_TIMEOUT_SECONDS)}}
+        ]
+    }
+    candidates = await db_manager.tasks_collection.find(due_query, {"_id": 1}).limit(TASK_DISPATCH_BATCH_SIZE).to_list(length=None)
+    if not candidates:
+        return 0
+    await db_manager.tasks_collection.update_many(
+        {**due_query, "_id": {"$in": [c["_id"] for c in candidates]}},
+        {"$set": {"dispatch_claim": claim_token, "dispatch_claimed_at": now}}
+    )
+    claimed = await db_manager.tasks_collection.find(
+        {"dispatch_claim": claim_token}, {"task_id": 1, "user_id": 1, "schedule": 1}
+    ).to_list(length=None)
+    if not claimed:
+        return 0
+
+    logger.info(f"Scheduler: Claimed {len(claimed)} due user-defined tasks.")
+    # For recurring tasks, calculate the next run time. One-off tasks have their next_execution_at
+    # set to None, so they won't run again; the executor moves them to 'completed'/'error'.
+    # Next runs for the whole batch in one pass; tasks sharing a schedule are expanded once.
+    recurring_runs = next_occurrences(
+        [task['schedule'] if (task.get('schedule') or {}).get('type') == 'recurring' else {} for task in claimed], now
+    )
+    updates = []
+    for task, runs in zip(claimed, recurring_runs):
+        next_run_time = runs[0] if runs else None
+        updates.append(UpdateOne(
+            {"_id": task["_id"], "dispatch_claim": claim_token},
+            {"$set": {"last_execution_at": now, "next_execution_at": next_run_time},
+             "$unset": {"dispatch_claim": "", "dispatch_claimed_at": ""}}
+        ))
+    # Reschedule before queueing: a crash in between skips one run rather than repeating it.
+    await db_manager.tasks_collection.bulk_write(updates, ordered=False)
+
+    for task in claimed:
+        logger.info(f"Scheduler: Queuing user-defined task {task['task_id']} for execution.")
+        execute_task_plan.delay(task['task_id'], task['user_id'])
+    return len(claimed)
+
+
 async def async_run_due_tasks():
+    if SCHEDULER_MODE == "due_queue":
+        await seed_due_user_tasks()
+        return
     db_manager = PlannerMongoManager()
     try:
-        now = datetime.datetime.now(datetime.timezone.utc)
-        # Fetch tasks that are due and are either 'active' (recurring) or 'pending' (scheduled-once)
-        query = {
-            "status": {"$in": ["active", "pending"]},
-            "enabled": True,
-            "next_execution_at": {"$lte": now}
-        }
-        due_tasks_cursor = db_manager.tasks_collection.find(query)
-        due_tasks = await due_tasks_cursor.to_list(length=None)
-
-        if not due_tasks:
+        total_dispatched = 0
+        while True:
+            dispatched = await _claim_and_dispatch_due_tasks(db_manager)
+            total_dispatched += dispatched
+            if dispatched < TASK_DISPATCH_BATCH_SIZE:
+                break
+        if total_dispatched == 0:
             logger.info("Scheduler: No user-defined tasks are due.")
-            return
 
-        logger.info(f"Scheduler: Found {len(due_tasks)} due user-defined tasks.")
-        for task in due_tasks:
-            logger.info(f"Scheduler: Queuing user-defined task {task['task_id']} for execution.")
-            execute_task_plan.delay(task['task_id'], task['user_id'])
-            
-            # For recurring tasks, calculate the next run time.
-            # For one-off tasks, this will effectively be cleared.
+    except Exception as e:
+        logger.error(f"Scheduler: An error occurred checking user-defined tasks: {e}", exc_info=True)
+    finally:
+        await db_manager.close()
+
+
+async def seed_due_user_tasks():
+    """Queues tasks due within the lookahead window that are not already queued or leased."""
+    db_manager = PlannerMongoManager()
+    try:
+        horizon = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=DUE_QUEUE_TASK_LOOKAHEAD_SECONDS)
+        cursor = db_manager.tasks_collection.find(
+            {"status": {"$in": ["active", "pending"]}, "enabled": True, "next_execution_at": {"$lte": horizon}},
+            {"task_id": 1, "next_execution_at": 1, "_id": 0}
+        )
+        upcoming = await cursor.to_list(length=None)
+        added = await due_queue.add_many_if_absent(due_queue.USER_TASKS_QUEUE, (
+            (task["task_id"], due_queue.to_unix(task["next_execution_at"])) for task in upcoming
+        ))
+        logger.info(f"Scheduler: Seeded {added} of {len(upcoming)} upcoming user-defined tasks into the due queue.")
+    except Exception as e:
+        logger.error(f"Scheduler: An error occurred seeding user-defined tasks: {e}", exc_info=True)
+    finally:
+        await db_manager.close()
+
+
+@celery_app.task(name="run_scheduled_user_task")
+def run_scheduled_user_task(task_id: str):
+    """
+    Dispatched by the due-queue scheduler with an ETA at the task's next_execution_at. The
+    reschedule is guarded on the due time that was read, so a task edited or already run in
+    the meantime is not executed twice.
+    """
+    async def async_run():
+        db_manager = PlannerMongoManager()
+        try:
+            now = datetime.datetime.now(datetime.timezone.utc)
+            slack = datetime.timedelta(seconds=DUE_QUEUE_DISPATCH_HORIZON_SECONDS)
+            task = await db_manager.tasks_collection.find_one(
+                {"task_id": task_id, "status": {"$in": ["active", "pending"]}, "enabled": True,
+                 "next_execution_at": {"$lte": now + slack}}
+            )
+            if not task:
+                # Disabled, deleted or moved; seeding picks it up again if it is still scheduled.
+                await due_queue.complete(due_queue.USER_TASKS_QUEUE, task_id)
+                return
+
             next_run_time = None
             if task.get('schedule', {}).get('type') == 'recurring':
                 next_run_time = calculate_next_run(task['schedule'], last_run=now)
-
-            update_fields = {
-                "last_execution_at": now,
-                "next_execution_at": next_run_time
-            }
-            # One-off tasks have their next_execution_at set to None, so they won't run again.
-            # Their status will be updated to 'processing' -> 'completed'/'error' by the executor.
-            
-            await db_manager.tasks_collection.update_one(
-                {"_id": task["_id"]},
-                {"$set": update_fields}
+            result = await db_manager.tasks_collection.update_one(
+                {"_id": task["_id"], "next_execution_at": task["next_execution_at"]},
+                {"$set": {"last_execution_at": now, "next_execution_at": next_run_time}}
             )
-            if next_run_time:
-                 logger.info(f"Scheduler: Rescheduled user-defined task {task['task_id']} for {next_run_time}.")
+            if result.modified_count == 0:
+                return
 
-    except Exception as e:
-        logger.error(f"Scheduler: An error occurred checking user-defined tasks: {e}", exc_info=True)
-    finally:
-        await db_manager.close()
\ No newline at end of file
+            logger.info(f"Scheduler: Queuing user-defined task {task_id} for execution.")
+            execute_task_plan.delay(task_id, task['user_id'])
+            if next_run_time and next_run_time <= now + datetime.timedelta(seconds=DUE_QUEUE_TASK_LOOKAHEAD_SECONDS):
+                await due_queue.schedule(due_queue.USER_TASKS_QUEUE, task_id, next_run_time.timestamp())
+            else:
+                await due_queue.complete(due_queue.USER_TASKS_QUEUE, task_id)
+        finally:
+            await db_manager.close()
+
+    run_async(async_run(), task_name="run_scheduled_user_task")
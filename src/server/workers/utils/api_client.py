@@ -6,6 +6,8 @@ import datetime
 from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 from typing import Optional
 
+from workers.utils.db_pool import get_shared_mongo_client
+
 logger = logging.getLogger(__name__)
 
 MAIN_SERVER_URL = os.getenv("MAIN_SERVER_URL", "http://localhost:5000")
@@ -14,9 +16,10 @@ MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "sentient_agent_db")
 
 async def get_user_preferences_from_db(user_id: str):
     """Helper to fetch user preferences directly."""
+    shared_client = get_shared_mongo_client()
     client = None
     try:
-        client = motor.motor_asyncio.AsyncIOMotorClient(MONGO_URI)
+        client = shared_client or motor.motor_asyncio.AsyncIOMotorClient(MONGO_URI)
         db = client[MONGO_DB_NAME]
         user_profile = await db.user_profiles.find_one(
             {"user_id": user_id},
@@ -24,7 +27,7 @@ async def get_user_preferences_from_db(user_id: str):
         )
         return user_profile.get("userData", {}).get("preferences", {}) if user_profile else {}
     finally:
-        if client:
+        if client and client is not shared_client:
             client.close()
 
 async def notify_user(user_id: str, message: str, task_id: Optional[str] = None, notification_type: str = "general"):
@@ -0,0 +1,132 @@
+import os
+import time
+import logging
+import threading
+from typing import Optional, Dict, Any
+
+import motor.motor_asyncio
+from pymongo import monitoring
+
+from workers.config import (MONGO_URI, WORKER_MONGO_MAX_POOL_SIZE,
+                            WORKER_MONGO_MIN_POOL_SIZE, WORKER_MONGO_WAIT_QUEUE_TIMEOUT_MS)
+
+logger = logging.getLogger(__name__)
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Counts connection checkouts and how long callers waited for a pooled connection."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: Dict[Any, list] = {}
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.waits = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.connections_created = 0
+
+    def connection_check_out_started(self, event):
+        with self._lock:
+            self._pending.setdefault(event.address, []).append(time.monotonic())
+
+    def _finish_wait(self, address) -> float:
+        started = self._pending.get(address)
+        if not started:
+            return 0.0
+        return time.monotonic() - started.pop(0)
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            waited = self._finish_wait(event.address)
+            self.checkouts += 1
+            # Anything above a millisecond means the caller queued behind a busy pool.
+            if waited > 0.001:
+                self.waits += 1
+            self.total_wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self._finish_wait(event.address)
+            self.checkout_failures += 1
+
+    def connection_created(self, event):
+        with self._lock:
+            self.connections_created += 1
+
+    # Remaining pool events are not tracked.
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_cleared(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_ready(self, event): pass
+    def connection_closed(self, event): pass
+    def connection_checked_in(self, event): pass
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "waits": self.waits,
+                "avg_wait_ms": round(self.total_wait_seconds / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "max_wait_ms": round(self.max_wait_seconds * 1000, 3),
+                "connections_created": self.connections_created,
+            }
+
+
+_shared_client: Optional[motor.motor_asyncio.AsyncIOMotorClient] = None
+_shared_client_pid: Optional[int] = None
+_pool_enabled = False
+_pool_stats = PoolStatsListener()
+
+
+def enable_shared_mongo_client():
+    """Marks this process as a worker whose DB managers should borrow the shared client."""
+    global _pool_enabled
+    _pool_enabled = True
+
+
+def init_shared_mongo_client() -> motor.motor_asyncio.AsyncIOMotorClient:
+    """Creates the process-wide Motor client. Called on worker_process_init."""
+    global _shared_client, _shared_client_pid
+    enable_shared_mongo_client()
+    if _shared_client is not None and _shared_client_pid == os.getpid():
+        return _shared_client
+
+    # A client inherited across fork() is not safe to use; drop it without closing.
+    _shared_client = motor.motor_asyncio.AsyncIOMotorClient(
+        MONGO_URI,
+        maxPoolSize=WORKER_MONGO_MAX_POOL_SIZE,
+        minPoolSize=WORKER_MONGO_MIN_POOL_SIZE,
+        waitQueueTimeoutMS=WORKER_MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        event_listeners=[_pool_stats],
+    )
+    _shared_client_pid = os.getpid()
+    logger.info(f"Shared worker MongoDB client created (pid={_shared_client_pid}, maxPoolSize={WORKER_MONGO_MAX_POOL_SIZE}).")
+    return _shared_client
+
+
+def get_shared_mongo_client() -> Optional[motor.motor_asyncio.AsyncIOMotorClient]:
+    """
+    Returns the worker's shared Motor client, or None outside of a Celery worker
+    (e.g. when worker modules are imported by the main server).
+    """
+    if not _pool_enabled:
+        return None
+    return init_shared_mongo_client()
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """Returns checkout and wait counters for the shared connection pool."""
+    return _pool_stats.snapshot()
+
+
+def close_shared_mongo_client():
+    """Closes the shared client. Called on worker process shutdown."""
+    global _shared_client, _shared_client_pid
+    if _shared_client is not None and _shared_client_pid == os.getpid():
+        logger.info(f"Closing shared worker MongoDB client. Pool stats: {get_pool_stats()}")
+        _shared_client.close()
+    _shared_client = None
+    _shared_client_pid = None
@@ -0,0 +1,200 @@
+import time
+import datetime
+import zlib
+import logging
+from typing import Dict, Iterable, List, Tuple
+
+from workers.config import (DUE_QUEUE_SHARDS, DUE_QUEUE_LEASE_SECONDS, DUE_QUEUE_CLAIM_BATCH_SIZE,
+                            DUE_QUEUE_SHARD_OWNER_TTL_SECONDS)
+from workers.utils.redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+# Queue names
+POLLING_QUEUE = "polling"
+USER_TASKS_QUEUE = "user_tasks"
+QUEUES = [POLLING_QUEUE, USER_TASKS_QUEUE]
+
+# Each shard is a pair of sorted sets: "due" scored by due time and "leases" scored by the time a
+# claimed item becomes visible again. The hash tag keeps both on one Redis Cluster slot.
+
+_CLAIM_SCRIPT = """
+local now = tonumber(ARGV[1])
+local limit = tonumber(ARGV[3])
+local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', now, 'LIMIT', 0, limit)
+for _, member in ipairs(expired) do
+    redis.call('ZREM', KEYS[2], member)
+    redis.call('ZADD', KEYS[1], now, member)
+end
+local items = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', now + tonumber(ARGV[2]), 'WITHSCORES', 'LIMIT', 0, limit)
+for i = 1, #items, 2 do
+    redis.call('ZREM', KEYS[1], items[i])
+    -- Leased from when the item is dispatched: an overdue item would otherwise get a lease
+    -- that had already expired and be requeued (and dispatched again) on the next claim.
+    redis.call('ZADD', KEYS[2], math.max(now, tonumber(items[i + 1])) + tonumber(ARGV[4]), items[i])
+end
+return items
+"""
+
+_ADD_IF_ABSENT_SCRIPT = """
+if redis.call('ZSCORE', KEYS[2], ARGV[2]) then
+    return 0
+end
+return redis.call('ZADD', KEYS[1], 'NX', ARGV[1], ARGV[2])
+"""
+
+_RENEW_OWNER_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return redis.call('SET', KEYS[1], ARGV[1], 'NX', 'PX', ARGV[2]) and 1 or 0
+"""
+
+
+_SCHEDULERS_KEY = "due_queue:schedulers"
+
+
+def shard_for(member: str) -> int:
+    return zlib.crc32(member.encode("utf-8")) % DUE_QUEUE_SHARDS
+
+
+def _due_key(queue: str, shard: int) -> str:
+    return f"due_queue:{{{queue}:{shard}}}:due"
+
+
+def _lease_key(queue: str, shard: int) -> str:
+    return f"due_queue:{{{queue}:{shard}}}:leases"
+
+
+def _owner_key(queue: str, shard: int) -> str:
+    return f"due_queue:{{{queue}:{shard}}}:owner"
+
+
+def polling_member(service_name: str, user_id: str) -> str:
+    return f"{service_name}:{user_id}"
+
+
+def parse_polling_member(member: str) -> Tuple[str, str]:
+    service_name, user_id = member.split(":", 1)
+    return service_name, user_id
+
+
+def to_unix(value) -> float:
+    """Mongo returns naive UTC datetimes; treat them as UTC."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return value.timestamp()
+
+
+async def schedule(queue: str, member: str, due_at_unix: float):
+    """Sets (or moves) an item's due time and releases any lease on it. O(log n)."""
+    shard = shard_for(member)
+    async with get_redis_client().pipeline(transaction=True) as pipe:
+        pipe.zrem(_lease_key(queue, shard), member)
+        pipe.zadd(_due_key(queue, shard), {member: due_at_unix})
+        await pipe.execute()
+
+
+async def add_if_absent(queue: str, member: str, due_at_unix: float) -> bool:
+    """Queues an item unless it is already queued or leased. Used to (re)seed from Mongo."""
+    shard = shard_for(member)
+    redis = get_redis_client()
+    added = await redis.eval(_ADD_IF_ABSENT_SCRIPT, 2, _due_key(queue, shard), _lease_key(queue, shard),
+                             due_at_unix, member)
+    return bool(added)
+
+
+async def add_many_if_absent(queue: str, items: Iterable[Tuple[str, float]], chunk_size: int = 1000) -> int:
+    """Pipelined `add_if_absent` for reseeding large numbers of items. Returns how many were added."""
+    redis = get_redis_client()
+    added = 0
+    chunk: List[Tuple[str, float]] = []
+
+    async def _flush():
+        nonlocal added
+        async with redis.pipeline(transaction=False) as pipe:
+            for member, due_at_unix in chunk:
+                shard = shard_for(member)
+                pipe.eval(_ADD_IF_ABSENT_SCRIPT, 2, _due_key(queue, shard), _lease_key(queue, shard), due_at_unix, member)
+            added += sum(1 for result in await pipe.execute() if result)
+        chunk.clear()
+
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            await _flush()
+    if chunk:
+        await _flush()
+    return added
+
+
+async def sync_polling_schedule(service_name: str, user_id: str, polling_state: Dict):
+    """Mirrors a poll cycle's outcome into the due queue: next poll time, or removal if disabled."""
+    member = polling_member(service_name, user_id)
+    next_poll = polling_state.get("next_scheduled_poll_time")
+    if not polling_state.get("is_enabled") or next_poll is None:
+        await complete(POLLING_QUEUE, member)
+    else:
+        await schedule(POLLING_QUEUE, member, to_unix(next_poll))
+
+
+async def complete(queue: str, member: str):
+    """Drops a claimed item for good (e.g. polling disabled, one-off task done)."""
+    shard = shard_for(member)
+    async with get_redis_client().pipeline(transaction=True) as pipe:
+        pipe.zrem(_lease_key(queue, shard), member)
+        pipe.zrem(_due_key(queue, shard), member)
+        await pipe.execute()
+
+
+async def claim_due(queue: str, shard: int, horizon_seconds: float,
+                    limit: int = DUE_QUEUE_CLAIM_BATCH_SIZE) -> List[Tuple[str, float]]:
+    """
+    Atomically moves items due within `horizon_seconds` from the shard's due set to its lease
+    set and returns them with their due times. Expired leases are requeued first, so items
+    whose worker died are retried.
+    """
+    redis = get_redis_client()
+    raw = await redis.eval(_CLAIM_SCRIPT, 2, _due_key(queue, shard), _lease_key(queue, shard),
+                           time.time(), horizon_seconds, limit, DUE_QUEUE_LEASE_SECONDS)
+    return [(raw[i], float(raw[i + 1])) for i in range(0, len(raw), 2)]
+
+
+async def acquire_shard(queue: str, shard: int, owner_id: str) -> bool:
+    """Claims or renews ownership of a shard for one scheduler instance."""
+    redis = get_redis_client()
+    owned = await redis.eval(_RENEW_OWNER_SCRIPT, 1, _owner_key(queue, shard), owner_id,
+                             DUE_QUEUE_SHARD_OWNER_TTL_SECONDS * 1000)
+    return bool(owned)
+
+
+async def release_shard(queue: str, shard: int, owner_id: str):
+    redis = get_redis_client()
+    if await redis.get(_owner_key(queue, shard)) == owner_id:
+        await redis.delete(_owner_key(queue, shard))
+
+
+async def heartbeat(owner_id: str) -> int:
+    """Registers a live scheduler instance and returns how many instances are live."""
+    redis = get_redis_client()
+    now = time.time()
+    async with redis.pipeline(transaction=True) as pipe:
+        pipe.zadd(_SCHEDULERS_KEY, {owner_id: now})
+        pipe.zremrangebyscore(_SCHEDULERS_KEY, "-inf", now - DUE_QUEUE_SHARD_OWNER_TTL_SECONDS)
+        pipe.zcard(_SCHEDULERS_KEY)
+        _, _, live = await pipe.execute()
+    return max(1, live)
+
+
+async def leave(owner_id: str):
+    await get_redis_client().zrem(_SCHEDULERS_KEY, owner_id)
+
+
+async def queue_depth(queue: str) -> Dict[str, int]:
+    redis = get_redis_client()
+    async with redis.pipeline(transaction=False) as pipe:
+        for shard in range(DUE_QUEUE_SHARDS):
+            pipe.zcard(_due_key(queue, shard))
+            pipe.zcard(_lease_key(queue, shard))
+        counts = await pipe.execute()
+    return {"due": sum(counts[0::2]), "leased": sum(counts[1::2])}
@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+from workers.config import (WORKER_ASYNC_MODE, WORKER_ASYNC_MAX_CONCURRENCY,
+                            WORKER_ASYNC_DRAIN_TIMEOUT_SECONDS, WORKER_TASK_TYPES,
+                            WORKER_TASK_TYPE_CONCURRENCY)
+
+logger = logging.getLogger(__name__)
+
+_worker_loop = None
+
+# Async mode state: a loop running forever in a dedicated thread, shared by all task threads.
+_loop_thread: Optional[threading.Thread] = None
+_loop_lock = threading.Lock()
+_semaphores: Dict[str, asyncio.Semaphore] = {}
+_in_flight = set()
+_accepting = True
+
+
+def _start_background_loop() -> asyncio.AbstractEventLoop:
+    global _worker_loop, _loop_thread
+    loop = asyncio.new_event_loop()
+    # Sync agent runs are offloaded with asyncio.to_thread; size that pool to the worker's concurrency.
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=WORKER_ASYNC_MAX_CONCURRENCY,
+                                                 thread_name_prefix="worker-offload"))
+
+    # Set from inside the loop, so it only fires once run_forever is actually running.
+    started = threading.Event()
+
+    def _run():
+        asyncio.set_event_loop(loop)
+        loop.call_soon(started.set)
+        loop.run_forever()
+
+    _loop_thread = threading.Thread(target=_run, name="worker-event-loop", daemon=True)
+    _loop_thread.start()
+    # Called under _loop_lock: until the loop is running, another thread's is_running()
+    # check would see it as dead and start a second loop.
+    started.wait()
+    _worker_loop = loop
+    logger.info(f"Started background worker event loop (max concurrency={WORKER_ASYNC_MAX_CONCURRENCY}).")
+    return loop
+
+
+def get_worker_loop() -> asyncio.AbstractEventLoop:
+    """
+    Returns the event loop owned by this worker process, creating it on first use.
+    The shared Motor client binds to the loop it first runs on, so every task in
+    the process must run on the same loop.
+    """
+    global _worker_loop
+    if WORKER_ASYNC_MODE:
+        with _loop_lock:
+            if _worker_loop is None or _worker_loop.is_closed() or not _worker_loop.is_running():
+                _start_background_loop()
+            return _worker_loop
+    if _worker_loop is None or _worker_loop.is_closed():
+        _worker_loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_worker_loop)
+    return _worker_loop
+
+
+def _get_semaphore(task_type: str) -> asyncio.Semaphore:
+    # Only touched from the loop thread, so no locking is needed.
+    semaphore = _semaphores.get(task_type)
+    if semaphore is None:
+        limit = WORKER_TASK_TYPE_CONCURRENCY.get(task_type, WORKER_ASYNC_MAX_CONCURRENCY)
+        semaphore = asyncio.Semaphore(max(1, limit))
+        _semaphores[task_type] = semaphore
+    return semaphore
+
+
+async def _run_limited(coro, task_type: str):
+    task = asyncio.current_task()
+    _in_flight.add(task)
+    try:
+        async with _get_semaphore("__total__"), _get_semaphore(task_type):
+            return await coro
+    finally:
+        _in_flight.discard(task)
+
+
+def run_async(coro, task_name: Optional[str] = None):
+    """
+    Helper to run async code in Celery's sync context.
+
+    In async mode the coroutine is submitted to the shared background loop and the
+    calling Celery thread blocks on its result, so many tasks can await I/O at once.
+    `task_name` selects the per-stage concurrency cap from WORKER_TASK_TYPES.
+    """
+    if not WORKER_ASYNC_MODE:
+        return get_worker_loop().run_until_complete(coro)
+
+    if not _accepting:
+        coro.close()
+        raise RuntimeError("Worker event loop is draining for shutdown; task not accepted.")
+    task_type = WORKER_TASK_TYPES.get(task_name, "default")
+    future = asyncio.run_coroutine_threadsafe(_run_limited(coro, task_type), get_worker_loop())
+    return future.result()
+
+
+def shutdown_worker_loop(timeout: Optional[float] = None):
+    """
+    Stops accepting new coroutines, waits for in-flight ones to finish (up to
+    `timeout` seconds), cancels whatever is left and stops the background loop.
+    No-op in the default synchronous mode.
+    """
+    global _accepting, _worker_loop, _loop_thread
+    if not WORKER_ASYNC_MODE or _worker_loop is None or not _worker_loop.is_running():
+        return
+    _accepting = False
+    loop = _worker_loop
+    timeout = WORKER_ASYNC_DRAIN_TIMEOUT_SECONDS if timeout is None else timeout
+
+    async def _drain():
+        pending = list(_in_flight)
+        if not pending:
+            return
+        logger.info(f"Draining {len(pending)} in-flight worker coroutine(s) (timeout={timeout}s)...")
+        _, still_running = await asyncio.wait(pending, timeout=timeout)
+        for task in still_running:
+            task.cancel()
+        if still_running:
+            logger.warning(f"Cancelled {len(still_running)} worker coroutine(s) that did not finish before shutdown.")
+            await asyncio.gather(*still_running, return_exceptions=True)
+
+    try:
+        asyncio.run_coroutine_threadsafe(_drain(), loop).result(timeout=timeout + 5)
+    except Exception as e:
+        logger.error(f"Error while draining worker event loop: {e}")
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        if _loop_thread is not None:
+            _loop_thread.join(timeout=5)
+        loop.close()
+        _worker_loop = None
+        _loop_thread = None
+        _semaphores.clear()
@@ -0,0 +1,189 @@
+import json
+import time
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+from workers.config import (MEMORY_BATCH_WINDOW_SECONDS, MEMORY_BATCH_MAX_SIZE,
+                            MEMORY_STORED_IDS_TTL_SECONDS, SUPERMEMORY_CALL_TIMEOUT_SECONDS)
+from workers.utils.redis_client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+
+def _buffer_key(user_id: str) -> str:
+    return f"memory_ingest:{user_id}:buffer"
+
+
+def _scheduled_key(user_id: str) -> str:
+    return f"memory_ingest:{user_id}:flush_scheduled"
+
+
+def _flush_lock_key(user_id: str) -> str:
+    return f"memory_ingest:{user_id}:flush_lock"
+
+
+def _stored_key(user_id: str) -> str:
+    return f"memory_ingest:{user_id}:stored"
+
+
+def fact_id(user_id: str, fact_text: str) -> str:
+    """Stable id for a fact, used to make re-delivered or repeated facts idempotent."""
+    normalized = " ".join(fact_text.split()).lower()
+    return hashlib.sha1(f"{user_id}:{normalized}".encode("utf-8")).hexdigest()
+
+
+class MemoryIngestStats:
+    """Batch size and flush latency counters for this worker process."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.flushes = 0
+        self.facts_flushed = 0
+        self.duplicates_skipped = 0
+        self.max_batch_size = 0
+        self.total_latency_seconds = 0.0
+        self.max_latency_seconds = 0.0
+
+    def record_flush(self, batch_size: int, duplicates: int, latency_seconds: float):
+        with self._lock:
+            self.flushes += 1
+            self.facts_flushed += batch_size
+            self.duplicates_skipped += duplicates
+            self.max_batch_size = max(self.max_batch_size, batch_size)
+            self.total_latency_seconds += latency_seconds
+            self.max_latency_seconds = max(self.max_latency_seconds, latency_seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "flushes": self.flushes,
+                "facts_flushed": self.facts_flushed,
+                "duplicates_skipped": self.duplicates_skipped,
+                "avg_batch_size": round(self.facts_flushed / self.flushes, 2) if self.flushes else 0.0,
+                "max_batch_size": self.max_batch_size,
+                "avg_flush_latency_ms": round(self.total_latency_seconds / self.flushes * 1000, 1) if self.flushes else 0.0,
+                "max_flush_latency_ms": round(self.max_latency_seconds * 1000, 1),
+            }
+
+
+_stats = MemoryIngestStats()
+
+
+def get_memory_ingest_stats() -> Dict[str, Any]:
+    return _stats.snapshot()
+
+
+async def buffer_facts(user_id: str, facts: List[str], source_event_id: Optional[str] = None) -> Optional[int]:
+    """
+    Appends facts to the user's Redis buffer in order. Returns the countdown (in seconds)
+    after which the caller should schedule a flush, or None if one is already scheduled.
+    """
+    redis = get_redis_client()
+    now = time.time()
+    entries = [
+        json.dumps({
+            "id": fact_id(user_id, fact),
+            "fact": fact,
+            "source_event_id": source_event_id,
+            "enqueued_at": now,
+            "attempts": 0,
+        })
+        for fact in facts if isinstance(fact, str) and fact.strip()
+    ]
+    if not entries:
+        return None
+
+    length = await redis.rpush(_buffer_key(user_id), *entries)
+    if length >= MEMORY_BATCH_MAX_SIZE:
+        # Full batch: flush now, even if a windowed flush is already pending.
+        await redis.set(_scheduled_key(user_id), "1", ex=MEMORY_BATCH_WINDOW_SECONDS + 60)
+        return 0
+    if await redis.set(_scheduled_key(user_id), "1", nx=True, ex=MEMORY_BATCH_WINDOW_SECONDS + 60):
+        return MEMORY_BATCH_WINDOW_SECONDS
+    return None
+
+
+async def pop_batch(user_id: str) -> List[Dict[str, Any]]:
+    """Atomically takes up to MEMORY_BATCH_MAX_SIZE entries off the head of the user's buffer."""
+    redis = get_redis_client()
+    key = _buffer_key(user_id)
+    async with redis.pipeline(transaction=True) as pipe:
+        pipe.lrange(key, 0, MEMORY_BATCH_MAX_SIZE - 1)
+        pipe.ltrim(key, MEMORY_BATCH_MAX_SIZE, -1)
+        pipe.delete(_scheduled_key(user_id))
+        raw_entries, _, _ = await pipe.execute()
+    return [json.loads(raw) for raw in raw_entries]
+
+
+async def requeue_front(user_id: str, entries: List[Dict[str, Any]]):
+    """Puts unprocessed entries back at the head of the buffer, keeping their order."""
+    if entries:
+        await get_redis_client().lpush(_buffer_key(user_id), *[json.dumps(e) for e in reversed(entries)])
+
+
+async def has_pending(user_id: str) -> bool:
+    return bool(await get_redis_client().llen(_buffer_key(user_id)))
+
+
+_EXTEND_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+def flush_lock_ttl(facts_remaining: int) -> int:
+    """Long enough for the remaining facts: each write may time out once and be retried."""
+    return facts_remaining * 2 * SUPERMEMORY_CALL_TIMEOUT_SECONDS + 60
+
+
+async def acquire_flush_lock(user_id: str, token: str) -> bool:
+    """Serializes flushes per user so batches reach Supermemory in enqueue order."""
+    return bool(await get_redis_client().set(_flush_lock_key(user_id), token, nx=True,
+                                             ex=flush_lock_ttl(MEMORY_BATCH_MAX_SIZE)))
+
+
+async def extend_flush_lock(user_id: str, token: str, facts_remaining: int) -> bool:
+    """Pushes the lock's expiry out for the facts still to write. False if the lock was lost."""
+    extended = await get_redis_client().eval(_EXTEND_LOCK_SCRIPT, 1, _flush_lock_key(user_id), token,
+                                             flush_lock_ttl(facts_remaining))
+    return bool(extended)
+
+
+async def release_flush_lock(user_id: str, token: str):
+    redis = get_redis_client()
+    if await redis.get(_flush_lock_key(user_id)) == token:
+        await redis.delete(_flush_lock_key(user_id))
+
+
+async def filter_already_stored(user_id: str, entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Drops facts stored recently and duplicates within the batch, preserving order."""
+    if not entries:
+        return []
+    redis = get_redis_client()
+    stored_flags = await redis.smismember(_stored_key(user_id), [e["id"] for e in entries])
+    seen, fresh = set(), []
+    for entry, already_stored in zip(entries, stored_flags):
+        if already_stored or entry["id"] in seen:
+            continue
+        seen.add(entry["id"])
+        fresh.append(entry)
+    return fresh
+
+
+async def mark_stored(user_id: str, ids: List[str]):
+    if not ids:
+        return
+    redis = get_redis_client()
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.sadd(_stored_key(user_id), *ids)
+        pipe.expire(_stored_key(user_id), MEMORY_STORED_IDS_TTL_SECONDS)
+        await pipe.execute()
+
+
+def record_flush(batch_size: int, duplicates: int, oldest_enqueued_at: float):
+    latency = max(0.0, time.time() - oldest_enqueued_at)
+    _stats.record_flush(batch_size, duplicates, latency)
+    logger.info(f"Memory batch flushed: size={batch_size}, duplicates={duplicates}, latency={latency:.2f}s. Stats: {_stats.snapshot()}")
@@ -0,0 +1,31 @@
+import os
+import logging
+from typing import Optional
+
+import redis.asyncio as aioredis
+
+from main.profile_cache import PROFILE_INVALIDATION_CHANNEL
+from workers.config import PROFILE_CACHE_REDIS_URL
+
+logger = logging.getLogger(__name__)
+
+_publisher: Optional[aioredis.Redis] = None
+_publisher_pid: Optional[int] = None
+
+
+async def publish_profile_invalidation(user_id: str):
+    """
+    Tells the main server processes to drop their cached profile of `user_id` after a worker
+    wrote to it. A no-op unless PROFILE_CACHE_REDIS_URL is set; failures are only logged,
+    the cache TTL bounds how long a missed invalidation can matter.
+    """
+    global _publisher, _publisher_pid
+    if not PROFILE_CACHE_REDIS_URL:
+        return
+    if _publisher is None or _publisher_pid != os.getpid():
+        _publisher = aioredis.from_url(PROFILE_CACHE_REDIS_URL, decode_responses=True)
+        _publisher_pid = os.getpid()
+    try:
+        await _publisher.publish(PROFILE_INVALIDATION_CHANNEL, user_id)
+    except Exception as e:
+        logger.warning(f"Failed to publish profile invalidation for {user_id}: {e}")
@@ -0,0 +1,33 @@
+# src/server/workers/utils/push_tokens.py
+# Shared by the pollers (which register watch channels) and the main server (which receives
+# the notifications), so it reads its secret directly from the environment.
+import os
+import hmac
+import hashlib
+from typing import Optional
+
+PUSH_NOTIFICATION_SECRET = os.getenv("PUSH_NOTIFICATION_SECRET", "")
+
+
+def push_enabled() -> bool:
+    """Watches are only registered, and polling only relaxed, when notifications can be authenticated."""
+    return bool(PUSH_NOTIFICATION_SECRET)
+
+
+def _signature(user_id: str) -> str:
+    return hmac.new(PUSH_NOTIFICATION_SECRET.encode("utf-8"), user_id.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def make_channel_token(user_id: str) -> str:
+    """Token attached to a watch channel; Google echoes it back on every notification."""
+    return f"{user_id}:{_signature(user_id)}"
+
+
+def verify_channel_token(token: Optional[str]) -> Optional[str]:
+    """Returns the user_id a channel token was issued for, or None if it is not authentic."""
+    if not PUSH_NOTIFICATION_SECRET or not token or ":" not in token:
+        return None
+    user_id, signature = token.rsplit(":", 1)
+    if not user_id or not hmac.compare_digest(signature, _signature(user_id)):
+        return None
+    return user_id
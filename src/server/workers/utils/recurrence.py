@@ -0,0 +1,124 @@
+import logging
+import datetime
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+logger = logging.getLogger(__name__)
+
+WEEKDAYS = {"Monday": 0, "Tuesday": 1, "Wednesday": 2, "Thursday": 3, "Friday": 4, "Saturday": 5, "Sunday": 6}
+
+ScheduleKey = Tuple[str, str, Tuple[int, ...], str]
+
+
+class CompiledSchedule:
+    """
+    A recurring schedule ("daily" or "weekly" at a local "HH:MM") resolved once into the
+    pieces needed to generate occurrences. Occurrences are computed in the schedule's own
+    timezone and returned in UTC, so "09:00" stays 09:00 local across DST changes. A time
+    that does not exist on a spring-forward day runs at the same offset as the day before
+    (02:30 becomes 03:30); a time that occurs twice on a fall-back day runs only the first time.
+    """
+    __slots__ = ("frequency", "run_time", "weekdays", "tz")
+
+    def __init__(self, frequency: str, run_time: datetime.time, weekdays: Tuple[int, ...], tz: ZoneInfo):
+        self.frequency = frequency
+        self.run_time = run_time
+        self.weekdays = frozenset(weekdays)
+        self.tz = tz
+
+    def _runs_on(self, day: datetime.date) -> bool:
+        return self.frequency == "daily" or day.weekday() in self.weekdays
+
+    def _occurrence_on(self, day: datetime.date) -> datetime.datetime:
+        local = datetime.datetime.combine(day, self.run_time).replace(tzinfo=self.tz, fold=0)
+        return local.astimezone(datetime.timezone.utc)
+
+    def next_after(self, after: datetime.datetime) -> Optional[datetime.datetime]:
+        occurrences = self.next_n(after, 1)
+        return occurrences[0] if occurrences else None
+
+    def next_n(self, after: datetime.datetime, count: int) -> List[datetime.datetime]:
+        """The next `count` occurrences strictly after `after`, in UTC."""
+        if after.tzinfo is None:
+            after = after.replace(tzinfo=datetime.timezone.utc)
+        # Start a day early: the local date of `after` may be behind its UTC date.
+        day = after.astimezone(self.tz).date() - datetime.timedelta(days=1)
+        occurrences: List[datetime.datetime] = []
+        # A weekly schedule runs at least once in any 7 days, so this always terminates.
+        while len(occurrences) < count:
+            if self._runs_on(day):
+                occurrence = self._occurrence_on(day)
+                if occurrence > after:
+                    occurrences.append(occurrence)
+            day += datetime.timedelta(days=1)
+        return occurrences
+
+
+def schedule_key(schedule: Dict[str, Any], default_timezone: str = "UTC") -> Optional[ScheduleKey]:
+    """
+    Normalized, hashable form of a schedule dict; None if it is not a recurring schedule we
+    support. Schedules are user-editable documents, so malformed fields are rejected here
+    rather than raising in the batch that expands them.
+    """
+    if not isinstance(schedule, dict):
+        return None
+    frequency = schedule.get("frequency")
+    if frequency not in ("daily", "weekly"):
+        return None
+    time_str = schedule.get("time", "00:00")
+    if not isinstance(time_str, str):
+        logger.error(f"Invalid schedule time {time_str!r}.")
+        return None
+    weekdays: Tuple[int, ...] = ()
+    if frequency == "weekly":
+        days = schedule.get("days")
+        if not isinstance(days, (list, tuple)):
+            return None
+        weekdays = tuple(sorted({WEEKDAYS[day] for day in days if isinstance(day, str) and day in WEEKDAYS}))
+        if not weekdays:
+            return None
+    tz_name = schedule.get("timezone")
+    return (frequency, time_str, weekdays, tz_name if isinstance(tz_name, str) and tz_name else default_timezone)
+
+
+@lru_cache(maxsize=4096)
+def _compile(key: ScheduleKey) -> Optional[CompiledSchedule]:
+    frequency, time_str, weekdays, tz_name = key
+    try:
+        hour, minute = map(int, time_str.split(':'))
+        run_time = datetime.time(hour, minute)
+    except (ValueError, AttributeError):
+        logger.error(f"Invalid schedule time '{time_str}'.")
+        return None
+    try:
+        tz = ZoneInfo(tz_name)
+    except (ZoneInfoNotFoundError, ValueError):
+        logger.warning(f"Unknown schedule timezone '{tz_name}', using UTC.")
+        tz = ZoneInfo("UTC")
+    return CompiledSchedule(frequency, run_time, weekdays, tz)
+
+
+def compile_schedule(schedule: Dict[str, Any], default_timezone: str = "UTC") -> Optional[CompiledSchedule]:
+    key = schedule_key(schedule, default_timezone)
+    return _compile(key) if key else None
+
+
+def next_occurrences(schedules: Iterable[Dict[str, Any]], after: datetime.datetime, count: int = 1,
+                     default_timezone: str = "UTC") -> List[List[datetime.datetime]]:
+    """
+    Next `count` occurrences for many schedules at once, in input order. Identical
+    schedules (the common case: "daily at 09:00") are compiled and expanded only once.
+    """
+    expanded: Dict[ScheduleKey, List[datetime.datetime]] = {}
+    results = []
+    for schedule in schedules:
+        key = schedule_key(schedule, default_timezone)
+        if key is None:
+            results.append([])
+            continue
+        if key not in expanded:
+            compiled = _compile(key)
+            expanded[key] = compiled.next_n(after, count) if compiled else []
+        results.append(list(expanded[key]))
+    return results
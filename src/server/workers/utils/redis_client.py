@@ -0,0 +1,25 @@
+import os
+import logging
+from typing import Optional
+
+import redis.asyncio as aioredis
+
+from workers.config import REDIS_URL
+
+logger = logging.getLogger(__name__)
+
+_redis_client: Optional[aioredis.Redis] = None
+_redis_client_pid: Optional[int] = None
+
+
+def get_redis_client() -> aioredis.Redis:
+    """
+    Returns this worker process's asyncio Redis client, creating it on first use.
+    Like the shared Motor client it must only be used from the worker event loop.
+    """
+    global _redis_client, _redis_client_pid
+    if _redis_client is None or _redis_client_pid != os.getpid():
+        _redis_client = aioredis.from_url(REDIS_URL, decode_responses=True)
+        _redis_client_pid = os.getpid()
+        logger.info(f"Worker Redis client created (pid={_redis_client_pid}).")
+    return _redis_client
@@ -0,0 +1,113 @@
+import asyncio
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+from mcp import ClientSession
+from mcp.client.sse import sse_client
+
+from workers.config import (SUPERMEMORY_ADD_TOOL_NAME, SUPERMEMORY_CALL_TIMEOUT_SECONDS,
+                            SUPERMEMORY_CONNECTION_IDLE_SECONDS)
+
+logger = logging.getLogger(__name__)
+
+
+class SupermemoryConnection:
+    """
+    One MCP session to a user's Supermemory SSE endpoint, reused across calls.
+
+    The SSE transport's task group must be entered and exited by the same task, so a
+    single serving task owns the session and callers hand it requests through a queue.
+    The session closes itself after SUPERMEMORY_CONNECTION_IDLE_SECONDS without work.
+    """
+    def __init__(self, url: str):
+        self.url = url
+        self._requests: asyncio.Queue = asyncio.Queue()
+        self._server_task: Optional[asyncio.Task] = None
+
+    async def call_tool(self, name: str, arguments: Dict[str, Any], timeout: float = SUPERMEMORY_CALL_TIMEOUT_SECONDS):
+        future = asyncio.get_running_loop().create_future()
+        await self._requests.put((name, arguments, future))
+        if self._server_task is None or self._server_task.done():
+            self._server_task = asyncio.create_task(self._serve(self._requests))
+        return await asyncio.wait_for(future, timeout=timeout)
+
+    def _detach(self, task: asyncio.Task):
+        # Synchronous, so no call can slip in between: from here on new calls get a fresh
+        # session and queue, and the closing session only fails requests already queued to it.
+        if self._server_task is task:
+            self._server_task = None
+            self._requests = asyncio.Queue()
+
+    @staticmethod
+    def _fail_pending(requests: asyncio.Queue, error: Exception):
+        while not requests.empty():
+            _, _, future = requests.get_nowait()
+            if not future.done():
+                future.set_exception(error)
+
+    async def _serve(self, requests: asyncio.Queue):
+        me = asyncio.current_task()
+        try:
+            async with sse_client(self.url) as (read_stream, write_stream):
+                async with ClientSession(read_stream, write_stream) as session:
+                    await session.initialize()
+                    while True:
+                        try:
+                            name, arguments, future = await asyncio.wait_for(
+                                requests.get(), timeout=SUPERMEMORY_CONNECTION_IDLE_SECONDS
+                            )
+                        except asyncio.TimeoutError:
+                            # Detach before closing so new calls start a fresh session.
+                            self._detach(me)
+                            break
+                        if future.done():  # Caller already timed out
+                            continue
+                        try:
+                            future.set_result(await session.call_tool(name, arguments))
+                        except Exception as e:
+                            # Detach before the transport unwinds (which awaits), so the
+                            # caller's retry goes to a new session rather than this dying one.
+                            self._detach(me)
+                            if not future.done():
+                                future.set_exception(e)
+                            raise
+        except Exception as e:
+            logger.warning(f"Supermemory MCP session for {self.url} closed with error: {e}")
+            self._detach(me)
+            self._fail_pending(requests, e)
+
+
+_connections: Dict[str, SupermemoryConnection] = {}
+
+
+def get_supermemory_connection(supermemory_mcp_url: str) -> SupermemoryConnection:
+    """Returns the pooled connection for a Supermemory MCP URL, creating it on first use."""
+    connection = _connections.get(supermemory_mcp_url)
+    if connection is None:
+        connection = SupermemoryConnection(supermemory_mcp_url)
+        _connections[supermemory_mcp_url] = connection
+    return connection
+
+
+def _result_text(result) -> str:
+    parts = [getattr(item, "text", "") for item in (getattr(result, "content", None) or [])]
+    return "\n".join(part for part in parts if part)
+
+
+async def add_to_supermemory(supermemory_mcp_url: str, fact_text: str) -> Tuple[bool, str]:
+    """
+    Stores a fact verbatim by calling Supermemory's add-memory tool directly.
+    Returns (succeeded, tool_response_text).
+    """
+    connection = get_supermemory_connection(supermemory_mcp_url)
+    arguments = {"thingToRemember": fact_text}
+    try:
+        result = await connection.call_tool(SUPERMEMORY_ADD_TOOL_NAME, arguments)
+    except asyncio.TimeoutError:
+        raise
+    except Exception as e:
+        # A pooled session can go stale while the worker is idle; retry once on a fresh one.
+        logger.info(f"Retrying Supermemory write on a new session after error: {e}")
+        result = await connection.call_tool(SUPERMEMORY_ADD_TOOL_NAME, arguments)
+    response_text = _result_text(result)
+    return not getattr(result, "isError", False), response_text